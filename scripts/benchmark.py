@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Benchmark the prepare scripts and the generators on fixed inputs and compare
+the results against a stored baseline.
+
+Inputs are the fixture prefectures in scripts/fixtures/sources/ (鳥取 and
+島根 municipalities, 鳥取 oaza), gzipped, in the upstream source formats.
+They were made from the committed outputs, with every coordinate perturbed
+at the 1e-6 level so quantization and cleanup have work to do. A stand-in
+HTTP server on localhost serves them in place of the upstream hosts.
+
+Each case runs the real script in a fresh subprocess. The subprocess gets a
+temporary source cache and output directory, so nothing under public/ or
+src/ is touched. Per case, as the median of --repeat runs:
+  wall_s        elapsed time, including the download from the local server
+  cpu_s         user + system CPU time of the subprocess
+  peak_mb       peak resident memory of the subprocess
+  output_bytes  total size of the files it wrote
+  stages        seconds per stage (download, parse, quantize, ...) from the
+                prepare scripts' --profile-report (scripts/instrument.py);
+                the generators have no stage hooks and are timed whole
+
+A metric regresses when it exceeds the baseline by more than THRESHOLDS
+and by more than MIN_DELTAS (to ignore noise on the small fixtures). Any
+regression makes the run exit 1.
+
+The baseline is committed as scripts/benchmark-baseline.json, so a fresh
+checkout or CI compares against it; --save overwrites it. It records how
+long a fixed pure-Python calibration loop takes on the machine that made it,
+and baseline times are scaled by the ratio to the current machine's
+calibration before comparing.
+
+Usage:
+  python3 scripts/benchmark.py --save          # record a baseline
+  python3 scripts/benchmark.py                 # compare against it
+  python3 scripts/benchmark.py --case prepare-oaza --repeat 10
+"""
+import argparse
+import gzip
+import http.server
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from project import SCRIPTS_DIR
+
+FIXTURES_DIR = os.path.join(SCRIPTS_DIR, "fixtures", "sources")
+BASELINE_PATH = os.path.join(SCRIPTS_DIR, "benchmark-baseline.json")
+
+# name -> (script, arguments)
+CASES = {
+    "prepare-geojson": ("prepare-geojson.py", []),
+    "prepare-geojson-adaptive": ("prepare-geojson.py", ["--precision", "adaptive"]),
+    "prepare-geojson-culled": ("prepare-geojson.py", ["--lod", "prefecture"]),
+    "prepare-geojson-ndjson": ("prepare-geojson.py", ["--format", "ndjson"]),
+    "prepare-geojson-stdlib": ("prepare-geojson.py", ["--serializer", "json"]),
+    "prepare-oaza": ("prepare-oaza.py", []),
+    "prepare-oaza-adaptive": ("prepare-oaza.py", ["--precision", "adaptive"]),
+    "generate-roads": ("generate-roads.py", []),
+    "generate-rivers": ("generate-rivers.py", []),
+}
+SOURCE_LAYERS = {"prepare-geojson.py": "municipality", "prepare-oaza.py": "oaza"}
+TIME_METRICS = {"wall_s", "cpu_s"}  # Scaled by the calibration, like the stage times
+
+# Relative increase over the baseline that counts as a regression...
+THRESHOLDS = {"wall_s": 0.25, "cpu_s": 0.25, "peak_mb": 0.10, "output_bytes": 0.01, "stages": 0.25}
+# ...provided the absolute increase is also above this
+MIN_DELTAS = {"wall_s": 0.1, "cpu_s": 0.1, "peak_mb": 2.0, "output_bytes": 0, "stages": 0.05}
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """Serve /{layer}/{code}.json from the gzipped fixtures."""
+
+    def do_GET(self):
+        path = os.path.join(FIXTURES_DIR, self.path.lstrip("/") + ".gz")
+        if ".." in self.path or not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with gzip.open(path, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def fixture_codes(layer):
+    return sorted(f[:-len(".json.gz")] for f in os.listdir(os.path.join(FIXTURES_DIR, layer)))
+
+
+def run_case_in_process(name, workdir, mirror):
+    """Child side: run a case's script with sources and outputs redirected to workdir."""
+    import project
+
+    project.SOURCES_DIR = os.path.join(workdir, "sources")
+    project.SOURCE_URLS = {layer: f"{mirror}/{layer}/{{code}}.json" for layer in project.SOURCE_URLS}
+    out_dir = os.path.join(workdir, "out")
+    os.makedirs(out_dir)
+
+    script, args = CASES[name]
+    spec = importlib.util.spec_from_file_location(script[:-3].replace("-", "_"), os.path.join(SCRIPTS_DIR, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if script in SOURCE_LAYERS:
+        module.OUTPUT_DIR = out_dir
+        module.PREF_CODES = fixture_codes(SOURCE_LAYERS[script])
+    if "datasets" in sys.modules:
+        sys.modules["datasets"].DATA_DIR = out_dir
+    if hasattr(module, "recorder"):
+        args = [*args, "--profile-report", os.path.join(workdir, "stages.json")]
+    sys.argv = [script, *args]
+    module.main()
+
+
+def measure(name, mirror):
+    """Run one case in a subprocess; return its metrics."""
+    workdir = tempfile.mkdtemp(prefix="geodict-bench-")
+    try:
+        log_path = os.path.join(workdir, "output.log")
+        cmd = [sys.executable, os.path.abspath(__file__), "--run-case", name, "--workdir", workdir, "--mirror", mirror]
+        start = time.perf_counter()
+        with open(log_path, "w", encoding="utf-8") as log:
+            proc = subprocess.Popen(cmd, cwd=SCRIPTS_DIR, stdout=log, stderr=subprocess.STDOUT)
+            _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+        returncode = os.waitstatus_to_exitcode(status)
+        if returncode != 0:
+            with open(log_path, encoding="utf-8", errors="replace") as f:
+                tail = "\n".join(f.read().splitlines()[-5:])
+            raise RuntimeError(f"{name} exited with {returncode}:\n{tail}")
+
+        output_bytes = 0
+        for root, _dirs, files in os.walk(os.path.join(workdir, "out")):
+            output_bytes += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        metrics = {
+            "wall_s": wall,
+            "cpu_s": usage.ru_utime + usage.ru_stime,
+            "peak_mb": usage.ru_maxrss / 1024,  # KB on Linux
+            "output_bytes": output_bytes,
+        }
+        report_path = os.path.join(workdir, "stages.json")
+        if os.path.exists(report_path):
+            with open(report_path, encoding="utf-8") as f:
+                metrics["stages"] = {stage: m["seconds"] for stage, m in json.load(f)["stages"].items()}
+        return metrics
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def median_of(runs):
+    """Median of every metric across runs (the lower one for an even count), per stage for stage times."""
+    summary = {metric: statistics.median_low(run[metric] for run in runs) for metric in runs[0] if metric != "stages"}
+    if "stages" in runs[0]:
+        summary["stages"] = {stage: statistics.median_low(run["stages"].get(stage, 0.0) for run in runs)
+                             for stage in runs[0]["stages"]}
+    return summary
+
+
+def calibrate(repeat=20):
+    """Seconds for a fixed pure-Python loop, to compare machine speeds.
+
+    The fastest of many short runs: unlike the cases, this should measure the
+    machine rather than what else is running on it.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total = 0.0
+        points = {}
+        for i in range(50_000):
+            x, y = i * 1e-4, (i % 977) * 1e-4
+            total += round(x * y, 4)
+            points[(round(x, 2), round(y, 2))] = i
+        json.dumps(list(points.items()))
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def scale_times(cases, factor):
+    """Copy of baseline cases with every time multiplied by factor."""
+    scaled = {}
+    for name, metrics in cases.items():
+        scaled[name] = {metric: value * factor if metric in TIME_METRICS else value
+                        for metric, value in metrics.items()}
+        if "stages" in metrics:
+            scaled[name]["stages"] = {stage: t * factor for stage, t in metrics["stages"].items()}
+    return scaled
+
+
+def _regressed(metric, base, value):
+    return value > base * (1 + THRESHOLDS[metric]) and value - base > MIN_DELTAS[metric]
+
+
+def compare(results, baseline):
+    """Return [(case, metric, base, new)] for every regression."""
+    regressions = []
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, value in metrics.items():
+            if metric not in base:
+                continue
+            if metric == "stages":
+                regressions.extend((name, f"stage {stage}", base[metric][stage], t) for stage, t in value.items()
+                                   if stage in base[metric] and _regressed(metric, base[metric][stage], t))
+            elif _regressed(metric, base[metric], value):
+                regressions.append((name, metric, base[metric], value))
+    return regressions
+
+
+def _delta(value, base):
+    if not base:
+        return ""
+    return f" ({(value - base) / base:+.0%})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--case", choices=sorted(CASES), action="append", dest="cases",
+                        help="case to run (repeatable; default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case; the median is kept (default: 5)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--mirror", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        run_case_in_process(args.run_case, args.workdir, args.mirror)
+        return
+
+    stored = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+        if (stored["python"], stored["machine"]) != (platform.python_version(), platform.machine()):
+            print(f"Warning: baseline is from Python {stored['python']} on {stored['machine']}")
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    mirror = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Calibrate between cases and keep the fastest, so a busy spell on a
+    # shared machine doesn't skew the scaling
+    calibration = float("inf")
+    results = {}
+    try:
+        for name in args.cases or CASES:
+            print(f"  {name}...", flush=True)
+            calibration = min(calibration, calibrate())
+            results[name] = median_of([measure(name, mirror) for _ in range(args.repeat)])
+    finally:
+        server.shutdown()
+
+    baseline = {}
+    if stored:
+        factor = calibration / stored["calibration_s"]
+        baseline = scale_times(stored["cases"], factor)
+        print(f"\nBaseline times scaled by {factor:.2f} for this machine "
+              f"(calibration {calibration * 1000:.1f}ms vs {stored['calibration_s'] * 1000:.1f}ms)")
+    print(f"\nMedians of {args.repeat} runs:")
+    for name, m in results.items():
+        base = baseline.get(name, {})
+        print(f"  {name:<26} wall {m['wall_s']:.2f}s{_delta(m['wall_s'], base.get('wall_s'))}, "
+              f"cpu {m['cpu_s']:.2f}s{_delta(m['cpu_s'], base.get('cpu_s'))}, "
+              f"peak {m['peak_mb']:.0f}MB{_delta(m['peak_mb'], base.get('peak_mb'))}, "
+              f"{m['output_bytes'] // 1024}KB{_delta(m['output_bytes'], base.get('output_bytes'))}")
+        if "stages" in m:
+            base_stages = base.get("stages", {})
+            print("    " + ", ".join(f"{stage} {t:.3f}s{_delta(t, base_stages.get(stage))}"
+                                     for stage, t in m["stages"].items()))
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "calibration_s": calibration, "cases": {**baseline, **results}}, f, indent=2)
+            f.write("\n")
+        print(f"\nSaved baseline for {len(results)} cases to {args.baseline}")
+        return
+
+    if not baseline:
+        print("\nNo baseline yet; run with --save to record one")
+        return
+    regressions = compare(results, baseline)
+    if regressions:
+        print("\nRegressions:")
+        for name, metric, base, value in regressions:
+            print(f"  {name} {metric}: {base:.2f} -> {value:.2f} ({(value - base) / base:+.0%})")
+        raise SystemExit(1)
+    print(f"\nNo regressions in {len(results)} cases")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Build the route/river crossing table: the length of each national route and
+river inside each municipality.
+
+Inputs are the polylines written by scripts/ingest-routes.py
+(public/data/routes/{pref}.json) and scripts/ingest-rivers.py
+(public/data/rivers-osm.json). Each prefecture is a separate job: it indexes
+that prefecture's municipality boundaries and clips every polyline whose
+bbox reaches into it with PolygonIndex.clip_lengths() (scripts/spatial.py).
+Jobs run in a process pool.
+
+Outputs to build/:
+  crossings.csv              one row per (feature, municipality)
+                             kind,feature,name,municipality,prefecture,length_km
+  crossings-prefectures.csv  the same lengths summed per (feature, prefecture)
+                             kind,feature,name,prefecture,municipalities,length_km
+
+The summary compares each feature's total against the hand-entered `length`
+in src/data/roads.json / rivers.json and lists those that differ by more
+than LENGTH_TOLERANCE (expected for routes or rivers the extract only
+partly covers).
+
+Usage:
+  python3 scripts/build-crossings.py [--workers N]
+
+Requires numpy.
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from geoutil import bbox
+from project import BUILD_DIR, PREF_CODES, PUBLIC_DATA_DIR, SRC_DATA_DIR
+from spatial import PolygonIndex, load_municipalities
+
+ROUTES_DIR = os.path.join(PUBLIC_DATA_DIR, "routes")
+RIVERS_PATH = os.path.join(PUBLIC_DATA_DIR, "rivers-osm.json")
+ROADS_DATA_PATH = os.path.join(SRC_DATA_DIR, "roads.json")
+RIVERS_DATA_PATH = os.path.join(SRC_DATA_DIR, "rivers.json")
+OUTPUT_PATH = os.path.join(BUILD_DIR, "crossings.csv")
+PREFECTURES_OUTPUT_PATH = os.path.join(BUILD_DIR, "crossings-prefectures.csv")
+
+LENGTH_TOLERANCE = 0.1  # Relative difference from the hand-entered length worth reporting
+
+
+def _lines(geometry):
+    if geometry["type"] == "LineString":
+        return [geometry["coordinates"]]
+    return geometry["coordinates"]
+
+
+def load_polylines():
+    """Return [(kind, feature id, name, [lines], bbox)] for every route and river."""
+    routes = {}
+    for path in sorted(glob.glob(os.path.join(ROUTES_DIR, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            for feat in json.load(f)["features"]:
+                props = feat["properties"]
+                entry = routes.setdefault(props["number"], [props["name"], []])
+                entry[1].extend(_lines(feat["geometry"]))
+    polylines = [("route", number, name, lines, bbox(lines)) for number, (name, lines) in sorted(routes.items())]
+
+    if os.path.exists(RIVERS_PATH):
+        with open(RIVERS_PATH, encoding="utf-8") as f:
+            for feat in json.load(f)["features"]:
+                lines = _lines(feat["geometry"])
+                name = feat["properties"]["name"]
+                polylines.append(("river", name, name, lines, bbox(lines)))
+    return polylines
+
+
+def clip_prefecture(pref, polylines):
+    """Crossing rows for one prefecture: (kind, feature, name, municipality, km)."""
+    features = list(load_municipalities([pref]))
+    pref_box = bbox([f["geometry"]["coordinates"] for f in features])
+    index = PolygonIndex(features)
+    rows = []
+    for kind, feature, name, lines, (w, s, e, n) in polylines:
+        if w > pref_box[2] or e < pref_box[0] or s > pref_box[3] or n < pref_box[1]:
+            continue
+        lengths = {}
+        for line in lines:
+            for code, km in index.clip_lengths(line).items():
+                lengths[code] = lengths.get(code, 0.0) + km
+        rows.extend((kind, feature, name, code, km) for code, km in sorted(lengths.items()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="parallel prefecture jobs (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    polylines = load_polylines()
+    if not polylines:
+        print("No polylines found; run scripts/ingest-routes.py / ingest-rivers.py first")
+        return
+    print(f"Loaded {len(polylines)} polylines")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        jobs = {pref: pool.submit(clip_prefecture, pref, polylines) for pref in PREF_CODES}
+        for pref, job in jobs.items():
+            try:
+                pref_rows = job.result()
+            except Exception as e:
+                print(f"  {pref}: ERROR: {e}")
+                continue
+            if pref_rows:
+                print(f"  {pref}: {len(pref_rows)} rows, {sum(r[4] for r in pref_rows):.1f}km")
+            rows.extend(pref_rows)
+
+    rows.sort(key=lambda r: (r[0] == "river", r[1], r[3]))
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    with open(OUTPUT_PATH, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["kind", "feature", "name", "municipality", "prefecture", "length_km"])
+        for kind, feature, name, code, km in rows:
+            writer.writerow([kind, feature, name, code, code[:2], f"{km:.3f}"])
+
+    by_pref = {}
+    for kind, feature, name, code, km in rows:
+        entry = by_pref.setdefault((kind, feature, name, code[:2]), [0, 0.0])
+        entry[0] += 1
+        entry[1] += km
+    with open(PREFECTURES_OUTPUT_PATH, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["kind", "feature", "name", "prefecture", "municipalities", "length_km"])
+        for (kind, feature, name, pref), (count, km) in by_pref.items():
+            writer.writerow([kind, feature, name, pref, count, f"{km:.3f}"])
+
+    with open(ROADS_DATA_PATH, encoding="utf-8") as f:
+        expected = {("route", r["number"]): r["length"] for r in json.load(f)["roads"]}
+    with open(RIVERS_DATA_PATH, encoding="utf-8") as f:
+        expected.update({("river", r["name"]): r["length"] for r in json.load(f)["rivers"]})
+    totals = {}
+    for kind, feature, name, _, km in rows:
+        totals[(kind, feature, name)] = totals.get((kind, feature, name), 0.0) + km
+    print("\nLengths differing from the hand-entered values:")
+    for (kind, feature, name), km in totals.items():
+        hand = expected.get((kind, feature))
+        if hand and abs(km - hand) > LENGTH_TOLERANCE * hand:
+            print(f"  {name}: {km:.1f}km clipped, {hand}km hand-entered ({km / hand:.0%})")
+
+    elapsed = time.perf_counter() - start
+    print(f"\nTotal: {len(rows)} rows for {len(totals)} features ({len(by_pref)} feature/prefecture pairs) "
+          f"in {elapsed:.1f}s -> {OUTPUT_PATH}, {os.path.basename(PREFECTURES_OUTPUT_PATH)}")
+
+
+if __name__ == "__main__":
+    main()
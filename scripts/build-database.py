@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Build a single SQLite database from the generated outputs and src/data/*.json.
+
+Tables in build/geodictionary.sqlite:
+  features        one row per municipality (layer 'municipality') and oaza
+                  (layer 'oaza'): code, name, reading, pref_code, parent_code
+                  and the geometry as a compact blob (see scripts/geocodec.py)
+  feature_bbox    R*Tree over feature bboxes, keyed by features.id
+  names           FTS5 (trigram) over the names and readings of features,
+                  prefectures, roads, rivers and area-code cities
+  prefectures, roads, road_prefectures, rivers, river_prefectures, area_codes
+  documents       every src/data/*.json file verbatim, by file name
+
+Example queries:
+  -- oaza whose bbox contains a point (CROSS JOIN keeps the R*Tree as the outer loop)
+  SELECT f.code, f.name FROM feature_bbox b CROSS JOIN features f ON f.id = b.id
+  WHERE b.xmin <= 139.7 AND b.xmax >= 139.7 AND b.ymin <= 35.69 AND b.ymax >= 35.69
+    AND f.layer = 'oaza';
+  -- names containing 3 or more characters (shorter queries: features.name LIKE)
+  SELECT kind, ref, name FROM names WHERE names MATCH '西新宿';
+
+Run scripts/prepare-geojson.py and scripts/prepare-oaza.py first.
+"""
+import json
+import os
+import sqlite3
+import time
+
+from geocodec import encode_geometry
+from geoutil import bbox
+from municipalities import match_features
+from project import BUILD_DIR, GEOJSON_DIR, OAZA_DIR, PREF_CODES, SRC_DATA_DIR
+
+OUTPUT_PATH = os.path.join(BUILD_DIR, "geodictionary.sqlite")
+
+DECIMALS = 4  # Precision of features without properties.precision (as in the prepare scripts)
+
+SCHEMA = """
+CREATE TABLE prefectures (
+    code TEXT PRIMARY KEY, name TEXT NOT NULL, name_en TEXT, region TEXT, lat REAL, lng REAL
+);
+CREATE TABLE features (
+    id INTEGER PRIMARY KEY,
+    layer TEXT NOT NULL,
+    code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    reading TEXT,
+    pref_code TEXT NOT NULL,
+    parent_code TEXT,
+    geometry BLOB NOT NULL
+);
+CREATE UNIQUE INDEX features_code ON features (layer, code);
+CREATE INDEX features_parent ON features (parent_code);
+CREATE INDEX features_name ON features (name);
+CREATE VIRTUAL TABLE feature_bbox USING rtree (id, xmin, xmax, ymin, ymax);
+CREATE TABLE roads (
+    number INTEGER PRIMARY KEY, name TEXT NOT NULL, category TEXT,
+    start_point TEXT, end_point TEXT, length REAL, tips TEXT
+);
+CREATE TABLE road_prefectures (number INTEGER NOT NULL, pref_code TEXT NOT NULL, PRIMARY KEY (pref_code, number));
+CREATE TABLE rivers (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL, reading TEXT, system TEXT, class INTEGER,
+    length REAL, basin_area REAL, source TEXT, mouth TEXT, tips TEXT
+);
+CREATE TABLE river_prefectures (river_id INTEGER NOT NULL, pref_code TEXT NOT NULL, PRIMARY KEY (pref_code, river_id));
+CREATE TABLE area_codes (
+    code TEXT NOT NULL, city TEXT NOT NULL, pref_code TEXT NOT NULL, pref_name TEXT, region TEXT
+);
+CREATE INDEX area_codes_code ON area_codes (code);
+CREATE TABLE documents (name TEXT PRIMARY KEY, body TEXT NOT NULL);
+CREATE VIRTUAL TABLE names USING fts5 (name, reading, kind UNINDEXED, ref UNINDEXED, tokenize = 'trigram');
+"""
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def insert_features(db, layer, features, pref_code, parent_code=None, readings=None):
+    """Insert GeoJSON features with their bbox and FTS rows; return the count.
+
+    readings maps feature codes to readings; with it, a feature that has no
+    reading raises ValueError instead of going into the names index without.
+    """
+    cur = db.cursor()
+    boxes, names = [], []
+    for feat in features:
+        props = feat["properties"]
+        reading = None
+        if readings is not None:
+            reading = readings.get(props["code"])
+            if not reading:
+                raise ValueError(f"{props['code']} {props['name']}: no reading in municipalities.json")
+        blob = encode_geometry(feat["geometry"], props.get("precision", DECIMALS))
+        cur.execute("INSERT INTO features (layer, code, name, reading, pref_code, parent_code, geometry) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (layer, props["code"], props["name"], reading, pref_code, parent_code, blob))
+        xmin, ymin, xmax, ymax = bbox(feat["geometry"]["coordinates"])
+        boxes.append((cur.lastrowid, xmin, xmax, ymin, ymax))
+        names.append((props["name"], reading, layer, props["code"]))
+    cur.executemany("INSERT INTO feature_bbox VALUES (?, ?, ?, ?, ?)", boxes)
+    cur.executemany("INSERT INTO names (name, reading, kind, ref) VALUES (?, ?, ?, ?)", names)
+    return len(boxes)
+
+
+def insert_reference_data(db):
+    """Load src/data/*.json: structured tables plus every file verbatim in documents."""
+    for fname in sorted(os.listdir(SRC_DATA_DIR)):
+        if fname.endswith(".json"):
+            with open(os.path.join(SRC_DATA_DIR, fname), encoding="utf-8") as f:
+                db.execute("INSERT INTO documents VALUES (?, ?)", (fname, f.read()))
+
+    prefectures = load_json(os.path.join(SRC_DATA_DIR, "municipalities.json"))["prefectures"]
+    db.executemany("INSERT INTO prefectures VALUES (?, ?, ?, ?, ?, ?)",
+                   [(p["code"], p["name"], p.get("nameEn"), p.get("region"), p.get("lat"), p.get("lng"))
+                    for p in prefectures])
+    db.executemany("INSERT INTO names (name, reading, kind, ref) VALUES (?, NULL, 'prefecture', ?)",
+                   [(p["name"], p["code"]) for p in prefectures])
+
+    roads = load_json(os.path.join(SRC_DATA_DIR, "roads.json"))["roads"]
+    db.executemany("INSERT INTO roads VALUES (?, ?, ?, ?, ?, ?, ?)",
+                   [(r["number"], r["name"], r.get("category"), r.get("startPoint"), r.get("endPoint"),
+                     r.get("length"), r.get("tips")) for r in roads])
+    db.executemany("INSERT INTO road_prefectures VALUES (?, ?)",
+                   [(r["number"], p) for r in roads for p in r["prefectures"]])
+    db.executemany("INSERT INTO names (name, reading, kind, ref) VALUES (?, NULL, 'road', ?)",
+                   [(r["name"], str(r["number"])) for r in roads])
+
+    rivers = load_json(os.path.join(SRC_DATA_DIR, "rivers.json"))["rivers"]
+    db.executemany("INSERT INTO rivers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                   [(i, r["name"], r.get("reading"), r.get("system"), r.get("class"), r.get("length"),
+                     r.get("basinArea"), r.get("source"), r.get("mouth"), r.get("tips"))
+                    for i, r in enumerate(rivers, 1)])
+    db.executemany("INSERT INTO river_prefectures VALUES (?, ?)",
+                   [(i, p) for i, r in enumerate(rivers, 1) for p in r["prefectures"]])
+    db.executemany("INSERT INTO names (name, reading, kind, ref) VALUES (?, ?, 'river', ?)",
+                   [(r["name"], r.get("reading"), str(i)) for i, r in enumerate(rivers, 1)])
+
+    area_codes = load_json(os.path.join(SRC_DATA_DIR, "area-codes.json"))["areaCodes"]
+    db.executemany("INSERT INTO area_codes VALUES (?, ?, ?, ?, ?)",
+                   [(a["code"], a["city"], a["prefCode"], a.get("prefName"), a.get("region")) for a in area_codes])
+    db.executemany("INSERT INTO names (name, reading, kind, ref) VALUES (?, NULL, 'area_code', ?)",
+                   [(a["city"], a["code"]) for a in area_codes])
+
+    return prefectures
+
+
+def main():
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    tmp_path = OUTPUT_PATH + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    start = time.perf_counter()
+    db = sqlite3.connect(tmp_path)
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    db.executescript(SCHEMA)
+
+    prefectures = {p["code"]: p for p in insert_reference_data(db)}
+
+    oaza_files = sorted(f for f in os.listdir(OAZA_DIR) if f.endswith(".json") and f != "meta.json")
+    total_munis = total_oaza = failed = 0
+    for pref in PREF_CODES:
+        print(f"  Loading {pref}...", end=" ", flush=True)
+        try:
+            munis = load_json(os.path.join(GEOJSON_DIR, f"{pref}.json"))["features"]
+            readings = {code: reading for code, _, reading, _ in match_features(prefectures[pref], munis)}
+            n_munis = insert_features(db, "municipality", munis, pref, readings=readings)
+            n_oaza = 0
+            for fname in oaza_files:
+                if fname.startswith(pref):
+                    feats = load_json(os.path.join(OAZA_DIR, fname))["features"]
+                    n_oaza += insert_features(db, "oaza", feats, pref, parent_code=fname[:-len(".json")])
+            db.commit()
+            total_munis += n_munis
+            total_oaza += n_oaza
+            print(f"{n_munis} municipalities, {n_oaza} oaza")
+        except Exception as e:
+            failed += 1
+            print(f"ERROR: {e}")
+    if failed:
+        db.close()
+        os.remove(tmp_path)
+        raise SystemExit(f"\n{failed} prefectures failed; {OUTPUT_PATH} left unchanged")
+
+    db.execute("INSERT INTO names (names) VALUES ('optimize')")
+    db.execute("ANALYZE")
+    db.commit()
+    db.execute("VACUUM")
+    db.close()
+    os.replace(tmp_path, OUTPUT_PATH)
+
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(OUTPUT_PATH)
+    print(f"\nTotal: {total_munis} municipalities, {total_oaza} oaza, "
+          f"{size // (1024 * 1024)}MB in {elapsed:.1f}s -> {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Pack the municipality and oaza boundary outputs into memory-mapped feature
+stores for the Python tools (see scripts/featurestore.py for the format).
+
+Outputs to build/:
+  municipalities.store   every feature of public/data/geojson/*.json
+  oaza.store             every feature of public/data/oaza/*.json
+
+Run scripts/prepare-geojson.py and scripts/prepare-oaza.py first.
+"""
+import json
+import os
+import time
+
+from featurestore import FeatureStore, write_store
+from geoutil import bbox
+from project import BUILD_DIR, GEOJSON_DIR, OAZA_DIR, PREF_CODES
+
+OUTPUT_DIR = BUILD_DIR
+
+DECIMALS = 4  # Precision of features without properties.precision (as in the prepare scripts)
+
+
+def iter_records(paths):
+    """Yield (code, name, bbox, geometry, decimals) for every feature in the files."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            features = json.load(f)["features"]
+        for feat in features:
+            props = feat["properties"]
+            geom = feat["geometry"]
+            yield props["code"], props["name"], bbox(geom["coordinates"]), geom, props.get("precision", DECIMALS)
+
+
+def build(name, paths):
+    """Write one store and print its size and a random-access timing."""
+    output_path = os.path.join(OUTPUT_DIR, f"{name}.store")
+    start = time.perf_counter()
+    count = write_store(output_path, iter_records(paths))
+    elapsed = time.perf_counter() - start
+
+    with FeatureStore(output_path) as store:
+        t = time.perf_counter()
+        feat = store.get(store[count // 2].code)
+        feat.rings
+        lookup_us = (time.perf_counter() - t) * 1e6
+    size = os.path.getsize(output_path)
+    print(f"  {name}.store: {count} features, {size // 1024}KB in {elapsed:.1f}s "
+          f"(lookup + decode {lookup_us:.0f}us)")
+
+
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    build("municipalities", [os.path.join(GEOJSON_DIR, f"{code}.json") for code in PREF_CODES])
+    build("oaza", [os.path.join(OAZA_DIR, f) for f in sorted(os.listdir(OAZA_DIR))
+                   if f.endswith(".json") and f != "meta.json"])
+
+
+if __name__ == "__main__":
+    main()
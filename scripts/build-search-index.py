@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Build the sharded name/reading search index for the client.
+
+Indexes every searchable name without any geometry:
+  prefectures, municipalities, designated cities  src/data/municipalities.json
+  and their wards (with readings)
+  municipality codes                              public/data/geojson/*.json
+  oaza names                                      public/data/oaza/*.json
+  national routes and rivers                      src/data/roads.json, rivers.json
+
+Names and readings are normalized (scripts/textutil.py) into keys; the 大字/字
+prefix of oaza names is not part of the key. A query is answered from the
+single shard of its first character:
+
+  docs     [name, reading, layer, ref] of every entry in the shard
+  prefix   first two key characters -> docs whose key starts with them
+  bigrams  character bigram -> docs containing it past the first position
+
+A one-character query reads the prefix lists under that character; a longer
+one reads prefix[q[:2]] and bigrams[q[:2]] and keeps the docs whose key
+contains q. Hits are ordered by layer, then exact > prefix > substring match,
+then name length. Posting lists are complete and stored in that rank order,
+so the result limit is applied only after the substring check.
+
+layer indexes manifest.json "layers"; ref is the prefecture or municipality
+code, oaza code, route number or river name. Display context (region,
+prefecture + municipality name, route category, river system) is in the
+manifest "context", keyed by code, route number or river name; oaza use their
+municipality's entry (code[1:6]). Docs repeated across shards stay small.
+
+Kana keys shard by gojūon row (kana-a, kana-ka, ...), everything else into
+NUM_SHARDS buckets by code point (x00 ... xff). search() below is the
+reference query implementation for a client. No page reads the index yet,
+so scripts/build.py only builds it when named (build.py search-index).
+
+Outputs to public/data/search/: {shard}.json and manifest.json.
+Run scripts/prepare-geojson.py and scripts/prepare-oaza.py first.
+"""
+import json
+import os
+import time
+import unicodedata
+
+from municipalities import load_prefectures, match_features
+from project import GEOJSON_DIR, OAZA_DIR, PUBLIC_DATA_DIR, SRC_DATA_DIR
+from textutil import ngrams, normalize
+
+OUTPUT_DIR = os.path.join(PUBLIC_DATA_DIR, "search")
+
+NUM_SHARDS = 256  # Buckets for keys not starting with kana
+
+LAYERS = ["prefecture", "municipality", "road", "river", "oaza"]
+# Lower sorts first among equally good matches
+LAYER_RANK = {"prefecture": 0, "municipality": 1, "road": 2, "river": 2, "oaza": 3}
+
+KANA_ROWS = {
+    "a": "あいうえお", "ka": "かきくけこ", "sa": "さしすせそ", "ta": "たちつてと", "na": "なにぬねの",
+    "ha": "はひふへほ", "ma": "まみむめも", "ya": "やゆよ", "ra": "らりるれろ", "wa": "わゐゑをんゔ",
+}
+_KANA_ROW_OF = {}
+for _row, _chars in KANA_ROWS.items():
+    for _ch in _chars:
+        _KANA_ROW_OF[_ch] = _row
+
+
+def shard_of(ch):
+    """Shard name for a key starting with the (normalized) character ch."""
+    if "ぁ" <= ch <= "ゖ":
+        # Small and voiced kana go with their base kana (ぱ -> は, ゃ -> や)
+        base = unicodedata.normalize("NFD", ch)[0]
+        base = {"ぁ": "あ", "ぃ": "い", "ぅ": "う", "ぇ": "え", "ぉ": "お", "っ": "つ",
+                "ゃ": "や", "ゅ": "ゆ", "ょ": "よ", "ゎ": "わ", "ゕ": "か", "ゖ": "け"}.get(base, base)
+        return f"kana-{_KANA_ROW_OF.get(base, 'a')}"
+    return f"x{ord(ch) % NUM_SHARDS:02x}"
+
+
+def load_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def collect_entries():
+    """Return ([name, reading, layer, ref] for everything searchable, context by ref)."""
+    entries, context = [], {}
+    prefectures = load_prefectures()
+    for pref in prefectures:
+        entries.append([pref["name"], None, "prefecture", pref["code"]])
+        context[pref["code"]] = pref["region"]
+        features = load_json(os.path.join(GEOJSON_DIR, f"{pref['code']}.json"))["features"]
+        for code, name, reading, parent in match_features(pref, features):
+            entries.append([name, reading, "municipality", code])
+            context[code] = pref["name"] + (parent or "") + name
+
+    for fname in sorted(os.listdir(OAZA_DIR)):
+        if fname.endswith(".json") and fname != "meta.json":
+            for feat in load_json(os.path.join(OAZA_DIR, fname))["features"]:
+                props = feat["properties"]
+                entries.append([props["name"], None, "oaza", props["code"]])
+
+    for road in load_json(os.path.join(SRC_DATA_DIR, "roads.json"))["roads"]:
+        entries.append([road["name"], None, "road", road["number"]])
+        context[str(road["number"])] = road["category"]
+    for river in load_json(os.path.join(SRC_DATA_DIR, "rivers.json"))["rivers"]:
+        entries.append([river["name"], river.get("reading"), "river", river["name"]])
+        context[river["name"]] = river["system"]
+    return entries, context
+
+
+def build_shards(entries):
+    """Group entries into shards with their prefix and bigram postings."""
+    entries.sort(key=lambda e: (LAYER_RANK[e[2]], len(e[0]), e[0]))
+    shards = {}
+
+    def shard(name):
+        if name not in shards:
+            shards[name] = {"docs": [], "doc_index": {}, "prefix": {}, "bigrams": {}}
+        return shards[name]
+
+    def post(table, key, s, i):
+        postings = table.setdefault(key, [])
+        local = s["doc_index"].get(i)
+        if local is None:
+            local = s["doc_index"][i] = len(s["docs"])
+            name, reading, layer, ref = entries[i]
+            s["docs"].append([name, reading, LAYERS.index(layer), ref])
+        if not postings or postings[-1] != local:
+            postings.append(local)
+
+    for i, (name, reading, *_rest) in enumerate(entries):
+        for key in {normalize(name.removeprefix("大字").removeprefix("字")), normalize(reading or "")}:
+            if not key:
+                continue
+            s = shard(shard_of(key[0]))
+            post(s["prefix"], key[:2], s, i)
+            for gram in ngrams(key, 2)[1:]:
+                s = shard(shard_of(gram[0]))
+                post(s["bigrams"], gram, s, i)
+    for s in shards.values():
+        del s["doc_index"]
+    return shards
+
+
+def search(query, limit=20):
+    """Search the written index the way the client does; return [name, reading, layer, ref] hits."""
+    key = normalize(query)
+    if not key:
+        return []
+    with open(os.path.join(OUTPUT_DIR, f"{shard_of(key[0])}.json"), encoding="utf-8") as f:
+        shard = json.load(f)
+    docs = shard["docs"]
+
+    def keys(doc):
+        return normalize(doc[0].removeprefix("大字").removeprefix("字")), normalize(doc[1] or "")
+
+    if len(key) == 1:
+        candidates = [i for prefix, ids in shard["prefix"].items() if prefix[0] == key for i in ids]
+        prefix_hits, other_hits = sorted(set(candidates)), []
+    else:
+        prefix_hits = [i for i in shard["prefix"].get(key[:2], []) if any(k.startswith(key) for k in keys(docs[i]))]
+        other_hits = [i for i in shard["bigrams"].get(key[:2], []) if any(key in k for k in keys(docs[i]))]
+    # Layer first, then exact > prefix > substring match; docs are already in rank order
+    match = {}
+    for i in other_hits:
+        match[i] = 2
+    for i in prefix_hits:
+        match[i] = 0 if key in keys(docs[i]) else 1
+    hits = sorted(match, key=lambda i: (LAYER_RANK[LAYERS[docs[i][2]]], match[i], i))
+    return [docs[i] for i in hits[:limit]]
+
+
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    start = time.perf_counter()
+    entries, context = collect_entries()
+    shards = build_shards(entries)
+
+    total = largest = 0
+    for name, data in sorted(shards.items()):
+        path = os.path.join(OUTPUT_DIR, f"{name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        size = os.path.getsize(path)
+        total += size
+        largest = max(largest, size)
+
+    manifest = {
+        "shards": sorted(shards),
+        "numShards": NUM_SHARDS,
+        "kanaRows": KANA_ROWS,
+        "layers": LAYERS,
+        "context": context,
+        "entries": len(entries),
+    }
+    with open(os.path.join(OUTPUT_DIR, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+
+    elapsed = time.perf_counter() - start
+    print(f"Indexed {len(entries)} names into {len(shards)} shards in {elapsed:.1f}s")
+    print(f"  Total: {total // 1024}KB, largest shard {largest // 1024}KB")
+
+
+if __name__ == "__main__":
+    main()
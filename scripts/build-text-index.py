@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Build the full-text index over the tips transcript and the knowledge files.
+
+Documents:
+  transcript  src/data/transcripts/geoguessr-japan-300tips.txt, in passages of
+              PASSAGE_LINES subtitle lines (title = start timestamp)
+  knowledge   one per section of src/data/knowledge/*.json (title = section title)
+
+Text is normalized (scripts/textutil.py) and split into overlapping character
+bigrams, which are the index terms. Each term's postings are doc id deltas,
+term frequencies and the offset of its first occurrence in the original text,
+all as unsigned LEB128 varints, base64-encoded.
+
+Outputs to public/data/textsearch/:
+  manifest.json       BM25 parameters and [source, ref, title, length] per doc
+  terms/{xx}.json     term -> postings for terms whose first character falls
+                      in bucket xx (code point % NUM_SHARDS)
+  docs/{n}.json       original text of docs n * DOC_CHUNK ... (for snippets)
+
+A query fetches the manifest, the term shard of each distinct leading
+character of its bigrams, and the doc chunks of the hits it shows. A
+one-character query matches every term starting with that character.
+"""
+import base64
+import glob
+import json
+import math
+import os
+import re
+import time
+
+from project import PUBLIC_DATA_DIR, SRC_DATA_DIR
+from textutil import ngrams, normalize, normalize_with_offsets
+
+TRANSCRIPT_PATH = os.path.join(SRC_DATA_DIR, "transcripts", "geoguessr-japan-300tips.txt")
+KNOWLEDGE_DIR = os.path.join(SRC_DATA_DIR, "knowledge")
+OUTPUT_DIR = os.path.join(PUBLIC_DATA_DIR, "textsearch")
+
+PASSAGE_LINES = 8  # Subtitle lines per transcript passage (~20 seconds)
+NUM_SHARDS = 64  # Term shards by code point of the first character
+DOC_CHUNK = 32  # Docs per snippet text file
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SKIP_KEYS = {"id", "image", "headerImage", "importance"}
+LINE_PATTERN = re.compile(r"^\[(\d\d:\d\d:\d\d)\]\s*(.*)$")
+
+
+def shard_of(term):
+    """Term shard name: bucket of the term's first character."""
+    return f"{ord(term[0]) % NUM_SHARDS:02x}"
+
+
+def _strings(value):
+    """Every string in a nested JSON value, skipping ids and image paths."""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for v in value:
+            yield from _strings(v)
+    elif isinstance(value, dict):
+        for k, v in value.items():
+            if k not in SKIP_KEYS:
+                yield from _strings(v)
+
+
+def collect_docs():
+    """Return [source, ref, title, text] for every document."""
+    docs = []
+    with open(TRANSCRIPT_PATH, encoding="utf-8") as f:
+        lines = [m.groups() for m in map(LINE_PATTERN.match, f.read().splitlines()) if m]
+    for i in range(0, len(lines), PASSAGE_LINES):
+        passage = lines[i:i + PASSAGE_LINES]
+        docs.append(["transcript", passage[0][0], passage[0][0], "\n".join(text for _, text in passage)])
+
+    for path in sorted(glob.glob(os.path.join(KNOWLEDGE_DIR, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        name = os.path.splitext(os.path.basename(path))[0]
+        for section in data["sections"]:
+            docs.append(["knowledge", f"{name}/{section['id']}", section["title"],
+                         "\n".join(_strings(section))])
+    return docs
+
+
+def _varint(out, n):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def encode_postings(postings):
+    """[(doc, tf, offset), ...] sorted by doc -> base64 varint string."""
+    out = bytearray()
+    _varint(out, len(postings))
+    prev = 0
+    for doc, tf, offset in postings:
+        _varint(out, doc - prev)
+        _varint(out, tf)
+        _varint(out, offset)
+        prev = doc
+    return base64.b64encode(bytes(out)).decode("ascii")
+
+
+def decode_postings(text):
+    """Inverse of encode_postings()."""
+    data = base64.b64decode(text)
+    values, n, shift = [], 0, 0
+    for b in data:
+        n |= (b & 0x7F) << shift
+        shift += 7
+        if b < 0x80:
+            values.append(n)
+            n = shift = 0
+    postings, doc = [], 0
+    for i in range(1, len(values), 3):
+        doc += values[i]
+        postings.append((doc, values[i + 1], values[i + 2]))
+    return postings
+
+
+def build_index(docs):
+    """Return (term -> [(doc, tf, first offset)], normalized doc lengths)."""
+    index, lengths = {}, []
+    for doc_id, (*_, text) in enumerate(docs):
+        norm, offsets = normalize_with_offsets(text)
+        lengths.append(len(norm))
+        first, counts = {}, {}
+        for pos, gram in enumerate(ngrams(norm, 2)):
+            counts[gram] = counts.get(gram, 0) + 1
+            first.setdefault(gram, offsets[pos])
+        for gram, tf in counts.items():
+            index.setdefault(gram, []).append((doc_id, tf, first[gram]))
+    return index, lengths
+
+
+def search(query, limit=10):
+    """Rank docs for a query from the written index; return (score, doc, snippet offset)."""
+    with open(os.path.join(OUTPUT_DIR, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    key = normalize(query)
+    terms = set(ngrams(key, 2))
+    shards = {}
+    for term in terms:
+        name = shard_of(term)
+        if name not in shards:
+            with open(os.path.join(OUTPUT_DIR, "terms", f"{name}.json"), encoding="utf-8") as f:
+                shards[name] = json.load(f)
+    if len(key) == 1:
+        terms = {t for t in shards[shard_of(key)] if t.startswith(key)}
+
+    n, avgdl = len(manifest["docs"]), manifest["avgdl"]
+    k1, b = manifest["k1"], manifest["b"]
+    scores, snippet = {}, {}
+    for term in terms:
+        encoded = shards[shard_of(term)].get(term)
+        if encoded is None:
+            continue
+        postings = decode_postings(encoded)
+        idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+        for doc, tf, offset in postings:
+            dl = manifest["docs"][doc][3]
+            scores[doc] = scores.get(doc, 0) + idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))
+            snippet[doc] = min(snippet.get(doc, offset), offset)
+    ranked = sorted(scores, key=lambda d: -scores[d])[:limit]
+    return [(scores[d], manifest["docs"][d], snippet[d]) for d in ranked]
+
+
+def main():
+    start = time.perf_counter()
+    docs = collect_docs()
+    index, lengths = build_index(docs)
+
+    shards = {}
+    for term in sorted(index):
+        shards.setdefault(shard_of(term), {})[term] = encode_postings(index[term])
+
+    os.makedirs(os.path.join(OUTPUT_DIR, "terms"), exist_ok=True)
+    os.makedirs(os.path.join(OUTPUT_DIR, "docs"), exist_ok=True)
+    term_bytes = largest = 0
+    for name, terms in shards.items():
+        path = os.path.join(OUTPUT_DIR, "terms", f"{name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False, separators=(",", ":"))
+        size = os.path.getsize(path)
+        term_bytes += size
+        largest = max(largest, size)
+
+    for chunk in range(0, len(docs), DOC_CHUNK):
+        with open(os.path.join(OUTPUT_DIR, "docs", f"{chunk // DOC_CHUNK}.json"), "w", encoding="utf-8") as f:
+            json.dump([text for *_, text in docs[chunk:chunk + DOC_CHUNK]], f,
+                      ensure_ascii=False, separators=(",", ":"))
+
+    manifest = {
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "avgdl": sum(lengths) / len(lengths),
+        "numShards": NUM_SHARDS,
+        "docChunk": DOC_CHUNK,
+        "docs": [[source, ref, title, length] for (source, ref, title, _), length in zip(docs, lengths)],
+    }
+    with open(os.path.join(OUTPUT_DIR, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(",", ":"))
+    manifest_size = os.path.getsize(os.path.join(OUTPUT_DIR, "manifest.json"))
+
+    elapsed = time.perf_counter() - start
+    print(f"Indexed {len(docs)} docs, {len(index)} terms in {elapsed:.1f}s")
+    print(f"  manifest.json: {manifest_size // 1024}KB")
+    print(f"  terms/: {len(shards)} shards, {term_bytes // 1024}KB (largest {largest // 1024}KB)")
+
+
+if __name__ == "__main__":
+    main()
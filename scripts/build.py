@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Run the data build as a graph of stages, in parallel where the graph allows
+and skipping stages whose inputs haven't changed.
+
+Stages (see STAGES for inputs and outputs):
+  download         download-sources.py     source files -> build/sources/
+  municipalities   prepare-geojson.py      -> public/data/geojson/
+  oaza             prepare-oaza.py         -> public/data/oaza/
+  roads, rivers    generate-*.py           -> src/data/
+  japan-map        generate-japan-map.py   -> src/data/japan-map-paths.json
+  overview         generate-overview.py    -> public/data/overview/
+  hitgrid          generate-hit-raster.py  -> public/data/hitgrid/ (only when named)
+  search-index     build-search-index.py   -> public/data/search/ (only when named)
+  text-index       build-text-index.py     -> public/data/textsearch/
+  feature-store    build-feature-store.py  -> build/*.store
+  database         build-database.py       -> build/geodictionary.sqlite
+  parquet          export-parquet.py       -> build/parquet/ (only when named)
+  compress         compress-data.py        -> build/compressed/
+  payload          payload-report.py       -> build/payload-report.json; fails
+                                              when a payload budget is exceeded
+
+Each stage runs as a subprocess once its dependencies have finished, up to
+--jobs at a time; its output goes to build/logs/{stage}.log. A stage is
+skipped when its fingerprint matches the last successful run (kept in
+build/fingerprints.json) and its outputs exist. The fingerprint covers the
+stage's script and the scripts/ modules it imports (by content) and its input
+files (by size and mtime), so an edit anywhere reruns exactly the stages
+downstream of it.
+
+--watch polls the inputs of the selected stages and rebuilds whenever one
+changes, e.g. `build.py --watch roads rivers` while editing the generators.
+
+Usage:
+  python3 scripts/build.py                     # every default stage
+  python3 scripts/build.py search-index        # one stage and what it needs
+  python3 scripts/build.py --force oaza        # rerun even if up to date
+  python3 scripts/build.py --dry-run
+  python3 scripts/build.py --watch roads rivers
+"""
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from project import BUILD_DIR, PROJECT_ROOT, SCRIPTS_DIR
+
+FINGERPRINTS_PATH = os.path.join(BUILD_DIR, "fingerprints.json")
+LOG_DIR = os.path.join(BUILD_DIR, "logs")
+
+WATCH_INTERVAL = 1.0  # Seconds between input polls in --watch mode
+
+# inputs/outputs are glob patterns relative to the project root. Stages in
+# `after` are not pulled into a build, but run first when they are part of it.
+Stage = namedtuple("Stage", "script deps inputs outputs default after", defaults=(True, ()))
+
+GEOJSON = "public/data/geojson/*.json"
+OAZA = "public/data/oaza/*.json"
+MUNICIPALITIES_DATA = "src/data/municipalities.json"
+
+STAGES = {
+    "download": Stage("download-sources.py", [], [],
+                      ["build/sources/municipality/*.json", "build/sources/oaza/*.json"]),
+    "municipalities": Stage("prepare-geojson.py", ["download"], ["build/sources/municipality/*.json"], [GEOJSON]),
+    "oaza": Stage("prepare-oaza.py", ["download"], ["build/sources/oaza/*.json"], [OAZA]),
+    "roads": Stage("generate-roads.py", [], [],
+                   ["src/data/roads.json", "src/data/roads.columnar.json", "src/data/roads/index.json"]),
+    "rivers": Stage("generate-rivers.py", [], [],
+                    ["src/data/rivers.json", "src/data/rivers.columnar.json", "src/data/rivers/index.json"]),
+    "japan-map": Stage("generate-japan-map.py", ["municipalities"], [GEOJSON, MUNICIPALITIES_DATA],
+                       ["src/data/japan-map-paths.json"]),
+    "overview": Stage("generate-overview.py", ["municipalities"], [GEOJSON, MUNICIPALITIES_DATA],
+                      ["public/data/overview/*.json"]),
+    "hitgrid": Stage("generate-hit-raster.py", ["municipalities", "oaza"], [GEOJSON, OAZA],
+                     ["public/data/hitgrid/*.png"], default=False),
+    "search-index": Stage("build-search-index.py", ["municipalities", "oaza", "roads", "rivers"],
+                          [GEOJSON, OAZA, MUNICIPALITIES_DATA, "src/data/roads.json", "src/data/rivers.json"],
+                          ["public/data/search/manifest.json"], default=False),
+    "text-index": Stage("build-text-index.py", [], ["src/data/transcripts/*.txt", "src/data/knowledge/*.json"],
+                        ["public/data/textsearch/manifest.json"]),
+    "feature-store": Stage("build-feature-store.py", ["municipalities", "oaza"], [GEOJSON, OAZA],
+                           ["build/municipalities.store", "build/oaza.store"]),
+    "database": Stage("build-database.py", ["municipalities", "oaza", "roads", "rivers", "japan-map"],
+                      [GEOJSON, OAZA, "src/data/*.json"], ["build/geodictionary.sqlite"]),
+    "parquet": Stage("export-parquet.py", ["municipalities", "oaza"], [GEOJSON, OAZA],
+                     ["build/parquet/*.parquet"], default=False),
+    "compress": Stage("compress-data.py", ["municipalities", "oaza", "overview", "text-index"],
+                      ["public/data/**/*.json"], ["build/compressed/geojson/*.gz"],
+                      after=("search-index", "hitgrid")),
+    "payload": Stage("payload-report.py", ["compress", "roads", "rivers"],
+                     ["public/data/**/*.json", "public/data/**/*.ndjson", "public/data/**/*.png",
+                      "src/data/*.columnar.json", "src/data/roads/**/*.json", "src/data/rivers/**/*.json",
+                      "scripts/payload-budgets.json"],
+                     ["build/payload-report.json"]),
+}
+
+
+def closure(targets):
+    """The targets and everything they depend on, in dependency order."""
+    order = []
+
+    def visit(name):
+        if name not in order:
+            for dep in STAGES[name].deps:
+                visit(dep)
+            order.append(name)
+
+    for name in targets:
+        visit(name)
+    return order
+
+
+def _code_files(script):
+    """The script and every scripts/ module it imports, directly or not."""
+    found, todo = [], [os.path.join(SCRIPTS_DIR, script)]
+    while todo:
+        path = todo.pop()
+        if path in found:
+            continue
+        found.append(path)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                module_path = os.path.join(SCRIPTS_DIR, module.split(".")[0] + ".py")
+                if os.path.exists(module_path):
+                    todo.append(module_path)
+    return sorted(found)
+
+
+def _expand(patterns):
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(os.path.join(PROJECT_ROOT, pattern), recursive=True))
+    return sorted(paths)
+
+
+def fingerprint(name):
+    """Hash of a stage's code (by content) and inputs (by path, size and mtime)."""
+    stage = STAGES[name]
+    h = hashlib.sha256(name.encode())
+    for path in _code_files(stage.script):
+        with open(path, "rb") as f:
+            h.update(os.path.basename(path).encode() + b"\0" + hashlib.sha256(f.read()).digest())
+    for path in _expand(stage.inputs):
+        st = os.stat(path)
+        h.update(f"{os.path.relpath(path, PROJECT_ROOT)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+def outputs_exist(name):
+    return all(glob.glob(os.path.join(PROJECT_ROOT, pattern)) for pattern in STAGES[name].outputs)
+
+
+def load_fingerprints():
+    if not os.path.exists(FINGERPRINTS_PATH):
+        return {}
+    with open(FINGERPRINTS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_fingerprints(fingerprints):
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    with open(FINGERPRINTS_PATH + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(fingerprints, f, indent=2, sort_keys=True)
+    os.replace(FINGERPRINTS_PATH + ".tmp", FINGERPRINTS_PATH)
+
+
+def run_stage(name):
+    """Run one stage's script; return (exit code, seconds)."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(LOG_DIR, f"{name}.log"), "w", encoding="utf-8") as log:
+        proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, STAGES[name].script)],
+                              cwd=PROJECT_ROOT, stdout=log, stderr=subprocess.STDOUT)
+    return proc.returncode, time.perf_counter() - start
+
+
+def _log_tail(name, lines=5):
+    with open(os.path.join(LOG_DIR, f"{name}.log"), encoding="utf-8", errors="replace") as f:
+        return f.read().splitlines()[-lines:]
+
+
+def build(stages, jobs, force=(), dry_run=False):
+    """Run the given stages in dependency order; return {stage: state}.
+
+    A stage's state ends as "skipped" (up to date), "done", "failed" or
+    "blocked" (a dependency failed); in a dry run, "would run".
+    """
+    fingerprints = load_fingerprints()
+    state = {}
+    pending = list(stages)
+    running = {}  # future -> (stage, fingerprint)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = STAGES[name].deps
+                if any(state.get(other) in (None, "running") for other in STAGES[name].after if other in stages):
+                    continue
+                if any(state.get(dep) in ("failed", "blocked") for dep in deps):
+                    state[name] = "blocked"
+                    print(f"  {name}: blocked")
+                elif all(state.get(dep) in ("skipped", "done", "would run") for dep in deps):
+                    if len(running) >= jobs:
+                        continue
+                    fp = fingerprint(name)
+                    upstream_runs = any(state[dep] == "would run" for dep in deps)
+                    if (name not in force and not upstream_runs and fingerprints.get(name) == fp
+                            and outputs_exist(name)):
+                        state[name] = "skipped"
+                        print(f"  {name}: up to date")
+                    elif dry_run:
+                        state[name] = "would run"
+                        print(f"  {name}: would run")
+                    else:
+                        print(f"  {name}: running {STAGES[name].script}", flush=True)
+                        running[pool.submit(run_stage, name)] = (name, fp)
+                        state[name] = "running"
+                else:
+                    continue
+                pending.remove(name)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fp = running.pop(future)
+                returncode, elapsed = future.result()
+                if returncode == 0:
+                    state[name] = "done"
+                    fingerprints[name] = fp
+                    save_fingerprints(fingerprints)
+                    print(f"  {name}: done in {elapsed:.1f}s", flush=True)
+                else:
+                    state[name] = "failed"
+                    fingerprints.pop(name, None)
+                    save_fingerprints(fingerprints)
+                    print(f"  {name}: FAILED (exit {returncode}) after {elapsed:.1f}s, "
+                          f"see {os.path.relpath(LOG_DIR, PROJECT_ROOT)}/{name}.log")
+                    for line in _log_tail(name):
+                        print(f"    {line}")
+    return state
+
+
+def watch(stages, jobs):
+    """Rebuild whenever the fingerprint of any of the stages changes."""
+    print(f"\nWatching {', '.join(stages)} (Ctrl-C to stop)")
+    seen = {name: fingerprint(name) for name in stages}
+    try:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            current = {name: fingerprint(name) for name in stages}
+            if current != seen:
+                changed = [name for name in stages if current[name] != seen[name]]
+                print(f"\nChanged: {', '.join(changed)}")
+                build(stages, jobs)
+                seen = {name: fingerprint(name) for name in stages}
+    except KeyboardInterrupt:
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", metavar="stage",
+                        help=f"stages to build, with their dependencies (default: all but "
+                             f"{', '.join(name for name, stage in STAGES.items() if not stage.default)}); "
+                             f"one of {', '.join(STAGES)}")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="stages to run at once (default: CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="rerun the named stages (all stages if none are named) even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="show what would run")
+    parser.add_argument("--watch", action="store_true", help="keep rebuilding as inputs change")
+    args = parser.parse_args()
+    unknown = [name for name in args.targets if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage: {', '.join(unknown)}")
+
+    targets = args.targets or [name for name, stage in STAGES.items() if stage.default]
+    stages = closure(targets)
+    force = set(targets if args.force else ())
+
+    start = time.perf_counter()
+    state = build(stages, max(1, args.jobs), force, args.dry_run)
+    elapsed = time.perf_counter() - start
+    counts = {s: sum(1 for v in state.values() if v == s) for s in ("done", "skipped", "failed", "blocked")}
+    print(f"\nTotal: {counts['done']} run, {counts['skipped']} up to date, "
+          f"{counts['failed']} failed, {counts['blocked']} blocked in {elapsed:.1f}s")
+
+    if args.watch:
+        watch(stages, max(1, args.jobs))
+    elif counts["failed"] or counts["blocked"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Precompress the generated data files for static hosting.
+
+Every JSON/NDJSON file under public/data/ gets a gzip (and, with the brotli
+package installed, a brotli) copy at maximum level, for servers that serve
+precompressed files (nginx gzip_static / brotli_static, or a CDN upload
+step). Files whose copies are newer than the source are skipped, so a rerun
+after a partial rebuild only compresses what changed.
+
+Outputs to build/compressed/ (same layout as public/data/, plus .gz / .br).
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from compression import CODECS, COMPRESSIBLE_EXTENSIONS
+from project import BUILD_DIR, PUBLIC_DATA_DIR
+
+OUTPUT_DIR = os.path.join(BUILD_DIR, "compressed")
+
+
+def compress_file(rel_path, force=False):
+    """Write the compressed copies of one file; return {codec: bytes} for the copies written."""
+    src = os.path.join(PUBLIC_DATA_DIR, rel_path)
+    src_mtime = os.stat(src).st_mtime_ns
+    data = None
+    sizes = {}
+    for name, (ext, compress) in CODECS.items():
+        dst = os.path.join(OUTPUT_DIR, rel_path + ext)
+        if not force and os.path.exists(dst) and os.stat(dst).st_mtime_ns >= src_mtime:
+            continue
+        if data is None:
+            with open(src, "rb") as f:
+                data = f.read()
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(dst + ".tmp", "wb") as f:
+            f.write(compress(data))
+        os.replace(dst + ".tmp", dst)
+        sizes[name] = os.path.getsize(dst)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="recompress files that are up to date")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="parallel compression processes (default: CPU count)")
+    args = parser.parse_args()
+
+    paths = []
+    for root, _dirs, files in os.walk(PUBLIC_DATA_DIR):
+        for fname in files:
+            if fname.endswith(COMPRESSIBLE_EXTENSIONS):
+                paths.append(os.path.relpath(os.path.join(root, fname), PUBLIC_DATA_DIR))
+    paths.sort()
+
+    start = time.perf_counter()
+    written = {name: [0, 0] for name in CODECS}  # codec -> [files, bytes]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for sizes in pool.map(compress_file, paths, [args.force] * len(paths), chunksize=64):
+            for name, size in sizes.items():
+                written[name][0] += 1
+                written[name][1] += size
+
+    elapsed = time.perf_counter() - start
+    print(f"Compressed {len(paths)} files in {elapsed:.1f}s ({', '.join(CODECS)})")
+    for name, (count, size) in written.items():
+        print(f"  {name}: {count} files written, {size // 1024}KB")
+
+
+if __name__ == "__main__":
+    main()
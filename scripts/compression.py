@@ -0,0 +1,25 @@
+"""
+Precompression codecs shared by compress-data.py and the payload report.
+
+gzip is always available; brotli is added when the brotli package is
+installed (pip install brotli).
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# name -> (file extension, compress function)
+CODECS = {
+    "gzip": (".gz", lambda data: gzip.compress(data, GZIP_LEVEL, mtime=0)),
+}
+if brotli is not None:
+    CODECS["brotli"] = (".br", lambda data: brotli.compress(data, quality=BROTLI_QUALITY))
+
+# Text formats worth precompressing (PNGs are already deflated)
+COMPRESSIBLE_EXTENSIONS = (".json", ".ndjson", ".csv", ".txt")
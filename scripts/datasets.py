@@ -0,0 +1,201 @@
+"""
+Output helpers shared by generate-roads.py and generate-rivers.py.
+
+Each generator writes its records twice: src/data/{name}.json for the scripts
+(build-database.py, build-search-index.py) and src/data/{name}.columnar.json
+for the pages. It also writes shards, so a page can load only what it displays:
+
+  src/data/{name}/index.json              slim records (no tips/descriptions)
+  src/data/{name}/prefectures/{code}.json  full records touching a prefecture
+  src/data/{name}/regions/{id}.json        full records touching a region
+  src/data/{name}/lookup.json              inverted indexes: key -> record ids
+
+The columnar file stores the same records as one array per field instead of
+an array of objects, so keys are not repeated per record. Columns are encoded as
+
+  {"values": [...]}                   plain values (numbers, unique strings)
+  {"dict": [...], "index": [...]}     strings with repeats: distinct values + indexes
+  {"prefs": [[13, 14], ...]}          prefecture code lists as small integers
+
+Nested objects are flattened into dotted fields ("rank.length"). A field
+missing from a record is stored as null and left out again on rehydration.
+ColumnarRecords (and src/lib/columnar.ts on the client) rebuild records
+lazily, one at a time; the roads and rivers pages read them through the latter.
+"""
+import json
+import os
+
+from project import REGIONS, SRC_DATA_DIR
+
+DATA_DIR = SRC_DATA_DIR
+
+FORMATS = ("object", "columnar")
+
+# Shard file names (ids as in src/data/regions.json)
+REGION_IDS = {
+    "北海道": "hokkaido",
+    "東北": "tohoku",
+    "関東": "kanto",
+    "中部": "chubu",
+    "近畿": "kinki",
+    "中国": "chugoku",
+    "四国": "shikoku",
+    "九州": "kyushu",
+}
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    return os.path.getsize(path)
+
+
+def write_shards(name, records, index_fields):
+    """Write the index, per-prefecture and per-region shards of `records`.
+
+    Every record must have a "prefectures" list of codes. Records keep their
+    original order in every shard. Returns the total bytes written.
+    """
+    out_dir = os.path.join(DATA_DIR, name)
+    total = _write_json(os.path.join(out_dir, "index.json"),
+                        {name: [{k: r[k] for k in index_fields} for r in records]})
+
+    by_pref = {code: [] for codes in REGIONS.values() for code in codes}
+    for r in records:
+        for code in r["prefectures"]:
+            if code in by_pref:  # Unknown codes are reported by the generators
+                by_pref[code].append(r)
+    for code, items in by_pref.items():
+        total += _write_json(os.path.join(out_dir, "prefectures", f"{code}.json"),
+                             {"prefecture": code, name: items})
+
+    for region, codes in REGIONS.items():
+        items = [r for r in records if region in regions_of(r)]
+        total += _write_json(os.path.join(out_dir, "regions", f"{REGION_IDS[region]}.json"),
+                             {"region": region, "prefectures": codes, name: items})
+    return total
+
+
+def regions_of(record):
+    """Regions a record's prefectures fall in, in REGIONS order."""
+    prefs = set(record["prefectures"])
+    return [region for region, codes in REGIONS.items() if not prefs.isdisjoint(codes)]
+
+
+def build_lookup(records, id_field, keys):
+    """Build inverted indexes over `records` in a single pass.
+
+    keys maps an index name to a function returning the keys of a record.
+    Each index maps str(key) to the id_field values of its records, in
+    record order.
+    """
+    lookup = {index: {} for index in keys}
+    for r in records:
+        for index, fn in keys.items():
+            for key in fn(r):
+                lookup[index].setdefault(str(key), []).append(r[id_field])
+    return lookup
+
+
+def write_lookup(name, lookup):
+    """Write src/data/{name}/lookup.json; return its size."""
+    return _write_json(os.path.join(DATA_DIR, name, "lookup.json"), lookup)
+
+
+def _flatten(record, prefix=""):
+    for key, value in record.items():
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", value
+
+
+def _encode_column(field, values):
+    present = [v for v in values if v is not None]
+    if field == "prefectures":
+        return {"prefs": [[int(c) for c in v] for v in values]}
+    if present and all(isinstance(v, str) for v in present) and len(set(present)) * 2 <= len(present):
+        distinct = list(dict.fromkeys(present))
+        lookup = {v: i for i, v in enumerate(distinct)}
+        return {"dict": distinct, "index": [None if v is None else lookup[v] for v in values]}
+    return {"values": values}
+
+
+def to_columnar(records):
+    """Encode a list of records as {"count", "fields", "columns"}."""
+    flat = [dict(_flatten(r)) for r in records]
+    fields = list(dict.fromkeys(k for r in flat for k in r))
+    return {
+        "count": len(records),
+        "fields": fields,
+        "columns": {f: _encode_column(f, [r.get(f) for r in flat]) for f in fields},
+    }
+
+
+def _decode_column(column):
+    if "prefs" in column:
+        return lambda i: [f"{c:02d}" for c in column["prefs"][i]]
+    if "dict" in column:
+        distinct, index = column["dict"], column["index"]
+        return lambda i: None if index[i] is None else distinct[index[i]]
+    return column["values"].__getitem__
+
+
+class ColumnarRecords:
+    """Sequence view over a to_columnar() table that rebuilds records on access."""
+
+    def __init__(self, table):
+        self._count = table["count"]
+        self._getters = [(f.split("."), _decode_column(table["columns"][f])) for f in table["fields"]]
+        self._cache = {}
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        record = self._cache.get(i)
+        if record is None:
+            record = self._cache[i] = {}
+            for path, get in self._getters:
+                value = get(i)
+                if value is None:
+                    continue
+                target = record
+                for key in path[:-1]:
+                    target = target.setdefault(key, {})
+                target[path[-1]] = value
+        return record
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+
+def write_dataset(name, data, fmt="object"):
+    """Write src/data/{name}.json, or {name}.columnar.json with the records column-encoded.
+
+    data is the top-level object; data[name] holds the records. Returns the path.
+    """
+    if fmt == "columnar":
+        path = os.path.join(DATA_DIR, f"{name}.columnar.json")
+        _write_json(path, {**data, name: to_columnar(data[name])})
+    else:
+        path = os.path.join(DATA_DIR, f"{name}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def read_dataset(name, fmt="object"):
+    """Load what write_dataset() wrote; columnar records come back as ColumnarRecords."""
+    path = os.path.join(DATA_DIR, f"{name}.columnar.json" if fmt == "columnar" else f"{name}.json")
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if fmt == "columnar":
+        data[name] = ColumnarRecords(data[name])
+    return data
@@ -0,0 +1,320 @@
+"""
+Polygon dissolve via shared-edge cancellation, shared by the build scripts.
+
+Adjacent boundary polygons in the source data share their vertices exactly
+(after snapping to the 4-decimal output grid). Once every ring is oriented
+consistently (exteriors counter-clockwise, holes clockwise), an edge shared by
+two neighbours appears once in each direction, so a union is simply "drop every
+edge whose reverse is present" followed by re-stitching the remaining edges into
+rings. No general polygon clipping is needed.
+
+Also provides topology-preserving simplification: rings are split into arcs at
+junctions and each arc is simplified once, so neighbours keep identical borders.
+
+Requires numpy.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+GRID_DECIMALS = 4  # DECIMALS in the prepare scripts
+GRID = 10 ** GRID_DECIMALS  # Integer units per degree
+_OFFSET_X = 180 * GRID
+_OFFSET_Y = 90 * GRID
+
+
+def iter_rings(features):
+    """Yield (ring, is_exterior) for every ring of Polygon/MultiPolygon features.
+
+    Raises ValueError for features written at a precision other than the
+    4-decimal grid (--precision adaptive): their vertices no longer coincide
+    with their neighbours', so shared edges would not cancel.
+    """
+    for feat in features:
+        precision = feat["properties"].get("precision", GRID_DECIMALS)
+        if precision != GRID_DECIMALS:
+            raise ValueError(f"{feat['properties'].get('name', '?')} has {precision}-decimal coordinates; "
+                             f"dissolve needs the {GRID_DECIMALS}-decimal grid (build with --precision fixed)")
+        geom = feat["geometry"]
+        polys = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+        for poly in polys:
+            for i, ring in enumerate(poly):
+                yield ring, i == 0
+
+
+def _encode(xy):
+    """Pack integer (x, y) grid points into sortable int64 keys."""
+    return ((xy[:, 0] + _OFFSET_X) << 32) | (xy[:, 1] + _OFFSET_Y)
+
+
+def _decode(keys):
+    return (keys >> 32) - _OFFSET_X, (keys & 0xFFFFFFFF) - _OFFSET_Y
+
+
+def ring_edges(rings, snap=True):
+    """Build consistently oriented directed edges for (ring, is_exterior) pairs.
+
+    Returns two int64 arrays of start and end vertex keys. Rings given in
+    degrees are snapped to the integer grid; pass snap=False for rings that
+    are already integer grid points.
+    """
+    coords, sizes, exterior = [], [], []
+    for ring, is_exterior in rings:
+        if len(ring) < 4:
+            continue
+        coords.extend(ring)
+        sizes.append(len(ring))
+        exterior.append(is_exterior)
+    if not sizes:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    pts = np.array(coords, dtype=np.float64)[:, :2]
+    if snap:
+        pts = np.rint(pts * GRID)
+    pts = pts.astype(np.int64)
+    sizes = np.array(sizes)
+    starts = np.cumsum(sizes) - sizes
+
+    # Edge i joins point i and i + 1, except across ring boundaries
+    x, y = pts[:, 0], pts[:, 1]
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    cross = np.append(cross, 0)
+    last = starts + sizes - 1
+    cross[last] = 0
+    area2 = np.add.reduceat(cross, starts)
+    flip = (area2 > 0) != np.array(exterior)
+
+    keys = _encode(pts)
+    mask = np.ones(len(keys) - 1, dtype=bool)
+    mask[last[:-1]] = False
+    a, b = keys[:-1][mask], keys[1:][mask]
+    ring_of_edge = np.repeat(np.arange(len(sizes)), sizes - 1)
+    swap = flip[ring_of_edge]
+    a, b = np.where(swap, b, a), np.where(swap, a, b)
+    keep = a != b  # Repeated vertices after snapping
+    return a[keep], b[keep]
+
+
+def cancel_edges(a, b):
+    """Cancel each directed edge against its reverse; return the remainder."""
+    if not len(a):
+        return a, b
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    sign = np.where(a < b, 1, -1)
+    order = np.lexsort((hi, lo))
+    lo, hi, sign = lo[order], hi[order], sign[order]
+    first = np.flatnonzero(np.r_[True, (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])])
+    net = np.add.reduceat(sign, first)
+    count = np.abs(net)
+    lo, hi = np.repeat(lo[first], count), np.repeat(hi[first], count)
+    fwd = np.repeat(net > 0, count)
+    return np.where(fwd, lo, hi), np.where(fwd, hi, lo)
+
+
+def _split_pinches(cycle):
+    """Split a cycle of vertex keys into simple loops at repeated vertices."""
+    loops, stack, pos = [], [], {}
+    for v in cycle:
+        i = pos.get(v)
+        if i is None:
+            pos[v] = len(stack)
+            stack.append(v)
+            continue
+        loops.append(stack[i:])
+        for u in stack[i + 1:]:
+            del pos[u]
+        del stack[i + 1:]
+    loops.append(stack)
+    return loops
+
+
+def stitch(a, b):
+    """Re-stitch balanced directed edges into closed rings of (x, y) tuples.
+
+    Every vertex has as many incoming as outgoing edges, so pairing the i-th
+    incoming edge with the i-th outgoing edge (both sorted by vertex) gives a
+    permutation whose cycles are the rings.
+
+    Which cycles come out depends on the order of the edges, so the result is
+    made canonical: cycles are split where they pass through a vertex twice
+    (outlines touching at a single point), each ring starts at its lowest
+    vertex, and rings are sorted by that vertex. Simplification keeps the
+    first point of a ring, so callers get the same output for the same outline
+    however the edges were produced.
+    """
+    if not len(a):
+        return []
+    order_out = np.argsort(a, kind="stable")
+    order_in = np.argsort(b, kind="stable")
+    nxt = np.empty(len(a), dtype=np.int64)
+    nxt[order_in] = order_out
+
+    # Walk the cycles to get a traversal order
+    nxt = nxt.tolist()
+    seen = bytearray(len(nxt))
+    order, bounds = [], [0]
+    for start in range(len(nxt)):
+        if seen[start]:
+            continue
+        i = start
+        while not seen[i]:
+            seen[i] = 1
+            order.append(i)
+            i = nxt[i]
+        bounds.append(len(order))
+
+    keys = a[order].tolist()
+    starts = a[order_out]
+    pinches = set(starts[1:][starts[1:] == starts[:-1]].tolist())
+    cycles = []
+    for lo, hi in zip(bounds, bounds[1:]):
+        cycle = keys[lo:hi]
+        cycles.extend(_split_pinches(cycle) if pinches and not pinches.isdisjoint(cycle) else [cycle])
+
+    # Rotate each ring to its lowest vertex, then build all points at once
+    rotated = []
+    for cycle in cycles:
+        if len(cycle) >= 3:
+            i = cycle.index(min(cycle))
+            rotated.append(cycle[i:] + cycle[:i])
+    rotated.sort(key=lambda cycle: cycle[0])
+    if not rotated:
+        return []
+    xs, ys = _decode(np.array([k for cycle in rotated for k in cycle], dtype=np.int64))
+    points = list(zip(xs.tolist(), ys.tolist()))
+    rings, lo = [], 0
+    for cycle in rotated:
+        ring = points[lo:lo + len(cycle)]
+        ring.append(ring[0])
+        rings.append(ring)
+        lo += len(cycle)
+    return rings
+
+
+def boundary_edges(features):
+    """Directed edges left on the outline of the union of GeoJSON features."""
+    return cancel_edges(*ring_edges(iter_rings(features)))
+
+
+def merge_edges(edge_sets):
+    """Union already dissolved outlines given as (start, end) edge arrays."""
+    edge_sets = list(edge_sets)
+    a = np.concatenate([a for a, _ in edge_sets])
+    b = np.concatenate([b for _, b in edge_sets])
+    return cancel_edges(a, b)
+
+
+def dissolve(features):
+    """Union GeoJSON features into rings on the integer grid."""
+    return stitch(*boundary_edges(features))
+
+
+def signed_area(ring):
+    """Shoelace area of a closed ring; positive for counter-clockwise rings."""
+    total = 0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+        total += x0 * y1 - x1 * y0
+    return total / 2
+
+
+def _contains(ring, x, y):
+    inside = False
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+
+def to_polygons(rings):
+    """Group rings into polygons: each hole goes to the smallest shell containing it."""
+    shells, holes = [], []
+    for ring in rings:
+        (shells if signed_area(ring) > 0 else holes).append(ring)
+    shells.sort(key=signed_area)
+    polygons = [[s] for s in shells]
+    boxes = [(min(x for x, _ in s), min(y for _, y in s), max(x for x, _ in s), max(y for _, y in s))
+             for s in shells]
+    for hole in holes:
+        x, y = hole[0]
+        for poly, (x0, y0, x1, y1) in zip(polygons, boxes):
+            if x0 <= x <= x1 and y0 <= y <= y1 and _contains(poly[0], x, y):
+                poly.append(hole)
+                break
+    return polygons
+
+
+def find_junctions(rings):
+    """Vertices where more than two boundary edges meet."""
+    neighbours = defaultdict(set)
+    for ring in rings:
+        for a, b in zip(ring, ring[1:]):
+            neighbours[a].add(b)
+            neighbours[b].add(a)
+    return {v for v, n in neighbours.items() if len(n) > 2}
+
+
+def simplify(points, tolerance):
+    """Douglas-Peucker on an open polyline; keeps both endpoints."""
+    if len(points) <= 2:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    tol2 = tolerance * tolerance
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (ax, ay), (bx, by) = points[first], points[last]
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+        best, best_d2 = -1, tol2
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if seg2 == 0:
+                d2 = (px - ax) ** 2 + (py - ay) ** 2
+            else:
+                cross = dx * (py - ay) - dy * (px - ax)
+                d2 = cross * cross / seg2
+            if d2 > best_d2:
+                best, best_d2 = i, d2
+        if best >= 0:
+            keep[best] = True
+            stack.append((first, best))
+            stack.append((best, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def split_arcs(ring, junctions):
+    """Split a closed ring into arcs that start and end at junctions."""
+    cut = [i for i, p in enumerate(ring[:-1]) if p in junctions]
+    if not cut:
+        # Isolated ring: anchor at its lowest vertex and the vertex farthest from it
+        start = min(range(len(ring) - 1), key=lambda i: ring[i])
+        rotated = ring[start:-1] + ring[:start + 1]
+        sx, sy = rotated[0]
+        far = max(range(len(rotated)), key=lambda i: (rotated[i][0] - sx) ** 2 + (rotated[i][1] - sy) ** 2)
+        return [rotated[:far + 1], rotated[far:]]
+    rotated = ring[cut[0]:-1] + ring[:cut[0] + 1]
+    offsets = [i - cut[0] for i in cut] + [len(rotated) - 1]
+    return [rotated[a:b + 1] for a, b in zip(offsets, offsets[1:])]
+
+
+def simplify_ring(ring, junctions, cache, tolerance, transform=None, tag=None):
+    """Simplify a ring arc by arc, reusing results for arcs shared with neighbours.
+
+    transform maps grid points to the output space before simplification (e.g.
+    a map projection); tag distinguishes cache entries made with different
+    transforms.
+    """
+    out = []
+    for arc in split_arcs(ring, junctions):
+        key = tuple(arc)
+        canonical = min(key, key[::-1])
+        if (canonical, tag) not in cache:
+            pts = [transform(p) for p in canonical] if transform else list(canonical)
+            cache[canonical, tag] = simplify(pts, tolerance)
+        simplified = cache[canonical, tag]
+        if canonical != key:
+            simplified = simplified[::-1]
+        out.extend(simplified if not out else simplified[1:])
+    return out
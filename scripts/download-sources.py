@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Download the source boundary files of every prefecture into the cache read
+by the prepare scripts (see scripts/project.py).
+
+Outputs to build/sources/:
+  municipality/{code}.json   N03 municipality boundaries (prepare-geojson.py)
+  oaza/{code}.json           e-Stat small areas (prepare-oaza.py)
+
+Files already in the cache are kept unless --force is given. Downloads run
+on a small thread pool.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from project import PREF_CODES, SOURCE_URLS, download_source, source_path
+
+DOWNLOAD_THREADS = 8
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--layer", choices=sorted(SOURCE_URLS), action="append", dest="layers",
+                        help="source layer to download (repeatable; default: all)")
+    parser.add_argument("--force", action="store_true", help="download again even if cached")
+    args = parser.parse_args()
+
+    layers = args.layers or sorted(SOURCE_URLS)
+    jobs = [(layer, code) for layer in layers for code in PREF_CODES
+            if args.force or not os.path.exists(source_path(layer, code))]
+    print(f"Downloading {len(jobs)} files ({len(layers) * len(PREF_CODES) - len(jobs)} cached)")
+
+    start = time.perf_counter()
+    total_size = failed = 0
+    with ThreadPoolExecutor(max_workers=DOWNLOAD_THREADS) as pool:
+        futures = {job: pool.submit(download_source, *job) for job in jobs}
+        for (layer, code), future in futures.items():
+            try:
+                size = future.result()
+                total_size += size
+                print(f"  {layer}/{code}: {size // 1024}KB")
+            except Exception as e:
+                failed += 1
+                print(f"  {layer}/{code}: ERROR: {e}")
+
+    elapsed = time.perf_counter() - start
+    print(f"\nTotal: {len(jobs) - failed} files, {total_size // (1024 * 1024)}MB in {elapsed:.1f}s")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
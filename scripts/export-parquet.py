@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Export the municipality and oaza boundary layers as GeoParquet for analysis.
+
+Reads public/data/geojson/*.json and public/data/oaza/*.json and writes one
+row per feature to build/parquet/:
+  municipalities.parquet   code, name, pref_code, bbox, geometry
+  oaza.parquet             code, name, muni_code, pref_code, bbox, geometry
+
+Geometry is WKB (GeoParquet 1.0 "geo" metadata, CRS84). Each prefecture is
+its own row group, sorted by code, so readers can prune by pref_code/code
+statistics and read only the columns they need:
+
+  pq.read_table("build/parquet/oaza.parquet", columns=["code", "name"],
+                filters=[("pref_code", "=", "13")])
+
+Run scripts/prepare-geojson.py and scripts/prepare-oaza.py first.
+Requires pyarrow.
+"""
+import json
+import os
+import struct
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from project import BUILD_DIR, GEOJSON_DIR, OAZA_DIR, PREF_CODES
+
+OUTPUT_DIR = os.path.join(BUILD_DIR, "parquet")
+
+WKB_POLYGON = 3
+WKB_MULTIPOLYGON = 6
+
+
+def polygon_wkb(rings):
+    """Little-endian WKB body (after the header) of a polygon."""
+    parts = [struct.pack("<I", len(rings))]
+    for ring in rings:
+        flat = [v for x, y, *_ in ring for v in (x, y)]
+        parts.append(struct.pack(f"<I{len(flat)}d", len(ring), *flat))
+    return b"".join(parts)
+
+
+def to_wkb(geom):
+    """Encode a GeoJSON Polygon/MultiPolygon as little-endian WKB."""
+    if geom["type"] == "Polygon":
+        return struct.pack("<BI", 1, WKB_POLYGON) + polygon_wkb(geom["coordinates"])
+    polys = geom["coordinates"]
+    return struct.pack("<BII", 1, WKB_MULTIPOLYGON, len(polys)) + b"".join(
+        struct.pack("<BI", 1, WKB_POLYGON) + polygon_wkb(p) for p in polys)
+
+
+def geom_bbox(geom):
+    """Return (xmin, ymin, xmax, ymax) of a Polygon/MultiPolygon."""
+    polys = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+    xs = [p[0] for poly in polys for p in poly[0]]
+    ys = [p[1] for poly in polys for p in poly[0]]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def feature_rows(features, **parents):
+    """Convert GeoJSON features to a column dict."""
+    cols = {"code": [], "name": [], **{k: [] for k in parents},
+            "xmin": [], "ymin": [], "xmax": [], "ymax": [], "geometry": []}
+    for feat in sorted(features, key=lambda f: f["properties"]["code"]):
+        props = feat["properties"]
+        xmin, ymin, xmax, ymax = geom_bbox(feat["geometry"])
+        cols["code"].append(props["code"])
+        cols["name"].append(props["name"])
+        for k, v in parents.items():
+            cols[k].append(v)
+        cols["xmin"].append(xmin)
+        cols["ymin"].append(ymin)
+        cols["xmax"].append(xmax)
+        cols["ymax"].append(ymax)
+        cols["geometry"].append(to_wkb(feat["geometry"]))
+    return cols
+
+
+# GeoParquet 1.0 metadata; coordinates are lng/lat, i.e. the default OGC:CRS84
+GEO_METADATA = json.dumps({
+    "version": "1.0.0",
+    "primary_column": "geometry",
+    "columns": {
+        "geometry": {
+            "encoding": "WKB",
+            "geometry_types": ["MultiPolygon", "Polygon"],
+        },
+    },
+})
+
+
+def layer_schema(parent_fields):
+    """Schema for a layer: code, name, parent codes, bbox columns, WKB geometry."""
+    return pa.schema(
+        [pa.field("code", pa.string()), pa.field("name", pa.string())]
+        + [pa.field(name, pa.string()) for name in parent_fields]
+        + [pa.field(k, pa.float64()) for k in ("xmin", "ymin", "xmax", "ymax")]
+        + [pa.field("geometry", pa.binary())],
+        metadata={b"geo": GEO_METADATA.encode("utf-8")},
+    )
+
+
+def write_row_group(writer, schema, cols):
+    """Write one prefecture's rows as a single row group."""
+    if cols["code"]:
+        writer.write_table(pa.table(cols, schema=schema), row_group_size=len(cols["code"]))
+    return len(cols["code"])
+
+
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    muni_schema = layer_schema(["pref_code"])
+    oaza_schema = layer_schema(["muni_code", "pref_code"])
+    muni_path = os.path.join(OUTPUT_DIR, "municipalities.parquet")
+    oaza_path = os.path.join(OUTPUT_DIR, "oaza.parquet")
+
+    oaza_files = sorted(f for f in os.listdir(OAZA_DIR) if f.endswith(".json") and f != "meta.json")
+    total_munis = total_oaza = 0
+
+    with pq.ParquetWriter(muni_path, muni_schema, compression="zstd") as muni_writer, \
+            pq.ParquetWriter(oaza_path, oaza_schema, compression="zstd") as oaza_writer:
+        for pref in PREF_CODES:
+            print(f"  Exporting {pref}...", end=" ", flush=True)
+
+            with open(os.path.join(GEOJSON_DIR, f"{pref}.json"), encoding="utf-8") as f:
+                munis = json.load(f)["features"]
+            muni_rows = write_row_group(muni_writer, muni_schema, feature_rows(munis, pref_code=pref))
+
+            oaza_cols = {name: [] for name in oaza_schema.names}
+            for fname in oaza_files:
+                if not fname.startswith(pref):
+                    continue
+                with open(os.path.join(OAZA_DIR, fname), encoding="utf-8") as f:
+                    feats = json.load(f)["features"]
+                cols = feature_rows(feats, muni_code=fname[:-len(".json")], pref_code=pref)
+                for name in oaza_cols:
+                    oaza_cols[name].extend(cols[name])
+            oaza_rows = write_row_group(oaza_writer, oaza_schema, oaza_cols)
+
+            total_munis += muni_rows
+            total_oaza += oaza_rows
+            print(f"{muni_rows} municipalities, {oaza_rows} oaza")
+
+    print(f"\nmunicipalities.parquet: {total_munis} rows, {os.path.getsize(muni_path) // 1024}KB")
+    print(f"oaza.parquet:           {total_oaza} rows, {os.path.getsize(oaza_path) // (1024 * 1024)}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Memory-mapped binary feature store for the Python tools.
+
+Reading public/data/oaza/*.json builds a full dict/list tree for every feature
+even when a tool only needs names or bboxes. A store file holds the same
+features in one binary file that is memory-mapped and read on demand:
+
+  header   magic b"GDFS", version (u32), feature count (u32), slot count (u32)
+  offsets  count + 1 little-endian u64 record offsets
+  slots    open-addressing hash table of u32 record indices (0xFFFFFFFF =
+           empty), slot count a power of two at least twice the feature
+           count, keyed by CRC-32 of the code with linear probing
+  records  bbox (4 x f64: west, south, east, north),
+           code and name (u16 byte length + UTF-8 each),
+           geometry (scripts/geocodec.py encoding) up to the next offset
+
+Records are sorted by code. store[i] is O(1) through the offset table and
+store.get(code) is O(1) on average through the hash table (one or two probes
+at the 50% load factor); both return a Feature view that copies only the
+record's code, name and bbox. The geometry is decoded when
+first accessed, into array('d') rings.
+
+  with FeatureStore("build/oaza.store") as store:
+      feat = store.get("S13101034005")
+      feat.name, feat.bbox, feat.rings
+
+Standard library only.
+"""
+import mmap
+import struct
+import zlib
+
+from geocodec import decode_geometry, decode_rings, encode_geometry
+
+MAGIC = b"GDFS"
+VERSION = 2
+_HEADER = struct.Struct("<4sIII")
+_BBOX = struct.Struct("<4d")
+_LEN = struct.Struct("<H")
+_OFFSET = struct.Struct("<Q")
+_SLOT = struct.Struct("<I")
+_EMPTY = 0xFFFFFFFF
+
+
+def _slot_count(count):
+    """Smallest power of two holding count entries at no more than 50% load."""
+    size = 1
+    while size < 2 * count:
+        size *= 2
+    return size
+
+
+def _record(code, name, bbox, blob):
+    code_bytes, name_bytes = code.encode("utf-8"), name.encode("utf-8")
+    return b"".join((
+        _BBOX.pack(*bbox),
+        _LEN.pack(len(code_bytes)), code_bytes,
+        _LEN.pack(len(name_bytes)), name_bytes,
+        blob,
+    ))
+
+
+def write_store(path, features):
+    """Write (code, name, bbox, geometry, decimals) tuples to a store file; return the count."""
+    features = sorted(features, key=lambda f: f[0])
+    records = [
+        _record(code, name, bbox, encode_geometry(geom, decimals))
+        for code, name, bbox, geom, decimals in features
+    ]
+
+    size = _slot_count(len(records))
+    slots = [_EMPTY] * size
+    for i, feat in enumerate(features):
+        j = zlib.crc32(feat[0].encode("utf-8")) & (size - 1)
+        while slots[j] != _EMPTY:
+            j = (j + 1) & (size - 1)
+        slots[j] = i
+
+    base = _HEADER.size + 8 * (len(records) + 1) + _SLOT.size * size
+    offsets = [base]
+    for rec in records:
+        offsets.append(offsets[-1] + len(rec))
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(records), size))
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        f.write(struct.pack(f"<{size}I", *slots))
+        for rec in records:
+            f.write(rec)
+    return len(records)
+
+
+class Feature:
+    """Lightweight view of one stored feature; geometry is decoded lazily."""
+
+    __slots__ = ("code", "name", "bbox", "_mmap", "_start", "_end", "_rings")
+
+    def __init__(self, mm, start, end):
+        self.bbox = _BBOX.unpack_from(mm, start)
+        pos = start + _BBOX.size
+        (n,) = _LEN.unpack_from(mm, pos)
+        self.code = mm[pos + 2:pos + 2 + n].decode("utf-8")
+        pos += 2 + n
+        (n,) = _LEN.unpack_from(mm, pos)
+        self.name = mm[pos + 2:pos + 2 + n].decode("utf-8")
+        self._mmap, self._start, self._end = mm, pos + 2 + n, end
+        self._rings = None
+
+    @property
+    def rings(self):
+        """Polygons as lists of flat array('d') rings [x0, y0, x1, y1, ...]."""
+        if self._rings is None:
+            _, self._rings = decode_rings(self._mmap[self._start:self._end])
+        return self._rings
+
+    @property
+    def geometry(self):
+        """The geometry as a GeoJSON dict (decoded on every access)."""
+        return decode_geometry(self._mmap[self._start:self._end])
+
+    def __repr__(self):
+        return f"Feature({self.code!r}, {self.name!r})"
+
+
+class FeatureStore:
+    """Read-only, memory-mapped access to a store written by write_store()."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, self._slots = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a version {VERSION} feature store")
+        self._slot_base = _HEADER.size + 8 * (self._count + 1)
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, i):
+        return _OFFSET.unpack_from(self._mmap, _HEADER.size + 8 * i)[0]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return Feature(self._mmap, self._offset(i), self._offset(i + 1))
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self[i]
+
+    def _code_at(self, i):
+        pos = self._offset(i) + _BBOX.size
+        (n,) = _LEN.unpack_from(self._mmap, pos)
+        return self._mmap[pos + 2:pos + 2 + n].decode("utf-8")
+
+    def get(self, code, default=None):
+        """Look up a feature by code through the hash table."""
+        mask = self._slots - 1
+        j = zlib.crc32(code.encode("utf-8")) & mask
+        while True:
+            (i,) = _SLOT.unpack_from(self._mmap, self._slot_base + _SLOT.size * j)
+            if i == _EMPTY:
+                return default
+            if self._code_at(i) == code:
+                return self[i]
+            j = (j + 1) & mask
+
+    def close(self):
+        """Release the mapping; features read from the store can no longer decode geometry."""
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
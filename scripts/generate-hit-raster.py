@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Generate low-resolution hit-test rasters from the boundary outputs.
+
+Rasterizes the municipality layer (public/data/geojson/) per prefecture and the
+oaza layer (public/data/oaza/) per municipality into ID grids where each cell
+holds the index of the feature covering the cell centre. A click then resolves
+with a single array lookup; only cells flagged as boundary cells need an exact
+point-in-polygon test.
+
+Cells are CELL_METERS on the ground (coarser only where a grid would exceed
+MAX_GRID_SIZE cells), so small urban oaza still own cells of their own. Far
+apart landmasses get separate grids: polygons are grouped into clusters that
+are less than CLUSTER_GAP_KM apart, so e.g. 小笠原 doesn't stretch the grid of
+the rest of 東京都. A lookup picks the grid whose bbox contains the point.
+
+Grids are written as 8-bit RGB PNGs so browsers can decode them via canvas:
+  R, G = feature index (big-endian Uint16, 0 = no feature, i = codes[i - 1])
+  B    = 255 if a boundary passes through the cell, else 0
+
+Outputs to public/data/hitgrid/:
+  {pref}.json, {pref}.{i}.png               municipality grids of a prefecture
+  oaza/{muni}.json, oaza/{muni}.{i}.png     oaza grids of a municipality
+where the JSON holds "codes" and one "grids" entry (bbox, cellX, cellY,
+width, height, png) per cluster.
+
+The summary reports how many features own at least one interior cell (a
+lookup that needs no exact test) and the share of filled cells that are
+boundary cells. No page does the lookup yet, so scripts/build.py only builds
+the grids when named (build.py hitgrid).
+
+Requires numpy.
+"""
+import json
+import math
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from geoutil import KM_PER_DEGREE
+from project import GEOJSON_DIR, OAZA_DIR, PREF_CODES, PUBLIC_DATA_DIR
+
+OUTPUT_DIR = os.path.join(PUBLIC_DATA_DIR, "hitgrid")
+
+CELL_METERS = 20  # Ground size of a cell
+MAX_GRID_SIZE = 2048  # Cells along either side of one grid; cells grow beyond that
+CLUSTER_GAP_KM = 20  # Polygons further apart than this go into separate grids
+MAX_FEATURES = 0xFFFF  # Index 0 is reserved for "no feature"
+
+
+def iter_polygons(geom):
+    """Yield each polygon (list of rings) of a Polygon/MultiPolygon geometry."""
+    if geom["type"] == "Polygon":
+        yield geom["coordinates"]
+    elif geom["type"] == "MultiPolygon":
+        yield from geom["coordinates"]
+
+
+def feature_edges(geom):
+    """Return all ring edges of a geometry as an (N, 4) array of x0, y0, x1, y1."""
+    parts = []
+    for poly in iter_polygons(geom):
+        for ring in poly:
+            if len(ring) < 2:
+                continue
+            pts = np.asarray(ring, dtype=np.float64)[:, :2]
+            parts.append(np.hstack([pts[:-1], pts[1:]]))
+    if not parts:
+        return np.empty((0, 4))
+    return np.vstack(parts)
+
+
+def polygon_bbox(poly):
+    pts = np.asarray(poly[0], dtype=np.float64)[:, :2]
+    return pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max()
+
+
+def clusters(features):
+    """Group the features' polygons into landmasses less than CLUSTER_GAP_KM apart.
+
+    Returns a list of clusters, each a list of (feature index, geometry) with
+    the feature's polygons that fall in the cluster. Polygon bboxes are marked
+    on a coarse grid of CLUSTER_GAP_KM cells; connected marked cells form a
+    cluster.
+    """
+    polys, boxes = [], []
+    for i, feat in enumerate(features):
+        for poly in iter_polygons(feat["geometry"]):
+            if poly and len(poly[0]) >= 4:
+                polys.append((i, poly))
+                boxes.append(polygon_bbox(poly))
+    if not polys:
+        return []
+    boxes = np.array(boxes)
+    cell = CLUSTER_GAP_KM / KM_PER_DEGREE
+    lo = np.floor((boxes[:, :2] - boxes[:, :2].min(axis=0)) / cell).astype(np.int64)
+    hi = np.floor((boxes[:, 2:] - boxes[:, :2].min(axis=0)) / cell).astype(np.int64)
+
+    # Label connected coarse cells (8-neighbourhood)
+    marked = set()
+    for (x0, y0), (x1, y1) in zip(lo.tolist(), hi.tolist()):
+        marked.update((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+    label = {}
+    for start in sorted(marked):
+        if start in label:
+            continue
+        label[start] = len(set(label.values()))
+        todo = [start]
+        while todo:
+            x, y = todo.pop()
+            for nb in ((x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+                if nb in marked and nb not in label:
+                    label[nb] = label[start]
+                    todo.append(nb)
+
+    groups = {}
+    for (i, poly), (x0, y0) in zip(polys, lo.tolist()):
+        groups.setdefault(label[x0, y0], {}).setdefault(i, []).append(poly)
+    return [[(i, {"type": "MultiPolygon", "coordinates": parts}) for i, parts in sorted(group.items())]
+            for _, group in sorted(groups.items())]
+
+
+def grid_extent(geometries):
+    """Compute bbox and cell sizes for a grid covering all geometries."""
+    edges = np.vstack([feature_edges(g) for g in geometries])
+    west, east = edges[:, [0, 2]].min(), edges[:, [0, 2]].max()
+    south, north = edges[:, [1, 3]].min(), edges[:, [1, 3]].max()
+
+    # Square cells of CELL_METERS on the ground, larger if the grid would be too big
+    aspect = math.cos(math.radians((south + north) / 2))
+    span_y = north - south
+    span_x = (east - west) * aspect
+    cell_y = max(CELL_METERS / 1000 / KM_PER_DEGREE, max(span_x, span_y) / MAX_GRID_SIZE)
+    cell_x = cell_y / aspect
+    width = max(1, math.ceil((east - west) / cell_x))
+    height = max(1, math.ceil((north - south) / cell_y))
+    return {
+        "bbox": [west, south, east, north],
+        "cellX": cell_x,
+        "cellY": cell_y,
+        "width": width,
+        "height": height,
+    }
+
+
+def scanline_fill(edges, extent):
+    """Rasterize one feature with an even-odd scanline fill.
+
+    Returns (row0, col0, mask) where mask is a boolean sub-grid of the cells
+    whose centres fall inside the feature, or None if no centre is covered.
+    """
+    west, _, _, north = extent["bbox"]
+    cell_x, cell_y = extent["cellX"], extent["cellY"]
+    width, height = extent["width"], extent["height"]
+
+    # Row coordinates grow southwards: row r has its centre at north - (r + 0.5) * cell_y
+    r0 = (north - edges[:, 1]) / cell_y - 0.5
+    r1 = (north - edges[:, 3]) / cell_y - 0.5
+    lo = np.ceil(np.minimum(r0, r1)).astype(np.int64)
+    hi = np.ceil(np.maximum(r0, r1)).astype(np.int64)  # Half-open: [lo, hi)
+    lo = np.clip(lo, 0, height)
+    hi = np.clip(hi, 0, height)
+    counts = hi - lo
+    keep = counts > 0
+    if not keep.any():
+        return None
+
+    edges, r0, r1, lo, counts = edges[keep], r0[keep], r1[keep], lo[keep], counts[keep]
+
+    # One (row, x) crossing per edge per scanline it spans
+    edge_idx = np.repeat(np.arange(len(edges)), counts)
+    starts = np.cumsum(counts) - counts
+    rows = lo[edge_idx] + (np.arange(counts.sum()) - starts[edge_idx])
+    t = (rows - r0[edge_idx]) / (r1[edge_idx] - r0[edge_idx])
+    xs = edges[edge_idx, 0] + t * (edges[edge_idx, 2] - edges[edge_idx, 0])
+    cols = (xs - west) / cell_x - 0.5  # Fractional column of the crossing
+
+    order = np.lexsort((cols, rows))
+    rows, cols = rows[order], cols[order]
+    if len(rows) % 2:
+        # Unclosed ring; drop the unmatched trailing crossing
+        rows, cols = rows[:-1], cols[:-1]
+
+    # Pair consecutive crossings (even-odd rule) into spans [c_in, c_out)
+    span_rows = rows[0::2]
+    c_in = np.clip(np.ceil(cols[0::2]).astype(np.int64), 0, width)
+    c_out = np.clip(np.ceil(cols[1::2]).astype(np.int64), 0, width)
+    valid = (c_out > c_in) & (rows[0::2] == rows[1::2])
+    if not valid.any():
+        return None
+    span_rows, c_in, c_out = span_rows[valid], c_in[valid], c_out[valid]
+
+    row0, col0 = span_rows.min(), c_in.min()
+    sub = np.zeros((span_rows.max() - row0 + 1, c_out.max() - col0 + 1), dtype=np.int32)
+    np.add.at(sub, (span_rows - row0, c_in - col0), 1)
+    np.add.at(sub, (span_rows - row0, c_out - col0), -1)
+    mask = np.cumsum(sub, axis=1)[:, :-1] > 0
+    return row0, col0, mask
+
+
+def boundary_cells(edges, extent, grid):
+    """Flag every cell an edge passes through by sampling at half-cell steps."""
+    west, _, _, north = extent["bbox"]
+    cell_x, cell_y = extent["cellX"], extent["cellY"]
+    width, height = extent["width"], extent["height"]
+
+    dx = (edges[:, 2] - edges[:, 0]) / cell_x
+    dy = (edges[:, 3] - edges[:, 1]) / cell_y
+    steps = np.ceil(np.maximum(np.abs(dx), np.abs(dy)) * 2).astype(np.int64) + 1
+    edge_idx = np.repeat(np.arange(len(edges)), steps)
+    starts = np.cumsum(steps) - steps
+    k = np.arange(steps.sum()) - starts[edge_idx]
+    t = k / np.maximum(steps[edge_idx] - 1, 1)
+    xs = edges[edge_idx, 0] + t * (edges[edge_idx, 2] - edges[edge_idx, 0])
+    ys = edges[edge_idx, 1] + t * (edges[edge_idx, 3] - edges[edge_idx, 1])
+    cols = np.clip(((xs - west) / cell_x).astype(np.int64), 0, width - 1)
+    rows = np.clip(((north - ys) / cell_y).astype(np.int64), 0, height - 1)
+    grid[rows, cols] = True
+
+
+def rasterize(cluster):
+    """Rasterize (feature index, geometry) pairs into (extent, id grid, boundary grid)."""
+    extent = grid_extent([geom for _, geom in cluster])
+    ids = np.zeros((extent["height"], extent["width"]), dtype=np.uint16)
+    boundary = np.zeros(ids.shape, dtype=bool)
+
+    for i, geom in cluster:
+        edges = feature_edges(geom)
+        if not len(edges):
+            continue
+        filled = scanline_fill(edges, extent)
+        if filled is not None:
+            row0, col0, mask = filled
+            h, w = mask.shape
+            ids[row0:row0 + h, col0:col0 + w][mask] = i + 1
+        boundary_cells(edges, extent, boundary)
+
+    return extent, ids, boundary
+
+
+def encode_png(ids, boundary):
+    """Encode an ID grid as an 8-bit RGB PNG using the Up filter."""
+    height, width = ids.shape
+    rgb = np.empty((height, width, 3), dtype=np.uint8)
+    rgb[..., 0] = ids >> 8
+    rgb[..., 1] = ids & 0xFF
+    rgb[..., 2] = np.where(boundary, 255, 0)
+
+    rows = rgb.reshape(height, width * 3)
+    up = rows.copy()
+    up[1:] = rows[1:] - rows[:-1]  # uint8 arithmetic wraps mod 256
+    raw = np.hstack([np.full((height, 1), 2, dtype=np.uint8), up])
+
+    def chunk(tag, body):
+        return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body))
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), 9))
+        + chunk(b"IEND", b"")
+    )
+
+
+def write_grids(name, features):
+    """Rasterize features into one grid per cluster; write {name}.json and {name}.{i}.png.
+
+    Returns (PNG bytes, features owning an interior cell, filled cells, boundary cells).
+    """
+    if len(features) > MAX_FEATURES - 1:
+        raise ValueError(f"{len(features)} features do not fit in a Uint16 grid")
+
+    grids, size, owners, filled, on_boundary = [], 0, set(), 0, 0
+    for n, cluster in enumerate(clusters(features)):
+        extent, ids, boundary = rasterize(cluster)
+        png_name = f"{os.path.basename(name)}.{n}.png"
+        png_path = os.path.join(os.path.dirname(os.path.join(OUTPUT_DIR, name)), png_name)
+        with open(png_path, "wb") as f:
+            f.write(encode_png(ids, boundary))
+        size += os.path.getsize(png_path)
+        grids.append(dict(extent, png=png_name))
+
+        owners.update(np.unique(ids[(ids > 0) & ~boundary]).tolist())
+        filled += int(np.count_nonzero(ids))
+        on_boundary += int(np.count_nonzero((ids > 0) & boundary))
+
+    meta = {"codes": [f["properties"]["code"] for f in features], "grids": grids}
+    with open(os.path.join(OUTPUT_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+    return size, len(owners), filled, on_boundary
+
+
+def load_oaza_features(muni_code):
+    """Oaza features of one municipality ([] if it has no oaza file)."""
+    path = os.path.join(OAZA_DIR, f"{muni_code}.json")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["features"]
+
+
+def process_prefecture(pref_code):
+    """Build the municipality grids of one prefecture and the oaza grids of its municipalities."""
+    print(f"  Rasterizing {pref_code}...", end=" ", flush=True)
+
+    with open(os.path.join(GEOJSON_DIR, f"{pref_code}.json"), encoding="utf-8") as f:
+        munis = json.load(f)["features"]
+    size, muni_owners, _, _ = write_grids(pref_code, munis)
+
+    oaza_total = oaza_owners = filled = on_boundary = 0
+    for muni in munis:
+        oaza = load_oaza_features(muni["properties"]["code"])
+        if not oaza:
+            continue
+        stats = write_grids(f"oaza/{muni['properties']['code']}", oaza)
+        size += stats[0]
+        oaza_total += len(oaza)
+        oaza_owners += stats[1]
+        filled += stats[2]
+        on_boundary += stats[3]
+
+    print(f"{muni_owners}/{len(munis)} municipalities and {oaza_owners}/{oaza_total} oaza own a cell, "
+          f"{on_boundary / max(filled, 1):.0%} of oaza cells on a boundary, {size // 1024}KB")
+    return size
+
+
+def main():
+    os.makedirs(os.path.join(OUTPUT_DIR, "oaza"), exist_ok=True)
+
+    total_size = 0
+    for code in PREF_CODES:
+        try:
+            total_size += process_prefecture(code)
+        except Exception as e:
+            print(f"ERROR: {e}")
+
+    files = sum(len(names) for _, _, names in os.walk(OUTPUT_DIR))
+    print(f"\nTotal: {total_size // 1024}KB across {files} files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Generate src/data/japan-map-paths.json (the static SVG map of Japan) from the
+municipality boundary outputs in public/data/geojson/.
+
+Steps:
+  1. Dissolve municipalities into prefectures by cancelling shared edges
+  2. Split prefecture rings into arcs at junctions and simplify each arc once,
+     so neighbouring prefectures keep identical borders
+  3. Project with the main extent / Okinawa inset used by JapanMap.tsx,
+     dropping remote islands outside both extents
+  4. Write minimal SVG paths (relative commands, integer coordinates)
+
+Prefecture names are taken from src/data/municipalities.json.
+Run scripts/prepare-geojson.py first. Requires numpy (see scripts/dissolve.py).
+"""
+import json
+import os
+
+from dissolve import GRID, dissolve, find_junctions, signed_area, simplify_ring
+from project import GEOJSON_DIR, SRC_DATA_DIR
+
+MUNICIPALITIES_PATH = os.path.join(SRC_DATA_DIR, "municipalities.json")
+OUTPUT_PATH = os.path.join(SRC_DATA_DIR, "japan-map-paths.json")
+
+VIEWBOX = "0 0 1000 1000"
+PROJECTION = {
+    "main": {
+        "cx": 500.0, "cy": 425.0, "midLng": 137.5, "midLat": 38.0, "scale": 51.25,
+        "lngMin": 128.5, "lngMax": 146.5, "latMin": 30.0, "latMax": 46.0,
+    },
+    "okinawa": {
+        "offsetX": 20, "offsetY": 860, "w": 200, "h": 120, "midLng": 126.0, "midLat": 26.0,
+        "scale": 30.0, "lngMin": 123.0, "lngMax": 129.0, "latMin": 24.0, "latMax": 28.0,
+    },
+}
+
+TOLERANCE = 0.6  # Douglas-Peucker tolerance in SVG units
+MIN_RING_AREA = 1.0  # Drop rings smaller than this many square SVG units
+PATH_DECIMALS = 0  # Output coordinate precision (0 = integers)
+EXTENT_MARGIN = 1.0  # Keep rings whose first vertex lies within the extent plus this many degrees
+INSET_PREFECTURES = {"47"}
+
+
+def in_extent(lng, lat, inset):
+    """Whether a point falls inside the (padded) extent of its projection."""
+    ext = PROJECTION["okinawa" if inset else "main"]
+    return (ext["lngMin"] - EXTENT_MARGIN <= lng <= ext["lngMax"] + EXTENT_MARGIN
+            and ext["latMin"] - EXTENT_MARGIN <= lat <= ext["latMax"] + EXTENT_MARGIN)
+
+
+def project(lng, lat, inset):
+    """Project lng/lat into SVG coordinates."""
+    if inset:
+        oki = PROJECTION["okinawa"]
+        x = oki["offsetX"] + oki["w"] / 2 + (lng - oki["midLng"]) * oki["scale"]
+        y = oki["offsetY"] + oki["h"] / 2 - (lat - oki["midLat"]) * oki["scale"]
+        return x, y
+    main = PROJECTION["main"]
+    return main["cx"] + (lng - main["midLng"]) * main["scale"], main["cy"] - (lat - main["midLat"]) * main["scale"]
+
+
+def quantize_ring(ring):
+    """Round to output precision, dropping repeats and collinear points."""
+    pts = []
+    for x, y in ring:
+        p = (round(x, PATH_DECIMALS), round(y, PATH_DECIMALS))
+        if PATH_DECIMALS == 0:
+            p = (int(p[0]), int(p[1]))
+        if pts and p == pts[-1]:
+            continue
+        if len(pts) >= 2:
+            (ax, ay), (bx, by) = pts[-2], pts[-1]
+            if (bx - ax) * (p[1] - ay) - (by - ay) * (p[0] - ax) == 0:
+                pts[-1] = p
+                continue
+        pts.append(p)
+    if len(pts) > 1 and pts[0] == pts[-1]:
+        pts.pop()
+    return pts
+
+
+def fmt(v):
+    """Format a number with as few characters as possible."""
+    s = f"{v:.{PATH_DECIMALS}f}" if PATH_DECIMALS else str(v)
+    if "." in s:
+        s = s.rstrip("0").rstrip(".")
+        if s.startswith("0."):
+            s = s[1:]
+        elif s.startswith("-0."):
+            s = "-" + s[2:]
+    return "0" if s in ("", "-0") else s
+
+
+def fmt_pair(x, y):
+    """Format a coordinate pair, omitting the separator before a minus sign."""
+    sy = fmt(y)
+    return fmt(x) + (sy if sy.startswith("-") else " " + sy)
+
+
+def to_path(rings):
+    """Encode rings as an SVG path with relative commands."""
+    parts = []
+    cursor = (0, 0)
+    for ring in rings:
+        x0, y0 = ring[0]
+        if not parts:
+            parts.append("M" + fmt_pair(x0, y0))
+        else:
+            parts.append("m" + fmt_pair(x0 - cursor[0], y0 - cursor[1]))
+        cursor = (x0, y0)  # After "z" the current point returns to the subpath start
+        deltas = []
+        px, py = x0, y0
+        for x, y in ring[1:]:
+            deltas.append(fmt_pair(x - px, y - py))
+            px, py = x, y
+        body = ""
+        for d in deltas:
+            body += d if (not body or d.startswith("-")) else " " + d
+        parts.append("l" + body + "z")
+    return "".join(parts)
+
+
+def label_point(rings):
+    """Area-weighted centroid of the largest ring."""
+    ring = max(rings, key=lambda r: abs(signed_area(r + r[:1])))
+    closed = ring + ring[:1]
+    area = signed_area(closed)
+    if area == 0:
+        return ring[0]
+    cx = cy = 0
+    for (x0, y0), (x1, y1) in zip(closed, closed[1:]):
+        cross = x0 * y1 - x1 * y0
+        cx += (x0 + x1) * cross
+        cy += (y0 + y1) * cross
+    return round(cx / (6 * area)), round(cy / (6 * area))
+
+
+def main():
+    with open(MUNICIPALITIES_PATH, encoding="utf-8") as f:
+        pref_info = json.load(f)["prefectures"]
+
+    print("Dissolving municipalities...")
+    dissolved = {}
+    for pref in pref_info:
+        with open(os.path.join(GEOJSON_DIR, f"{pref['code']}.json"), encoding="utf-8") as f:
+            dissolved[pref["code"]] = dissolve(json.load(f)["features"])
+
+    junctions = find_junctions([r for rings in dissolved.values() for r in rings])
+    print(f"  {sum(len(r) for r in dissolved.values())} rings, {len(junctions)} junctions")
+
+    cache = {}
+    prefectures = []
+    for pref in pref_info:
+        inset = pref["code"] in INSET_PREFECTURES
+        rings = []
+        for ring in dissolved[pref["code"]]:
+            if not in_extent(ring[0][0] / GRID, ring[0][1] / GRID, inset):
+                continue  # Remote islands (Ogasawara, Daito, ...) fall outside the map
+            transform = lambda p: project(p[0] / GRID, p[1] / GRID, inset)
+            pts = quantize_ring(simplify_ring(ring, junctions, cache, TOLERANCE, transform, tag=inset))
+            if len(pts) >= 3 and abs(signed_area(pts + pts[:1])) >= MIN_RING_AREA:
+                rings.append(pts)
+        x, y = label_point(rings)
+        prefectures.append({
+            "code": pref["code"],
+            "name": pref["name"],
+            "nameEn": pref["nameEn"],
+            "path": to_path(rings),
+            "labelX": x,
+            "labelY": y,
+        })
+        print(f"  {pref['code']} {pref['name']}: {len(rings)} rings, {len(prefectures[-1]['path'])} chars")
+
+    output = {
+        "viewBox": VIEWBOX,
+        "projection": PROJECTION,
+        "prefectures": prefectures,
+    }
+    with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, separators=(",", ":"))
+
+    print(f"\nGenerated {OUTPUT_PATH} ({os.path.getsize(OUTPUT_PATH) // 1024}KB)")
+
+
+if __name__ == "__main__":
+    main()
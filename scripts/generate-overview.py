@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Generate the prefecture and region overview layers from the municipality
+boundary outputs in public/data/geojson/.
+
+Municipalities are dissolved into prefectures and prefectures into regions by
+shared-edge cancellation (see scripts/dissolve.py), then simplified with shared
+borders kept identical.
+
+Outputs to public/data/overview/:
+  prefectures.json   one feature per prefecture (code, name)
+  regions.json       one feature per region (name, prefectures)
+
+Run scripts/prepare-geojson.py first. Requires numpy.
+"""
+import json
+import os
+import time
+
+from dissolve import (
+    GRID, boundary_edges, find_junctions, merge_edges, signed_area, simplify_ring, stitch, to_polygons,
+)
+from project import GEOJSON_DIR, PUBLIC_DATA_DIR, REGIONS, SRC_DATA_DIR
+
+MUNICIPALITIES_PATH = os.path.join(SRC_DATA_DIR, "municipalities.json")
+OUTPUT_DIR = os.path.join(PUBLIC_DATA_DIR, "overview")
+
+DECIMALS = 3  # Coordinate precision (~110m accuracy)
+TOLERANCE = 0.01 * GRID  # Douglas-Peucker tolerance (~1km) in grid units
+MIN_RING_AREA = 0.0004 * GRID * GRID  # Drop islands smaller than ~4km²
+
+
+def simplify_rings(rings, junctions, cache):
+    """Simplify rings with shared arcs and drop the ones below MIN_RING_AREA."""
+    out = []
+    for ring in rings:
+        pts = simplify_ring(ring, junctions, cache, TOLERANCE)
+        if len(pts) >= 4 and abs(signed_area(pts)) >= MIN_RING_AREA:
+            out.append(pts)
+    return out
+
+
+def to_geometry(rings):
+    """Build a GeoJSON geometry from oriented grid rings."""
+    polygons = [
+        [[[round(x / GRID, DECIMALS), round(y / GRID, DECIMALS)] for x, y in ring] for ring in poly]
+        for poly in to_polygons(rings)
+    ]
+    if len(polygons) == 1:
+        return {"type": "Polygon", "coordinates": polygons[0]}
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def write_layer(name, features):
+    """Write a FeatureCollection to OUTPUT_DIR and return its size."""
+    output_path = os.path.join(OUTPUT_DIR, f"{name}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f,
+                  ensure_ascii=False, separators=(",", ":"))
+    return os.path.getsize(output_path)
+
+
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    with open(MUNICIPALITIES_PATH, encoding="utf-8") as f:
+        pref_names = {p["code"]: p["name"] for p in json.load(f)["prefectures"]}
+
+    municipalities = {}
+    for code in pref_names:
+        with open(os.path.join(GEOJSON_DIR, f"{code}.json"), encoding="utf-8") as f:
+            municipalities[code] = json.load(f)["features"]
+
+    start = time.perf_counter()
+    pref_edges = {code: boundary_edges(feats) for code, feats in municipalities.items()}
+    region_edges = {name: merge_edges(pref_edges[c] for c in codes) for name, codes in REGIONS.items()}
+    prefectures = {code: stitch(*edges) for code, edges in pref_edges.items()}
+    regions = {name: stitch(*edges) for name, edges in region_edges.items()}
+    elapsed = time.perf_counter() - start
+
+    total_munis = sum(len(f) for f in municipalities.values())
+    print(f"Dissolved {total_munis} municipalities into {len(prefectures)} prefectures "
+          f"and {len(regions)} regions in {elapsed * 1000:.0f}ms")
+
+    # Prefecture and region layers are simplified separately; each keeps its own borders seamless
+    junctions = find_junctions(r for rings in prefectures.values() for r in rings)
+    cache = {}
+    pref_features = [
+        {
+            "type": "Feature",
+            "properties": {"code": code, "name": pref_names[code]},
+            "geometry": to_geometry(simplify_rings(rings, junctions, cache)),
+        }
+        for code, rings in prefectures.items()
+    ]
+
+    junctions = find_junctions(r for rings in regions.values() for r in rings)
+    cache = {}
+    region_features = [
+        {
+            "type": "Feature",
+            "properties": {"name": name, "prefectures": REGIONS[name]},
+            "geometry": to_geometry(simplify_rings(rings, junctions, cache)),
+        }
+        for name, rings in regions.items()
+    ]
+
+    pref_size = write_layer("prefectures", pref_features)
+    region_size = write_layer("regions", region_features)
+    print(f"  prefectures.json: {len(pref_features)} features, {pref_size // 1024}KB")
+    print(f"  regions.json:     {len(region_features)} features, {region_size // 1024}KB")
+
+
+if __name__ == "__main__":
+    main()
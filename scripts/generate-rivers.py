@@ -4,11 +4,14 @@ generate-rivers.py
 Generates a JSON file of 60 major Japanese rivers (主要河川) for GeoGuessr study.
 Includes 一級河川 (class 1) and major 二級河川 (class 2).
 
-Output: src/data/rivers.json
+Output: src/data/rivers.json, src/data/rivers.columnar.json (read by the rivers pages),
+plus shards in src/data/rivers/ (see scripts/datasets.py)
 """
 
-import json
-import os
+import argparse
+
+from datasets import FORMATS, build_lookup, read_dataset, regions_of, write_dataset, write_lookup, write_shards
+from project import REGIONS
 
 RIVERS = [
     # ============================================================
@@ -820,21 +823,29 @@ RIVERS = [
     },
 ]
 
+
+# Inverted indexes written to src/data/rivers/lookup.json (values are river names)
+LOOKUP_KEYS = {
+    "byPrefecture": lambda r: r["prefectures"],
+    "byRegion": regions_of,
+    "byClass": lambda r: [r["class"]],
+}
+
+
 def main():
-    output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "data")
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "rivers.json")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
 
-    data = {"rivers": RIVERS}
+    output_paths = [write_dataset("rivers", {"rivers": RIVERS}, fmt) for fmt in FORMATS]
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"Generated {len(RIVERS)} rivers to {', '.join(output_paths)}")
 
-    print(f"Generated {len(RIVERS)} rivers to {output_path}")
+    shard_bytes = write_shards("rivers", RIVERS, ["name", "reading", "class", "prefectures"])
+    shard_bytes += write_lookup("rivers", build_lookup(RIVERS, "name", LOOKUP_KEYS))
+    print(f"  Shards: {shard_bytes // 1024}KB in src/data/rivers/")
 
-    # Validate
-    with open(output_path, "r", encoding="utf-8") as f:
-        loaded = json.load(f)
+    # Validate what the pages read
+    loaded = read_dataset("rivers", "columnar")
     assert len(loaded["rivers"]) == len(RIVERS)
 
     # Check required rivers are present
@@ -862,27 +873,12 @@ def main():
             if field not in river:
                 print(f"WARNING: River {river.get('name', '?')} missing field: {field}")
 
-    # Summary by class
-    class1 = [r for r in loaded["rivers"] if r["class"] == 1]
-    class2 = [r for r in loaded["rivers"] if r["class"] == 2]
-    print(f"  一級河川: {len(class1)}")
-    print(f"  二級河川: {len(class2)}")
-
-    # Summary by region
-    regions = {
-        "北海道": ["01"],
-        "東北": ["02", "03", "04", "05", "06", "07"],
-        "関東": ["08", "09", "10", "11", "12", "13", "14"],
-        "中部": ["15", "16", "17", "18", "19", "20", "21", "22", "23"],
-        "近畿": ["24", "25", "26", "27", "28", "29", "30"],
-        "中国": ["31", "32", "33", "34", "35"],
-        "四国": ["36", "37", "38", "39"],
-        "九州": ["40", "41", "42", "43", "44", "45", "46", "47"],
-    }
-    for region_name, codes in regions.items():
-        count = sum(1 for r in loaded["rivers"]
-                    if any(p in codes for p in r["prefectures"]))
-        print(f"  {region_name}: {count} rivers")
+    # Summaries from the inverted indexes of the written data
+    lookup = build_lookup(loaded["rivers"], "name", LOOKUP_KEYS)
+    print(f"  一級河川: {len(lookup['byClass'].get('1', []))}")
+    print(f"  二級河川: {len(lookup['byClass'].get('2', []))}")
+    for region_name in REGIONS:
+        print(f"  {region_name}: {len(lookup['byRegion'].get(region_name, []))} rivers")
 
     print("\nDone. JSON is valid.")
 
@@ -6,13 +6,15 @@ Produces data for:
   - Routes 1-58 (旧一級国道 / 主要幹線)
   - Selected important 3-digit routes (一般国道 / 補助国道)
 
-Output: src/data/roads.json
+Output: src/data/roads.json, src/data/roads.columnar.json (read by the roads pages),
+plus shards in src/data/roads/ (see scripts/datasets.py)
 """
 
-import json
-import os
+import argparse
 import sys
 
+from datasets import FORMATS, build_lookup, regions_of, write_dataset, write_lookup, write_shards
+
 # Standard Japanese prefecture codes (JIS X 0401)
 PREFECTURE_NAMES = {
     "01": "北海道",
@@ -831,32 +833,37 @@ def build_routes():
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
     routes = build_routes()
     output = {
         "roads": routes,
         "prefectureNames": PREFECTURE_NAMES,
     }
+    output_paths = [write_dataset("roads", output, fmt) for fmt in FORMATS]
 
-    # Determine output path
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
-    output_path = os.path.join(project_root, "src", "data", "roads.json")
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    shard_bytes = write_shards("roads", routes, ["number", "name", "category", "prefectures"])
+    lookup = build_lookup(routes, "number", {
+        "byPrefecture": lambda r: r["prefectures"],
+        "byRegion": regions_of,
+        "byCategory": lambda r: [r["category"]],
+    })
+    shard_bytes += write_lookup("roads", lookup)
 
     # Summary
     total = len(routes)
     main_routes = [r for r in routes if r["number"] <= 58]
     three_digit = [r for r in routes if r["number"] >= 100]
 
-    print(f"Generated {output_path}")
+    print(f"Generated {', '.join(output_paths)}")
     print(f"  Total routes:       {total}")
     print(f"  Main routes (1-58): {len(main_routes)}")
     print(f"  3-digit routes:     {len(three_digit)}")
     print(f"  Prefectures:        {len(PREFECTURE_NAMES)}")
+    print(f"  Shards:             {shard_bytes // 1024}KB in src/data/roads/")
+    for category, numbers in lookup["byCategory"].items():
+        print(f"  {category}: {len(numbers)} routes")
 
     # Validate
     numbers = [r["number"] for r in routes]
@@ -872,10 +879,7 @@ def main():
         print(f"  All routes 1-58 present: YES")
 
     # Check all prefectures referenced exist
-    all_pref_codes = set()
-    for r in routes:
-        all_pref_codes.update(r["prefectures"])
-    unknown = all_pref_codes - set(PREFECTURE_NAMES.keys())
+    unknown = set(lookup["byPrefecture"]) - set(PREFECTURE_NAMES.keys())
     if unknown:
         print(f"  WARNING: Unknown prefecture codes: {unknown}")
     else:
@@ -0,0 +1,350 @@
+"""
+Geometry helpers shared by prepare-geojson.py and prepare-oaza.py.
+
+Standard library only, so the prepare scripts keep running without extra
+packages. The vertex cleanup uses NumPy when it is installed.
+"""
+
+import json
+import math
+
+try:
+    import numpy as np
+except ImportError:  # Pure-Python fallback in clean_ring()
+    np = None
+
+# Fixed extent covering all of Japan, so Hilbert indices are comparable across files
+HILBERT_EXTENT = (122.0, 20.0, 154.0, 46.0)  # west, south, east, north
+HILBERT_ORDER = 16  # 2^16 x 2^16 grid (~50m cells)
+
+KM_PER_DEGREE = 111.32
+
+# Adaptive quantization: a feature is assumed to be drawn at most this many pixels across
+DISPLAY_PIXELS = 1024
+MIN_DECIMALS = 3  # ~110m
+MAX_DECIMALS = 6  # ~0.1m
+SOURCE_DECIMALS = 8  # Precision at which source rings are validated
+
+
+def iter_points(coords):
+    """Yield every [x, y] position in a nested GeoJSON coordinate array."""
+    if isinstance(coords[0], (int, float)):
+        yield coords
+        return
+    for c in coords:
+        yield from iter_points(c)
+
+
+def bbox(coords):
+    """Return [west, south, east, north] of a nested coordinate array."""
+    xs, ys = [], []
+    for x, y, *_ in iter_points(coords):
+        xs.append(x)
+        ys.append(y)
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def hilbert_index(x, y, order=HILBERT_ORDER):
+    """Map integer cell (x, y) in a 2^order grid to its distance along the Hilbert curve."""
+    n = 1 << order
+    d = 0
+    s = n >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the sub-curve is in standard orientation
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - (x & (s - 1))
+                y = s - 1 - (y & (s - 1))
+            x, y = y, x
+        s >>= 1
+    return d
+
+
+def hilbert_key(coords, extent=HILBERT_EXTENT, order=HILBERT_ORDER):
+    """Hilbert index of the bbox centre of a nested coordinate array."""
+    west, south, east, north = bbox(coords)
+    ew, es, ee, en = extent
+    n = (1 << order) - 1
+    cx = min(max(((west + east) / 2 - ew) / (ee - ew), 0.0), 1.0)
+    cy = min(max(((south + north) / 2 - es) / (en - es), 0.0), 1.0)
+    return hilbert_index(round(cx * n), round(cy * n), order)
+
+
+def sort_features(features, order):
+    """Sort GeoJSON features in place. order is "source", "hilbert" or "area"."""
+    if order == "hilbert":
+        features.sort(key=lambda f: hilbert_key(f["geometry"]["coordinates"]))
+    elif order == "area":
+        features.sort(key=lambda f: -feature_area_km2(f["geometry"]))
+    elif order != "source":
+        raise ValueError(f"Unknown feature order: {order}")
+    return features
+
+
+def ring_area_km2(ring):
+    """Approximate area of a lng/lat ring in km² (equirectangular)."""
+    total = 0.0
+    for (x0, y0, *_), (x1, y1, *_) in zip(ring, ring[1:]):
+        total += x0 * y1 - x1 * y0
+    lat = sum(p[1] for p in ring) / len(ring)
+    return abs(total) / 2 * KM_PER_DEGREE * KM_PER_DEGREE * math.cos(math.radians(lat))
+
+
+def cull_small_parts(polygons, min_area_km2):
+    """Drop polygon parts and holes smaller than min_area_km2.
+
+    polygons is a list of GeoJSON polygons (lists of rings). The largest part
+    is always kept so no feature disappears. Returns (kept, removed) where
+    removed is the list of dropped rings.
+    """
+    if min_area_km2 <= 0 or not polygons:
+        return polygons, []
+    areas = [ring_area_km2(poly[0]) for poly in polygons]
+    largest = max(range(len(polygons)), key=areas.__getitem__)
+
+    kept, removed = [], []
+    for i, poly in enumerate(polygons):
+        if i != largest and areas[i] < min_area_km2:
+            removed.extend(poly)
+            continue
+        holes = []
+        for hole in poly[1:]:
+            (removed if ring_area_km2(hole) < min_area_km2 else holes).append(hole)
+        kept.append([poly[0]] + holes)
+    return kept, removed
+
+
+def feature_area_km2(geom):
+    """Approximate area of a Polygon/MultiPolygon geometry in km²."""
+    polys = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+    return sum(ring_area_km2(poly[0]) - sum(ring_area_km2(h) for h in poly[1:]) for poly in polys)
+
+
+def iter_geojsonseq(path):
+    """Stream features from a newline-delimited GeoJSON file with constant memory."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class QuantizationError(ValueError):
+    """Rounding broke a ring that was valid in the source data."""
+
+
+def adaptive_decimals(polygons):
+    """Pick the fewest decimals that keep rounding error below one display pixel.
+
+    A feature is assumed to be drawn at most DISPLAY_PIXELS across, so one
+    pixel is its extent / DISPLAY_PIXELS degrees; rounding to d decimals
+    moves a vertex by at most half of 10^-d. Large features (most of
+    北海道's municipalities) get fewer decimals than the fixed grid of the
+    prepare scripts and small ones (urban oaza) more, clamped to
+    MIN_DECIMALS..MAX_DECIMALS.
+    """
+    west, south, east, north = bbox(polygons)
+    extent = max(east - west, north - south, 1e-9)
+    decimals = math.ceil(math.log10(DISPLAY_PIXELS / (2 * extent)))
+    return min(max(decimals, MIN_DECIMALS), MAX_DECIMALS)
+
+
+def _dedupe(ring):
+    out = [ring[0]]
+    for p in ring[1:]:
+        if p[0] != out[-1][0] or p[1] != out[-1][1]:
+            out.append(p)
+    return out
+
+
+def _orient(ax, ay, bx, by, cx, cy):
+    v = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    return (v > 0) - (v < 0)
+
+
+def _on_segment(ax, ay, bx, by, cx, cy):
+    return min(ax, bx) <= cx <= max(ax, bx) and min(ay, by) <= cy <= max(ay, by)
+
+
+def _segments_touch(a, b, c, d):
+    o1 = _orient(*a, *b, *c)
+    o2 = _orient(*a, *b, *d)
+    o3 = _orient(*c, *d, *a)
+    o4 = _orient(*c, *d, *b)
+    if o1 != o2 and o3 != o4:
+        return True
+    return ((o1 == 0 and _on_segment(*a, *b, *c)) or (o2 == 0 and _on_segment(*a, *b, *d))
+            or (o3 == 0 and _on_segment(*c, *d, *a)) or (o4 == 0 and _on_segment(*c, *d, *b)))
+
+
+def ring_is_valid(ring):
+    """False if a ring is collapsed (< 3 distinct vertices, zero area) or self-intersecting."""
+    pts = [(p[0], p[1]) for p in _dedupe(ring)]
+    if pts[0] != pts[-1]:
+        pts.append(pts[0])
+    n = len(pts) - 1  # Number of segments
+    if n < 3:
+        return False
+    area2 = sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(pts, pts[1:]))
+    if area2 == 0:
+        return False
+
+    # Spikes: consecutive segments doubling back on themselves
+    for i in range(n):
+        (ax, ay), (bx, by), (cx, cy) = pts[i - 1 if i else n - 1], pts[i], pts[i + 1]
+        if _orient(ax, ay, bx, by, cx, cy) == 0 and (bx - ax) * (cx - bx) + (by - ay) * (cy - by) < 0:
+            return False
+
+    # Sweep over x: only segments with overlapping x ranges can intersect
+    order = sorted(range(n), key=lambda i: min(pts[i][0], pts[i + 1][0]))
+    active = []
+    for i in order:
+        a, b = pts[i], pts[i + 1]
+        xmin = min(a[0], b[0])
+        active = [j for j in active if max(pts[j][0], pts[j + 1][0]) >= xmin]
+        ymin, ymax = min(a[1], b[1]), max(a[1], b[1])
+        for j in active:
+            if abs(i - j) == 1 or abs(i - j) == n - 1:
+                continue  # Neighbours share a vertex
+            c, d = pts[j], pts[j + 1]
+            if max(c[1], d[1]) < ymin or min(c[1], d[1]) > ymax:
+                continue
+            if _segments_touch(a, b, c, d):
+                return False
+        active.append(i)
+    return True
+
+
+def _scaled_ring(ring, decimals):
+    scale = 10 ** decimals
+    return [(round(p[0] * scale), round(p[1] * scale)) for p in ring]
+
+
+def quantize_adaptive(polygons, name=""):
+    """Round polygons to adaptive_decimals(), raising precision only for rings that break.
+
+    Each ring starts at the feature's adaptive precision; a ring that is valid
+    in the source but collapses or self-intersects when rounded gets one more
+    decimal at a time, up to MAX_DECIMALS. The other rings keep the coarse
+    precision, so one awkward ring doesn't enlarge the whole feature.
+
+    Returns (rounded polygons, decimals) where decimals is the finest precision
+    used by any ring, i.e. the grid every vertex lies on. Raises
+    QuantizationError if a ring still breaks at MAX_DECIMALS.
+    """
+    base = adaptive_decimals(polygons)
+    finest = base
+    rounded = []
+    for poly in polygons:
+        out = []
+        for ring in poly:
+            decimals = base
+            source_valid = None
+            while True:
+                r = [[round(x, decimals), round(y, decimals)] for x, y, *_ in ring]
+                # Both sides are checked in exact integer arithmetic
+                if ring_is_valid(_scaled_ring(r, decimals)):
+                    break
+                if source_valid is None:
+                    source_valid = ring_is_valid(_scaled_ring(ring, SOURCE_DECIMALS))
+                if not source_valid:
+                    break  # Broken in the source already; cleanup deals with it
+                if decimals >= MAX_DECIMALS:
+                    raise QuantizationError(
+                        f"{name}: a {len(ring)}-vertex ring collapses or self-intersects at {decimals} decimals")
+                decimals += 1
+            finest = max(finest, decimals)
+            out.append(r)
+        rounded.append(out)
+    return rounded, finest
+
+
+def _clean_keep_numpy(keys):
+    """Indices of an open ring's vertices that survive cleanup (NumPy path)."""
+    pts = np.asarray(keys, dtype=np.int64)
+    idx = np.arange(len(pts))
+    while len(idx) >= 3:
+        p = pts[idx]
+        # Repeated points: drop a vertex equal to its predecessor
+        keep = np.any(p != np.roll(p, 1, axis=0), axis=1)
+        if not keep.all():
+            idx = idx[keep]
+            continue
+        # Collinear midpoints (including spike tips): zero cross product
+        prev, nxt = np.roll(p, 1, axis=0), np.roll(p, -1, axis=0)
+        cross = (p[:, 0] - prev[:, 0]) * (nxt[:, 1] - prev[:, 1]) - (p[:, 1] - prev[:, 1]) * (nxt[:, 0] - prev[:, 0])
+        keep = cross != 0
+        if keep.all():
+            break
+        idx = idx[keep]
+    return idx.tolist()
+
+
+def _clean_keep_python(keys):
+    """Indices of an open ring's vertices that survive cleanup (pure-Python path)."""
+    idx = list(range(len(keys)))
+    while len(idx) >= 3:
+        p = [keys[i] for i in idx]
+        n = len(p)
+        keep = [p[i] != p[i - 1] for i in range(n)]
+        if not all(keep):
+            idx = [i for i, k in zip(idx, keep) if k]
+            continue
+        keep = []
+        for i in range(n):
+            (ax, ay), (bx, by), (cx, cy) = p[i - 1], p[i], p[(i + 1) % n]
+            keep.append((bx - ax) * (cy - ay) - (by - ay) * (cx - ax) != 0)
+        if all(keep):
+            break
+        idx = [i for i, k in zip(idx, keep) if k]
+    return idx
+
+
+def _clean_indices(open_ring, decimals):
+    if len(open_ring) < 3:
+        return []
+    keys = _scaled_ring(open_ring, decimals)
+    return _clean_keep_numpy(keys) if np is not None else _clean_keep_python(keys)
+
+
+def clean_ring(ring, decimals):
+    """Remove repeated points and collinear midpoints from a quantized ring.
+
+    Tests run on the integer grid of the given precision, so they are exact.
+    Returns the cleaned closed ring, or None if fewer than 3 distinct vertices
+    (4 positions) remain.
+    """
+    open_ring = ring[:-1] if ring[0] == ring[-1] else ring
+    idx = _clean_indices(open_ring, decimals)
+    if len(idx) < 3:
+        return None
+    return [open_ring[i] for i in idx] + [open_ring[idx[0]]]
+
+
+def clean_polygons(polygons, decimals):
+    """Run the ring cleanup over every ring of a list of polygons.
+
+    A polygon whose exterior collapses is dropped together with its holes.
+    Returns (polygons, removed) where removed lists every dropped position,
+    for reporting.
+    """
+    kept, removed = [], []
+    for poly in polygons:
+        rings = []
+        for ring in poly:
+            open_ring = ring[:-1] if ring[0] == ring[-1] else ring
+            idx = _clean_indices(open_ring, decimals)
+            if len(idx) < 3:
+                if not rings:
+                    removed.extend(p for r in poly for p in r)  # Exterior collapsed
+                    break
+                removed.extend(ring)
+                continue
+            survivors = set(idx)
+            removed.extend(p for i, p in enumerate(open_ring) if i not in survivors)
+            rings.append([open_ring[i] for i in idx] + [open_ring[idx[0]]])
+        else:
+            kept.append(rings)
+    return kept, removed
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Ingest river centrelines from a local OpenStreetMap extract and join them to
+the municipality boundaries.
+
+Reads an .osm.pbf or OSM XML file in two streaming passes (scripts/osmread.py):
+  1. ways tagged waterway=river whose name is a river in src/data/rivers.json;
+     only their node id lists are kept
+  2. coordinates of the nodes those ways use
+
+Ways are joined end to end into polylines per river and simplified. Each
+polyline is then joined against the municipality boundaries with
+PolygonIndex.crossed() (scripts/spatial.py): bbox grid candidates, then
+vectorized segment/edge intersection and containment tests. Polylines that
+touch none of the river's hand-entered prefectures are dropped, which
+separates rivers that share a name (旭川 in 岡山 vs. the one in 北海道).
+
+Outputs to public/data/rivers-osm.json: a FeatureCollection with one
+LineString/MultiLineString per river (name, municipalities in order along the
+river, prefectures). Rivers whose joined prefectures differ from the
+hand-entered ones are listed in the summary.
+
+Usage:
+  python3 scripts/ingest-rivers.py japan-latest.osm.pbf
+  python3 scripts/ingest-rivers.py scripts/fixtures/rivers.osm
+
+Run scripts/prepare-geojson.py first. Requires numpy.
+"""
+import argparse
+import json
+import os
+import time
+
+from dissolve import simplify
+from osmread import iter_osm, merge_ways
+from project import PUBLIC_DATA_DIR, SRC_DATA_DIR
+from serialize import write_feature_collection
+from spatial import PolygonIndex, load_municipalities
+
+RIVERS_PATH = os.path.join(SRC_DATA_DIR, "rivers.json")
+OUTPUT_PATH = os.path.join(PUBLIC_DATA_DIR, "rivers-osm.json")
+
+RIVER_WATERWAYS = {"river"}
+TOLERANCE = 0.0005  # Douglas-Peucker tolerance in degrees (~50m)
+DECIMALS = 4  # Coordinate precision (~11m accuracy)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("extract", help="local .osm.pbf or .osm file")
+    args = parser.parse_args()
+
+    with open(RIVERS_PATH, encoding="utf-8") as f:
+        rivers = {r["name"]: r for r in json.load(f)["rivers"]}
+
+    start = time.perf_counter()
+    ways = {}  # river name -> [node ids of each way]
+    needed = set()
+    for _, _way_id, refs, tags in iter_osm(args.extract, nodes=False):
+        if tags.get("waterway") in RIVER_WATERWAYS and tags.get("name") in rivers:
+            ways.setdefault(tags["name"], []).append(refs)
+            needed.update(refs)
+    print(f"Pass 1: {sum(len(w) for w in ways.values())} ways for {len(ways)} rivers")
+
+    coords = {}
+    for _, node_id, lon, lat, _tags in iter_osm(args.extract, ways=False):
+        if node_id in needed:
+            coords[node_id] = (lon, lat)
+    print(f"Pass 2: {len(coords)} of {len(needed)} nodes")
+
+    index = PolygonIndex(load_municipalities())
+    join_start = time.perf_counter()
+    features, mismatched = [], []
+    for name in sorted(ways, key=list(rivers).index):
+        expected = set(rivers[name]["prefectures"])
+        lines, munis = [], []
+        for chain in merge_ways(ways[name]):
+            points = [coords[n] for n in chain if n in coords]
+            if len(points) < 2:
+                continue
+            points = simplify(points, TOLERANCE)
+            crossed = index.crossed(points)
+            if not expected & {code[:2] for code in crossed}:
+                continue  # Another river with the same name
+            lines.append([list(p) for p in points])
+            munis.extend(code for code in crossed if code not in munis)
+        if not lines:
+            continue
+
+        prefs = list(dict.fromkeys(code[:2] for code in munis))
+        if set(prefs) != expected:
+            mismatched.append((name, prefs, rivers[name]["prefectures"]))
+        geometry = ({"type": "LineString", "coordinates": lines[0]} if len(lines) == 1
+                    else {"type": "MultiLineString", "coordinates": lines})
+        features.append({
+            "type": "Feature",
+            "properties": {"name": name, "municipalities": munis, "prefectures": prefs},
+            "geometry": geometry,
+        })
+        print(f"  {name}: {len(lines)} lines, {sum(len(l) for l in lines)} vertices, "
+              f"{len(munis)} municipalities in {','.join(prefs)}")
+    join_elapsed = time.perf_counter() - join_start
+
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+    write_feature_collection(OUTPUT_PATH, features, DECIMALS)
+    size = os.path.getsize(OUTPUT_PATH)
+
+    if mismatched:
+        print("\nPrefectures differing from src/data/rivers.json:")
+        for name, prefs, expected in mismatched:
+            print(f"  {name}: joined {','.join(prefs)}, hand-entered {','.join(expected)}")
+
+    elapsed = time.perf_counter() - start
+    print(f"\nTotal: {len(features)} rivers, {size // 1024}KB, join {join_elapsed:.2f}s, {elapsed:.1f}s overall")
+
+
+if __name__ == "__main__":
+    main()
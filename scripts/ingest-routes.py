@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Ingest national route geometry from a local OpenStreetMap extract.
+
+Reads an .osm.pbf or OSM XML file in two streaming passes (scripts/osmread.py):
+  1. ways tagged highway=trunk (一般国道 in Japanese OSM tagging) whose ref
+     names a route in src/data/roads.json; only their node id lists are kept
+  2. coordinates of the nodes those ways use
+
+so memory grows with the selected routes, not with the extract. Ways are
+joined end to end into polylines per route, simplified, and split into
+per-prefecture runs by locating each vertex in the municipality boundaries
+(vertices off land, e.g. on bridges, stay with the run they continue).
+
+Outputs to public/data/routes/{pref}.json: a FeatureCollection with one
+LineString/MultiLineString per route (number, name).
+
+Usage:
+  python3 scripts/ingest-routes.py japan-latest.osm.pbf
+  python3 scripts/ingest-routes.py scripts/fixtures/national-routes.osm
+
+Run scripts/prepare-geojson.py first. Requires numpy (for the simplifier).
+"""
+import argparse
+import json
+import os
+import time
+
+from dissolve import simplify
+from osmread import iter_osm, merge_ways
+from project import PUBLIC_DATA_DIR, SRC_DATA_DIR
+from serialize import write_feature_collection
+from spatial import PolygonIndex, load_municipalities
+
+ROADS_PATH = os.path.join(SRC_DATA_DIR, "roads.json")
+OUTPUT_DIR = os.path.join(PUBLIC_DATA_DIR, "routes")
+
+ROUTE_HIGHWAYS = {"trunk"}
+TOLERANCE = 0.0005  # Douglas-Peucker tolerance in degrees (~50m)
+DECIMALS = 4  # Coordinate precision (~11m accuracy)
+
+
+def route_refs(tags, numbers):
+    """Route numbers a way belongs to (ref may list several, e.g. "1;15")."""
+    if tags.get("highway") not in ROUTE_HIGHWAYS or "ref" not in tags:
+        return []
+    refs = []
+    for ref in tags["ref"].replace("；", ";").split(";"):
+        ref = ref.strip()
+        if ref.isdigit() and int(ref) in numbers:
+            refs.append(int(ref))
+    return refs
+
+
+def split_by_prefecture(points, index):
+    """Split a polyline into (pref_code, run) pieces; runs share their boundary vertex."""
+    runs, current, code = [], [], None
+    for x, y in points:
+        muni = index.locate(x, y)
+        pref = muni[:2] if muni else code
+        if pref != code and current:
+            if code is not None:
+                runs.append((code, current))
+            current = [current[-1]]
+        code = pref
+        current.append((x, y))
+    if code is not None and len(current) >= 2:
+        runs.append((code, current))
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("extract", help="local .osm.pbf or .osm file")
+    args = parser.parse_args()
+
+    with open(ROADS_PATH, encoding="utf-8") as f:
+        names = {r["number"]: r["name"] for r in json.load(f)["roads"]}
+
+    start = time.perf_counter()
+    ways = {}  # route number -> [node ids of each way]
+    needed = set()
+    for _, _way_id, refs, tags in iter_osm(args.extract, nodes=False):
+        for number in route_refs(tags, names):
+            ways.setdefault(number, []).append(refs)
+            needed.update(refs)
+    print(f"Pass 1: {sum(len(w) for w in ways.values())} ways for {len(ways)} routes")
+
+    coords = {}
+    for _, node_id, lon, lat, _tags in iter_osm(args.extract, ways=False):
+        if node_id in needed:
+            coords[node_id] = (lon, lat)
+    print(f"Pass 2: {len(coords)} of {len(needed)} nodes")
+
+    index = PolygonIndex(load_municipalities())
+    by_pref = {}
+    for number in sorted(ways):
+        for chain in merge_ways(ways[number]):
+            points = [coords[n] for n in chain if n in coords]
+            if len(points) < 2:
+                continue
+            for pref, run in split_by_prefecture(simplify(points, TOLERANCE), index):
+                by_pref.setdefault(pref, {}).setdefault(number, []).append(run)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    for pref, routes in sorted(by_pref.items()):
+        features = []
+        for number, runs in sorted(routes.items()):
+            lines = [[list(p) for p in run] for run in runs]
+            geometry = ({"type": "LineString", "coordinates": lines[0]} if len(lines) == 1
+                        else {"type": "MultiLineString", "coordinates": lines})
+            features.append({
+                "type": "Feature",
+                "properties": {"number": number, "name": names[number]},
+                "geometry": geometry,
+            })
+        output_path = os.path.join(OUTPUT_DIR, f"{pref}.json")
+        write_feature_collection(output_path, features, DECIMALS)
+        size = os.path.getsize(output_path)
+        print(f"  {pref}: {len(features)} routes, {size // 1024}KB")
+
+    elapsed = time.perf_counter() - start
+    print(f"\nTotal: {len(ways)} routes in {len(by_pref)} prefectures in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Opt-in stage instrumentation for the prepare scripts.
+
+A script wraps each step of its per-prefecture work in recorder.stage():
+
+    with recorder.stage(pref_code, "parse") as stage:
+        data = json.loads(raw)
+        stage["features"] = len(data["features"])
+
+Until enable() is called a stage only yields a scratch dict, so the
+instrumented code runs at full speed. Once enabled, each stage records wall
+and CPU seconds plus the counters the block sets (bytesIn, bytesOut,
+features), and optionally:
+  - the tracemalloc peak above the allocation level at stage entry
+    (trace_memory; slows allocation-heavy stages 2-3x)
+  - a cProfile profile per stage name, summed over prefectures and written
+    to {profile_dir}/{script}-{stage}.prof (view with python3 -m pstats or
+    snakeviz)
+
+write_report() saves everything as JSON and prints the per-stage totals.
+
+Standard library only.
+"""
+import cProfile
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageRecorder:
+    """Per-prefecture, per-stage measurements of one script run."""
+
+    def __init__(self, script):
+        self.script = script
+        self.enabled = False
+        self.trace_memory = False
+        self.profile_dir = None
+        self.prefectures = {}  # pref code -> {stage: metrics}, in run order
+        self._profiles = {}  # stage -> cProfile.Profile
+
+    def enable(self, trace_memory=False, profile_dir=None):
+        self.enabled = True
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, pref_code, name):
+        """Measure the enclosed block as stage `name` of prefecture `pref_code`."""
+        counters = {}
+        if not self.enabled:
+            yield counters
+            return
+
+        profile = None
+        if self.profile_dir:
+            profile = self._profiles.setdefault(name, cProfile.Profile())
+            profile.enable()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield counters
+        finally:
+            seconds = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            if profile:
+                profile.disable()
+            metrics = self.prefectures.setdefault(pref_code, {}).setdefault(name, {"seconds": 0.0, "cpu": 0.0})
+            metrics["seconds"] += seconds
+            metrics["cpu"] += cpu
+            for key, value in counters.items():
+                metrics[key] = metrics.get(key, 0) + value
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] - base
+                metrics["peakBytes"] = max(metrics.get("peakBytes", 0), peak)
+
+    def stage_totals(self):
+        """Metrics summed over prefectures per stage (peakBytes is the maximum)."""
+        totals = {}
+        for stages in self.prefectures.values():
+            for name, metrics in stages.items():
+                total = totals.setdefault(name, {})
+                for key, value in metrics.items():
+                    total[key] = max(total.get(key, 0), value) if key == "peakBytes" else total.get(key, 0) + value
+        return totals
+
+    def write_report(self, path, args=None):
+        """Write the JSON report (if path is set) and profiles; print the stage totals."""
+        if not self.enabled:
+            return
+        totals = self.stage_totals()
+        for metrics in [m for stages in self.prefectures.values() for m in stages.values()] + list(totals.values()):
+            if metrics.get("features") and metrics["seconds"] > 0:
+                metrics["featuresPerSec"] = round(metrics["features"] / metrics["seconds"])
+        overall = sum(m["seconds"] for m in totals.values())
+        if not overall:
+            return
+
+        if path:
+            report = {
+                "script": self.script,
+                "args": args or {},
+                "python": platform.python_version(),
+                "traceMemory": self.trace_memory,
+                "seconds": overall,
+                "stages": totals,
+                "prefectures": {
+                    code: {"seconds": sum(m["seconds"] for m in stages.values()), "stages": stages}
+                    for code, stages in self.prefectures.items()
+                },
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            prefix = os.path.splitext(self.script)[0]
+            for name, profile in self._profiles.items():
+                profile.dump_stats(os.path.join(self.profile_dir, f"{prefix}-{name}.prof"))
+
+        print(f"\nStages ({overall:.1f}s instrumented):")
+        for name, m in sorted(totals.items(), key=lambda item: -item[1]["seconds"]):
+            line = f"  {name:<10} {m['seconds']:7.2f}s {m['seconds'] / overall:6.1%}  cpu {m['cpu']:7.2f}s"
+            if "featuresPerSec" in m:
+                line += f"  {m['featuresPerSec']:>9}/s"
+            if "bytesIn" in m:
+                line += f"  in {m['bytesIn'] // 1024}KB"
+            if "bytesOut" in m:
+                line += f"  out {m['bytesOut'] // 1024}KB"
+            if "peakBytes" in m:
+                line += f"  peak {m['peakBytes'] / (1024 * 1024):.1f}MB"
+            print(line)
+        if path:
+            print(f"Report: {path}")
@@ -0,0 +1,81 @@
+"""
+Join src/data/municipalities.json to the municipality boundary features.
+
+The boundary features carry a code and a name but nothing that names a
+ward's designated city, and ward names repeat within a prefecture (大阪市北区
+and 堺市北区). The join therefore goes by code:
+
+  - ward codes have 1 as their third digit (01101 札幌市中央区); sorted by
+    code, a prefecture's wards form one block per designated city, in the
+    order the cities are listed in municipalities.json
+  - a designated city has no boundary of its own; its code is its wards'
+    with the last digit 0 (01100 札幌市)
+  - every other entry takes the lowest unused code of the features with its
+    name (01 has two 泊村, 01403 and 01696)
+
+Any entry without a feature, or feature without an entry, raises ValueError
+rather than leaving a row without its code or reading.
+"""
+import json
+import os
+
+from project import SRC_DATA_DIR
+
+MUNICIPALITIES_PATH = os.path.join(SRC_DATA_DIR, "municipalities.json")
+
+
+def load_prefectures():
+    with open(MUNICIPALITIES_PATH, encoding="utf-8") as f:
+        return json.load(f)["prefectures"]
+
+
+def _is_ward(code):
+    return code[2] == "1"
+
+
+def match_features(pref, features):
+    """Pair a prefecture's entries with its GeoJSON features.
+
+    Returns [(code, name, reading, parent)] in municipalities.json order:
+    every municipality, each designated city followed by its wards (parent is
+    the city's name for a ward, else None). Designated cities have no feature;
+    every other row's code is a feature's.
+    """
+    cities = [muni for muni in pref["municipalities"] if muni.get("wards")]
+    ward_codes, codes_by_name = [], {}
+    for feat in features:
+        code, name = feat["properties"]["code"], feat["properties"]["name"]
+        if cities and _is_ward(code):
+            ward_codes.append((code, name))
+        else:
+            codes_by_name.setdefault(name, []).append(code)
+    ward_codes.sort()
+    for codes in codes_by_name.values():
+        codes.sort(reverse=True)
+
+    wanted = sum(len(city["wards"]) for city in cities)
+    if len(ward_codes) != wanted:
+        raise ValueError(f"{pref['code']}: {len(ward_codes)} ward features for {wanted} wards "
+                         "in municipalities.json")
+
+    rows, start = [], 0
+    for muni in pref["municipalities"]:
+        wards = muni.get("wards")
+        if not wards:
+            codes = codes_by_name.get(muni["name"])
+            if not codes:
+                raise ValueError(f"{pref['code']}: no feature for {muni['name']}")
+            rows.append((codes.pop(), muni["name"], muni.get("reading"), None))
+            continue
+        block = {name: code for code, name in ward_codes[start:start + len(wards)]}
+        start += len(wards)
+        missing = [ward["name"] for ward in wards if ward["name"] not in block]
+        if missing:
+            raise ValueError(f"{pref['code']}: no ward feature for {muni['name']} {', '.join(missing)}")
+        rows.append((min(block.values())[:4] + "0", muni["name"], muni.get("reading"), None))
+        rows.extend((block[ward["name"]], ward["name"], ward.get("reading"), muni["name"]) for ward in wards)
+
+    unmatched = [code for codes in codes_by_name.values() for code in codes]
+    if unmatched:
+        raise ValueError(f"{pref['code']}: features not in municipalities.json: {', '.join(sorted(unmatched))}")
+    return rows
@@ -0,0 +1,257 @@
+"""
+Streaming readers for local OpenStreetMap extracts (.osm.pbf and .osm XML).
+
+Both readers yield elements one at a time and keep only the current XML
+element or PBF block in memory, so an extract of any size is read in constant
+memory:
+
+  ("node", id, lon, lat, tags)
+  ("way", id, node_ids, tags)
+
+Relations are skipped. merge_ways() joins the ways of one feature (a route,
+a river) into polylines. The PBF reader decodes the protobuf wire format
+directly (no protobuf package needed) and handles both dense and plain nodes
+and raw or zlib-compressed blobs.
+
+Standard library only.
+"""
+import struct
+import xml.etree.ElementTree as ET
+import zlib
+
+
+def iter_osm(path, nodes=True, ways=True):
+    """Yield nodes and/or ways from an .osm.pbf or OSM XML file."""
+    if path.endswith(".pbf"):
+        return iter_pbf(path, nodes, ways)
+    return iter_xml(path, nodes, ways)
+
+
+def iter_xml(path, nodes=True, ways=True):
+    """Yield elements from OSM XML via iterparse, clearing the tree as it goes."""
+    root, tags, refs = None, {}, []
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            elif elem.tag in ("node", "way"):
+                tags, refs = {}, []
+            continue
+        if elem.tag == "tag":
+            tags[elem.get("k")] = elem.get("v")
+        elif elem.tag == "nd":
+            refs.append(int(elem.get("ref")))
+        elif elem.tag == "node":
+            if nodes:
+                yield "node", int(elem.get("id")), float(elem.get("lon")), float(elem.get("lat")), tags
+            root.clear()  # Drop the finished element from the tree
+        elif elem.tag == "way":
+            if ways:
+                yield "way", int(elem.get("id")), refs, tags
+            root.clear()
+        elif elem.tag == "relation":
+            root.clear()
+
+
+def merge_ways(lines):
+    """Join way node id lists that share endpoints into as few polylines as possible."""
+    lines = [list(line) for line in lines if len(line) >= 2]
+    by_end = {}
+    for i, line in enumerate(lines):
+        by_end.setdefault(line[0], []).append(i)
+        by_end.setdefault(line[-1], []).append(i)
+
+    used = [False] * len(lines)
+
+    def take(node):
+        for i in by_end.get(node, ()):
+            if not used[i]:
+                used[i] = True
+                return lines[i] if lines[i][0] == node else lines[i][::-1]
+        return None
+
+    merged = []
+    for i, line in enumerate(lines):
+        if used[i]:
+            continue
+        used[i] = True
+        chain = list(line)
+        while (nxt := take(chain[-1])) is not None:
+            chain.extend(nxt[1:])
+        while (prev := take(chain[0])) is not None:
+            chain[:0] = prev[::-1][:-1]
+        merged.append(chain)
+    return merged
+
+
+# --- Protobuf wire format ----------------------------------------------------
+
+def _varint(buf, pos):
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _zigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _int64(n):
+    return n - (1 << 64) if n >= 1 << 63 else n
+
+
+def _fields(buf):
+    """Yield (field number, value) from a protobuf message; length-delimited values are bytes."""
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _varint(buf, pos)
+        elif wire == 2:
+            size, pos = _varint(buf, pos)
+            value = buf[pos:pos + size]
+            pos += size
+        elif wire == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"unsupported protobuf wire type {wire}")
+        yield field, value
+
+
+def _packed(buf):
+    """Decode a packed repeated varint field."""
+    values, pos, end = [], 0, len(buf)
+    while pos < end:
+        n, pos = _varint(buf, pos)
+        values.append(n)
+    return values
+
+
+def _delta(values):
+    """Decode packed sint64 deltas into absolute values."""
+    out, acc = [], 0
+    for v in values:
+        acc += _zigzag(v)
+        out.append(acc)
+    return out
+
+
+def _blocks(path):
+    """Yield the decompressed OSMData blocks of a PBF file."""
+    with open(path, "rb") as f:
+        while True:
+            head = f.read(4)
+            if len(head) < 4:
+                return
+            (header_size,) = struct.unpack(">I", head)
+            blob_type, data_size = None, 0
+            for field, value in _fields(f.read(header_size)):
+                if field == 1:
+                    blob_type = bytes(value).decode("ascii")
+                elif field == 3:
+                    data_size = value
+            blob = f.read(data_size)
+            if blob_type != "OSMData":
+                continue
+            for field, value in _fields(blob):
+                if field == 1:
+                    yield bytes(value)
+                elif field == 3:
+                    yield zlib.decompress(value)
+                elif field in (4, 5, 6, 7):
+                    raise ValueError("unsupported PBF blob compression")
+
+
+def _tags(keys, vals, strings):
+    return {strings[k]: strings[v] for k, v in zip(keys, vals)}
+
+
+def iter_pbf(path, nodes=True, ways=True):
+    """Yield elements from an .osm.pbf file one block at a time."""
+    for block in _blocks(path):
+        block = memoryview(block)
+        strings, groups = [], []
+        granularity, lat_offset, lon_offset = 100, 0, 0
+        for field, value in _fields(block):
+            if field == 1:
+                strings = [bytes(s).decode("utf-8") for f, s in _fields(value) if f == 1]
+            elif field == 2:
+                groups.append(value)
+            elif field == 17:
+                granularity = value
+            elif field == 19:
+                lat_offset = _int64(value)
+            elif field == 20:
+                lon_offset = _int64(value)
+        scale = granularity * 1e-9
+
+        for group in groups:
+            for field, value in _fields(group):
+                if field == 2 and nodes:
+                    yield from _dense_nodes(value, strings, scale, lat_offset, lon_offset)
+                elif field == 1 and nodes:
+                    yield _node(value, strings, scale, lat_offset, lon_offset)
+                elif field == 3 and ways:
+                    yield _way(value, strings)
+
+
+def _node(buf, strings, scale, lat_offset, lon_offset):
+    node_id, keys, vals, lat, lon = 0, [], [], 0, 0
+    for field, value in _fields(buf):
+        if field == 1:
+            node_id = _zigzag(value)
+        elif field == 2:
+            keys = _packed(value)
+        elif field == 3:
+            vals = _packed(value)
+        elif field == 8:
+            lat = _zigzag(value)
+        elif field == 9:
+            lon = _zigzag(value)
+    return ("node", node_id, lon_offset * 1e-9 + lon * scale, lat_offset * 1e-9 + lat * scale,
+            _tags(keys, vals, strings))
+
+
+def _dense_nodes(buf, strings, scale, lat_offset, lon_offset):
+    ids, lats, lons, keys_vals = [], [], [], []
+    for field, value in _fields(buf):
+        if field == 1:
+            ids = _delta(_packed(value))
+        elif field == 8:
+            lats = _delta(_packed(value))
+        elif field == 9:
+            lons = _delta(_packed(value))
+        elif field == 10:
+            keys_vals = _packed(value)
+    pos = 0
+    for node_id, lat, lon in zip(ids, lats, lons):
+        tags = {}
+        while pos < len(keys_vals) and keys_vals[pos] != 0:
+            tags[strings[keys_vals[pos]]] = strings[keys_vals[pos + 1]]
+            pos += 2
+        pos += 1
+        yield "node", node_id, lon_offset * 1e-9 + lon * scale, lat_offset * 1e-9 + lat * scale, tags
+
+
+def _way(buf, strings):
+    way_id, keys, vals, refs = 0, [], [], []
+    for field, value in _fields(buf):
+        if field == 1:
+            way_id = value
+        elif field == 2:
+            keys = _packed(value)
+        elif field == 3:
+            vals = _packed(value)
+        elif field == 8:
+            refs = _delta(_packed(value))
+    return "way", way_id, refs, _tags(keys, vals, strings)
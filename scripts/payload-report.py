@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Report the size of every generated data file and fail the build when a
+payload budget is exceeded.
+
+The report covers every JSON/NDJSON/PNG file under public/data/ and the
+generated datasets the pages import from src/data/ (SRC_DATASETS: the
+columnar files and the shards, see scripts/datasets.py). For each file it
+records:
+  raw            bytes on disk
+  gzip, brotli   precompressed bytes (brotli only with the brotli package
+                 installed), taken from build/compressed/ when
+                 compress-data.py's copy is up to date, else compressed here;
+                 PNGs are served as they are, so these equal raw
+  features       number of GeoJSON features (GeoJSON files only)
+  vertices       number of coordinate positions in them
+
+Layers are the top-level entries of public/data/ (geojson, oaza, overview,
+search, ...) and of the datasets (roads, roads.columnar, ...). The report prints the largest files, the files that changed
+most against the previous report, and per-layer totals with deltas, then
+saves itself to build/payload-report.json for the next comparison.
+
+Budgets are byte limits in scripts/payload-budgets.json:
+  "files":  {glob pattern: {metric: bytes}}  applies to each matching file
+  "layers": {layer: {metric: bytes}}         applies to the layer's total
+where metric is raw, gzip or brotli. Brotli budgets are skipped without the
+brotli package. Any exceeded budget makes the run exit 1.
+
+Usage:
+  python3 scripts/payload-report.py
+  python3 scripts/payload-report.py --top 30 --budgets my-budgets.json
+"""
+import argparse
+import fnmatch
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from compression import CODECS, COMPRESSIBLE_EXTENSIONS
+from project import BUILD_DIR, PUBLIC_DATA_DIR, SCRIPTS_DIR, SRC_DATA_DIR
+
+COMPRESSED_DIR = os.path.join(BUILD_DIR, "compressed")
+REPORT_PATH = os.path.join(BUILD_DIR, "payload-report.json")
+BUDGETS_PATH = os.path.join(SCRIPTS_DIR, "payload-budgets.json")
+
+METRICS = ["raw", *CODECS]
+REPORTED_EXTENSIONS = (*COMPRESSIBLE_EXTENSIONS, ".png")
+SRC_DATASETS = ("roads", "rivers")  # src/data/{name}.columnar.json and src/data/{name}/
+TOP_FILES = 10  # Files listed per section of the summary
+
+
+def count_positions(coords):
+    """Number of [x, y] positions in a nested GeoJSON coordinate array."""
+    if not coords:
+        return 0
+    if isinstance(coords[0], (int, float)):
+        return 1
+    if isinstance(coords[0][0], (int, float)):
+        return len(coords)
+    return sum(count_positions(c) for c in coords)
+
+
+def count_geometry(geom):
+    if not geom:
+        return 0
+    if geom["type"] == "GeometryCollection":
+        return sum(count_geometry(g) for g in geom["geometries"])
+    return count_positions(geom["coordinates"])
+
+
+def geojson_counts(data, rel_path):
+    """(features, vertices) of a GeoJSON file's content, or None for other JSON."""
+    if rel_path.endswith(".ndjson"):
+        features = [json.loads(line) for line in data.splitlines() if line.strip()]
+    else:
+        obj = json.loads(data)
+        if not isinstance(obj, dict) or obj.get("type") != "FeatureCollection":
+            return None
+        features = obj["features"]
+    return len(features), sum(count_geometry(f.get("geometry")) for f in features)
+
+
+def data_path(rel_path):
+    """Where a reported file lives: src/data/ for the datasets, else public/data/."""
+    name = rel_path.split("/", 1)[0].split(".", 1)[0]
+    return os.path.join(SRC_DATA_DIR if name in SRC_DATASETS else PUBLIC_DATA_DIR, rel_path)
+
+
+def list_files():
+    """Paths of every reported file, relative to its data directory."""
+    paths = []
+    tops = [(PUBLIC_DATA_DIR, PUBLIC_DATA_DIR)]
+    tops += [(os.path.join(SRC_DATA_DIR, name), SRC_DATA_DIR) for name in SRC_DATASETS]
+    for top, base in tops:
+        for root, _dirs, names in os.walk(top):
+            for fname in names:
+                if fname.endswith(REPORTED_EXTENSIONS):
+                    paths.append(os.path.relpath(os.path.join(root, fname), base).replace(os.sep, "/"))
+    paths += [f"{name}.columnar.json" for name in SRC_DATASETS
+              if os.path.exists(os.path.join(SRC_DATA_DIR, f"{name}.columnar.json"))]
+    return sorted(paths)
+
+
+def measure_file(rel_path):
+    """Sizes and GeoJSON counts of one reported file."""
+    src = data_path(rel_path)
+    src_mtime = os.stat(src).st_mtime_ns
+    with open(src, "rb") as f:
+        data = f.read()
+    entry = {"raw": len(data)}
+    if not rel_path.endswith(COMPRESSIBLE_EXTENSIONS):
+        entry.update((name, len(data)) for name in CODECS)
+        return entry
+    for name, (ext, compress) in CODECS.items():
+        copy = os.path.join(COMPRESSED_DIR, rel_path + ext)
+        if os.path.exists(copy) and os.stat(copy).st_mtime_ns >= src_mtime:
+            entry[name] = os.path.getsize(copy)
+        else:
+            entry[name] = len(compress(data))
+    counts = geojson_counts(data, rel_path)
+    if counts:
+        entry["features"], entry["vertices"] = counts
+    return entry
+
+
+def layer_of(rel_path):
+    first, _, rest = rel_path.partition("/")
+    return first if rest else os.path.splitext(first)[0]
+
+
+def layer_totals(files):
+    totals = {}
+    for rel_path, entry in files.items():
+        total = totals.setdefault(layer_of(rel_path), {"files": 0})
+        total["files"] += 1
+        for key, value in entry.items():
+            total[key] = total.get(key, 0) + value
+    return totals
+
+
+def check_budgets(budgets, files, layers):
+    """Return [(subject, metric, limit, actual)] for every exceeded budget."""
+    exceeded = []
+    for pattern, limits in budgets.get("files", {}).items():
+        for rel_path, entry in files.items():
+            if fnmatch.fnmatchcase(rel_path, pattern):
+                exceeded.extend((rel_path, metric, limit, entry[metric])
+                                for metric, limit in limits.items()
+                                if metric in entry and entry[metric] > limit)
+    for layer, limits in budgets.get("layers", {}).items():
+        if layer in layers:
+            exceeded.extend((f"layer {layer}", metric, limit, layers[layer][metric])
+                            for metric, limit in limits.items()
+                            if metric in layers[layer] and layers[layer][metric] > limit)
+    return exceeded
+
+
+def _kb(n):
+    return f"{n / 1024:,.0f}KB"
+
+
+def _delta(value, base):
+    if base is None:
+        return "new"
+    if not base:
+        return f"{value - base:+,}"
+    return f"{value - base:+,} ({(value - base) / base:+.1%})"
+
+
+def _sizes(entry):
+    return "  ".join(f"{metric} {_kb(entry[metric])}" for metric in METRICS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budgets", default=BUDGETS_PATH, help="budget file (default: %(default)s)")
+    parser.add_argument("--report", default=REPORT_PATH,
+                        help="report to compare against and overwrite (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=TOP_FILES, help="files listed per section (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="parallel processes (default: CPU count)")
+    args = parser.parse_args()
+
+    paths = list_files()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        files = dict(zip(paths, pool.map(measure_file, paths, chunksize=32)))
+    layers = layer_totals(files)
+
+    previous = {}
+    if os.path.exists(args.report):
+        with open(args.report, encoding="utf-8") as f:
+            previous = json.load(f)
+    prev_files = previous.get("files", {})
+    prev_layers = previous.get("layers", {})
+
+    print(f"Largest files ({args.top}):")
+    for rel_path in sorted(files, key=lambda p: -files[p]["raw"])[:args.top]:
+        entry = files[rel_path]
+        counts = f"  {entry['features']:,} features, {entry['vertices']:,} vertices" if "features" in entry else ""
+        print(f"  {rel_path:<32} {_sizes(entry)}{counts}")
+
+    if prev_files:
+        changes = [(files[p]["raw"] - prev_files.get(p, {}).get("raw", 0), p) for p in files]
+        changes += [(-entry["raw"], p) for p, entry in prev_files.items() if p not in files]
+        changes = sorted((c for c in changes if c[0]), key=lambda c: -abs(c[0]))[:args.top]
+        print(f"\nChanged since the previous report ({len(changes)} largest):" if changes
+              else "\nNo file changed size since the previous report")
+        for _, rel_path in changes:
+            if rel_path not in files:
+                print(f"  {rel_path:<32} removed ({_kb(prev_files[rel_path]['raw'])})")
+                continue
+            base = prev_files.get(rel_path, {})
+            line = "  ".join(f"{metric} {_delta(files[rel_path][metric], base.get(metric))}" for metric in METRICS)
+            if files[rel_path].get("vertices", 0) != base.get("vertices", 0) and "vertices" in base:
+                line += f"  vertices {_delta(files[rel_path]['vertices'], base['vertices'])}"
+            print(f"  {rel_path:<32} {line}")
+
+    print("\nLayers:")
+    for layer, total in sorted(layers.items(), key=lambda item: -item[1]["raw"]):
+        line = f"  {layer:<16} {total['files']:>5} files  {_sizes(total)}"
+        if layer in prev_layers:
+            line += f"  (raw {_delta(total['raw'], prev_layers[layer]['raw'])})"
+        print(line)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    with open(args.report + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"codecs": list(CODECS), "layers": layers, "files": files}, f, indent=1, sort_keys=True)
+    os.replace(args.report + ".tmp", args.report)
+
+    elapsed = time.perf_counter() - start
+    total_raw = sum(total["raw"] for total in layers.values())
+    print(f"\nTotal: {len(files)} files, {total_raw // (1024 * 1024)}MB "
+          f"({', '.join(f'{m} {sum(t[m] for t in layers.values()) // (1024 * 1024)}MB' for m in CODECS)}) "
+          f"in {elapsed:.1f}s")
+
+    with open(args.budgets, encoding="utf-8") as f:
+        budgets = json.load(f)
+    skipped = {metric for section in ("files", "layers") for limits in budgets.get(section, {}).values()
+               for metric in limits if metric not in METRICS}
+    if skipped:
+        print(f"Skipping {', '.join(sorted(skipped))} budgets (codec not installed)")
+    exceeded = check_budgets(budgets, files, layers)
+    if exceeded:
+        print(f"\nOver budget ({len(exceeded)}):")
+        for subject, metric, limit, actual in exceeded:
+            print(f"  {subject} {metric}: {actual:,} bytes > {limit:,} ({(actual - limit) / limit:+.1%})")
+        raise SystemExit(1)
+    print(f"All budgets met ({os.path.relpath(args.budgets)})")
+
+
+if __name__ == "__main__":
+    main()
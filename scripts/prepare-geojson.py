@@ -3,16 +3,27 @@
 Download and process municipality boundary GeoJSON from smartnews-smri/japan-topography.
 Outputs optimized per-prefecture GeoJSON files to public/data/geojson/.
 """
+import argparse
 import json
-import urllib.request
 import os
 import sys
 
-BASE_URL = "https://raw.githubusercontent.com/smartnews-smri/japan-topography/main/data/municipality/geojson/s0010"
-OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public", "data", "geojson")
+from geoutil import QuantizationError, clean_polygons, cull_small_parts, quantize_adaptive, sort_features
+from instrument import StageRecorder
+from project import GEOJSON_DIR as OUTPUT_DIR, PREF_CODES, read_source
+from serialize import SERIALIZERS, write_feature_collection, write_geojsonseq
 
 DECIMALS = 4  # Coordinate precision (~11m accuracy)
 
+recorder = StageRecorder("prepare-geojson.py")
+
+# Minimum area (km²) of islands and holes kept at each level of detail.
+# A feature's largest part is always kept.
+LOD_MIN_AREA = {
+    "full": 0.0,
+    "prefecture": 0.01,  # ~100m x 100m, sub-pixel at prefecture zoom
+}
+
 
 def quantize_coords(coords, decimals=DECIMALS):
     """Recursively round coordinates to reduce file size."""
@@ -21,82 +32,165 @@ def quantize_coords(coords, decimals=DECIMALS):
     return [quantize_coords(c, decimals) for c in coords]
 
 
-def process_prefecture(pref_code):
-    """Download and process a single prefecture's GeoJSON."""
-    url = f"{BASE_URL}/N03-21_{pref_code:02d}_210101.json"
-    print(f"  Downloading {pref_code:02d}...", end=" ", flush=True)
-
-    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        data = json.loads(resp.read())
-
-    # Group features by municipality name (merge split polygons)
-    muni_map = {}
-    for feat in data["features"]:
-        props = feat["properties"]
-        name = props.get("N03_004") or props.get("N03_003") or "unknown"
-        code = props.get("N03_007", "")
-
-        if name not in muni_map:
-            muni_map[name] = {
-                "name": name,
-                "code": code,
-                "polygons": [],
-            }
-
-        geom = feat["geometry"]
-        if geom["type"] == "Polygon":
-            muni_map[name]["polygons"].append(quantize_coords(geom["coordinates"]))
-        elif geom["type"] == "MultiPolygon":
-            for poly in geom["coordinates"]:
-                muni_map[name]["polygons"].append(quantize_coords(poly))
+def process_prefecture(pref_code, order="source", fmt="json", precision="fixed", serializer="fast", lod="full"):
+    """Process a single prefecture's GeoJSON (downloaded on first use, see scripts/project.py)."""
+    print(f"  Loading {pref_code}...", end=" ", flush=True)
+    with recorder.stage(pref_code, "download") as stage:
+        raw = read_source("municipality", pref_code)
+        stage["bytesIn"] = len(raw)
+    with recorder.stage(pref_code, "parse") as stage:
+        data = json.loads(raw)
+        stage["features"] = len(data["features"])
+    del raw
+
+    # Group features by municipality code (merge split polygons). Names repeat
+    # within a prefecture: wards of different cities (大阪市北区, 堺市北区) and
+    # 01's two 泊村.
+    with recorder.stage(pref_code, "group") as stage:
+        muni_map = {}
+        for feat in data["features"]:
+            props = feat["properties"]
+            name = props.get("N03_004") or props.get("N03_003") or "unknown"
+            code = props.get("N03_007") or ""
+            key = code or name
+
+            if key not in muni_map:
+                muni_map[key] = {
+                    "name": name,
+                    "code": code,
+                    "polygons": [],
+                }
+                # N03_003 is the district (郡) or, for a ward, its designated city
+                city = props.get("N03_003")
+                if props.get("N03_004") and city and city.endswith("市"):
+                    muni_map[key]["parent"] = city
+
+            geom = feat["geometry"]
+            if geom["type"] == "Polygon":
+                muni_map[key]["polygons"].append(geom["coordinates"])
+            elif geom["type"] == "MultiPolygon":
+                muni_map[key]["polygons"].extend(geom["coordinates"])
+        stage["features"] = len(data["features"])
+
+    # Adaptive precision is chosen per municipality from all of its parts
+    with recorder.stage(pref_code, "quantize") as stage:
+        for muni in muni_map.values():
+            if precision == "adaptive":
+                muni["polygons"], muni["precision"] = quantize_adaptive(muni["polygons"], muni["name"])
+            else:
+                muni["polygons"] = [quantize_coords(poly) for poly in muni["polygons"]]
+        stage["features"] = len(muni_map)
+
+    # Remove repeated points, collinear midpoints and collapsed rings left by rounding
+    with recorder.stage(pref_code, "clean") as stage:
+        cleaned_vertices = cleaned_bytes = 0
+        for muni in muni_map.values():
+            muni["polygons"], removed = clean_polygons(muni["polygons"], muni.get("precision", DECIMALS))
+            cleaned_vertices += len(removed)
+            cleaned_bytes += sum(len(json.dumps(p, separators=(",", ":"))) + 1 for p in removed)
+        stage["features"] = len(muni_map)
+
+    # Drop sub-pixel islands and holes for this level of detail
+    with recorder.stage(pref_code, "cull") as stage:
+        culled_rings = culled_vertices = culled_bytes = 0
+        for muni in muni_map.values():
+            muni["polygons"], removed = cull_small_parts(muni["polygons"], LOD_MIN_AREA[lod])
+            culled_rings += len(removed)
+            culled_vertices += sum(len(ring) for ring in removed)
+            culled_bytes += sum(len(json.dumps(ring, separators=(",", ":"))) + 1 for ring in removed)
+        stage["features"] = len(muni_map)
 
     # Build output GeoJSON
-    features = []
-    for muni in muni_map.values():
-        if len(muni["polygons"]) == 1:
-            geom = {"type": "Polygon", "coordinates": muni["polygons"][0]}
-        else:
-            geom = {"type": "MultiPolygon", "coordinates": muni["polygons"]}
-
-        features.append({
-            "type": "Feature",
-            "properties": {
+    with recorder.stage(pref_code, "build") as stage:
+        features = []
+        for muni in muni_map.values():
+            if not muni["polygons"]:
+                continue
+            if len(muni["polygons"]) == 1:
+                geom = {"type": "Polygon", "coordinates": muni["polygons"][0]}
+            else:
+                geom = {"type": "MultiPolygon", "coordinates": muni["polygons"]}
+
+            properties = {
                 "name": muni["name"],
                 "code": muni["code"],
-            },
-            "geometry": geom,
-        })
-
-    result = {
-        "type": "FeatureCollection",
-        "features": features,
-    }
-
-    output_path = os.path.join(OUTPUT_DIR, f"{pref_code:02d}.json")
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
-
-    size = os.path.getsize(output_path)
-    print(f"{len(features)} municipalities, {size // 1024}KB")
+            }
+            if "parent" in muni:
+                properties["parent"] = muni["parent"]
+            if muni.get("precision", DECIMALS) != DECIMALS:
+                properties["precision"] = muni["precision"]
+
+            features.append({
+                "type": "Feature",
+                "properties": properties,
+                "geometry": geom,
+            })
+
+        sort_features(features, order)
+        stage["features"] = len(features)
+
+    with recorder.stage(pref_code, "write") as stage:
+        if fmt == "ndjson":
+            output_path = os.path.join(OUTPUT_DIR, f"{pref_code}.ndjson")
+            write_geojsonseq(output_path, features, DECIMALS, serializer)
+        else:
+            output_path = os.path.join(OUTPUT_DIR, f"{pref_code}.json")
+            write_feature_collection(output_path, features, DECIMALS, serializer)
+        size = os.path.getsize(output_path)
+        stage["features"] = len(features)
+        stage["bytesOut"] = size
+
+    cleaned = f", cleaned {cleaned_vertices} vertices / {cleaned_bytes // 1024}KB" if cleaned_vertices else ""
+    culled = f", culled {culled_rings} rings / {culled_vertices} vertices / {culled_bytes // 1024}KB" if culled_rings else ""
+    print(f"{len(features)} municipalities, {size // 1024}KB{cleaned}{culled}")
     return len(features), size
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json", dest="fmt",
+                        help="json = one FeatureCollection per file, ndjson = one Feature per line for streaming")
+    parser.add_argument("--order", choices=["source", "hilbert", "area"],
+                        help="feature order within each output file (hilbert = by centroid along a Hilbert curve, "
+                             "area = largest first); defaults to area for ndjson, source otherwise")
+    parser.add_argument("--lod", choices=sorted(LOD_MIN_AREA), default="full",
+                        help="level of detail; drops islands and holes below its minimum area "
+                             "(full = keep every part, prefecture = drop parts under 0.01 km²)")
+    parser.add_argument("--precision", choices=["fixed", "adaptive"], default="fixed",
+                        help=f"fixed = {DECIMALS} decimals everywhere, adaptive = per feature from its extent "
+                             "(recorded in properties.precision where it differs)")
+    parser.add_argument("--serializer", choices=SERIALIZERS, default="fast",
+                        help="fast = dedicated coordinate writer (orjson for properties if installed), "
+                             "json = stdlib json.dump")
+    parser.add_argument("--profile-report", metavar="PATH",
+                        help="record a per-prefecture, per-stage breakdown (time, bytes, features/sec) "
+                             "and write it to PATH as JSON")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="also record each stage's tracemalloc peak (slows the run)")
+    parser.add_argument("--profile-dir", metavar="DIR", help="write a cProfile file per stage to DIR")
+    args = parser.parse_args()
+    if args.order is None:
+        args.order = "area" if args.fmt == "ndjson" else "source"
+    if args.profile_report or args.profile_memory or args.profile_dir:
+        recorder.enable(args.profile_memory, args.profile_dir)
+
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     total_munis = 0
     total_size = 0
 
-    for code in range(1, 48):
+    for code in PREF_CODES:
         try:
-            munis, size = process_prefecture(code)
+            munis, size = process_prefecture(code, args.order, args.fmt, args.precision, args.serializer, args.lod)
             total_munis += munis
             total_size += size
+        except QuantizationError:
+            raise
         except Exception as e:
             print(f"ERROR: {e}")
 
     print(f"\nTotal: {total_munis} municipalities, {total_size // 1024}KB across 47 files")
+    recorder.write_report(args.profile_report, vars(args))
 
 
 if __name__ == "__main__":
@@ -6,17 +6,20 @@ Also generates meta.json with oaza count per municipality.
 
 Data source: https://frogcat.github.io/japan-small-area/
 """
+import argparse
 import json
-import urllib.request
 import os
 import sys
-import time
 
-BASE_URL = "https://frogcat.github.io/japan-small-area"
-OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public", "data", "oaza")
+from geoutil import QuantizationError, clean_polygons, quantize_adaptive, sort_features
+from instrument import StageRecorder
+from project import OAZA_DIR as OUTPUT_DIR, PREF_CODES, read_source
+from serialize import SERIALIZERS, write_feature_collection, write_geojsonseq
 
 DECIMALS = 4  # Coordinate precision (~11m accuracy)
 
+recorder = StageRecorder("prepare-oaza.py")
+
 
 def quantize_coords(coords, decimals=DECIMALS):
     """Recursively round coordinates to reduce file size."""
@@ -41,116 +44,171 @@ def extract_muni_code(parent_str):
     return code_part[1:]  # "36208"
 
 
-def process_prefecture(pref_code):
-    """Download and process a single prefecture's oaza GeoJSON.
+def process_prefecture(pref_code, order="source", fmt="json", precision="fixed", serializer="fast"):
+    """Process a single prefecture's oaza GeoJSON (downloaded on first use, see scripts/project.py).
 
     Returns dict of { muni_code: oaza_count } for this prefecture.
     """
-    url = f"{BASE_URL}/{pref_code:02d}.json"
-    print(f"  Downloading {pref_code:02d}...", end=" ", flush=True)
-
-    req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
-    try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            data = json.loads(resp.read())
-    except Exception as e:
-        print(f"RETRY after error: {e}")
-        time.sleep(3)
-        with urllib.request.urlopen(req, timeout=120) as resp:
-            data = json.loads(resp.read())
+    print(f"  Loading {pref_code}...", end=" ", flush=True)
+    with recorder.stage(pref_code, "download") as stage:
+        raw = read_source("oaza", pref_code)
+        stage["bytesIn"] = len(raw)
+    with recorder.stage(pref_code, "parse") as stage:
+        data = json.loads(raw)
+        stage["features"] = len(data.get("features", []))
+    del raw
 
     # Group features by municipality code
     # muni_code -> { oaza_id -> { name, polygons[] } }
-    muni_map = {}
-
-    for feat in data.get("features", []):
-        props = feat.get("properties", {})
-        parent = props.get("parent", "")
-        muni_code = extract_muni_code(parent)
-        if not muni_code:
-            continue
-
-        # id is at feature level (URL), extract short code from last segment
-        raw_id = feat.get("id", "")
-        oaza_id = raw_id.rsplit("/", 1)[-1] if raw_id else ""
-        oaza_name = props.get("label", "")
-        if not oaza_name:
-            continue
-
-        if muni_code not in muni_map:
-            muni_map[muni_code] = {}
-
-        oaza_map = muni_map[muni_code]
-        if oaza_id not in oaza_map:
-            oaza_map[oaza_id] = {
-                "name": oaza_name,
-                "code": oaza_id,
-                "polygons": [],
-            }
+    with recorder.stage(pref_code, "group") as stage:
+        muni_map = {}
+
+        for feat in data.get("features", []):
+            props = feat.get("properties", {})
+            parent = props.get("parent", "")
+            muni_code = extract_muni_code(parent)
+            if not muni_code:
+                continue
 
-        geom = feat.get("geometry", {})
-        geom_type = geom.get("type", "")
-        coords = geom.get("coordinates", [])
+            # id is at feature level (URL), extract short code from last segment
+            raw_id = feat.get("id", "")
+            oaza_id = raw_id.rsplit("/", 1)[-1] if raw_id else ""
+            oaza_name = props.get("label", "")
+            if not oaza_name:
+                continue
 
-        if geom_type == "Polygon":
-            oaza_map[oaza_id]["polygons"].append(quantize_coords(coords))
-        elif geom_type == "MultiPolygon":
-            for poly in coords:
-                oaza_map[oaza_id]["polygons"].append(quantize_coords(poly))
+            if muni_code not in muni_map:
+                muni_map[muni_code] = {}
+
+            oaza_map = muni_map[muni_code]
+            if oaza_id not in oaza_map:
+                oaza_map[oaza_id] = {
+                    "name": oaza_name,
+                    "code": oaza_id,
+                    "polygons": [],
+                }
+
+            geom = feat.get("geometry", {})
+            geom_type = geom.get("type", "")
+            coords = geom.get("coordinates", [])
+
+            if geom_type == "Polygon":
+                oaza_map[oaza_id]["polygons"].append(coords)
+            elif geom_type == "MultiPolygon":
+                oaza_map[oaza_id]["polygons"].extend(coords)
+        stage["features"] = len(data.get("features", []))
+    oaza_count = sum(len(oaza_map) for oaza_map in muni_map.values())
+
+    # Adaptive precision is chosen per oaza from all of its parts
+    with recorder.stage(pref_code, "quantize") as stage:
+        for oaza_map in muni_map.values():
+            for oaza in oaza_map.values():
+                if precision == "fixed":
+                    oaza["polygons"] = [quantize_coords(poly) for poly in oaza["polygons"]]
+                elif oaza["polygons"]:
+                    oaza["polygons"], oaza["precision"] = quantize_adaptive(oaza["polygons"], oaza["name"])
+        stage["features"] = oaza_count
+
+    # Remove repeated points, collinear midpoints and collapsed rings left by rounding
+    with recorder.stage(pref_code, "clean") as stage:
+        cleaned_vertices = cleaned_bytes = 0
+        for oaza_map in muni_map.values():
+            for oaza in oaza_map.values():
+                oaza["polygons"], removed = clean_polygons(oaza["polygons"], oaza.get("precision", DECIMALS))
+                cleaned_vertices += len(removed)
+                cleaned_bytes += sum(len(json.dumps(p, separators=(",", ":"))) + 1 for p in removed)
+        stage["features"] = oaza_count
 
     # Write per-municipality GeoJSON files
     meta = {}
     for muni_code, oaza_map in muni_map.items():
-        features = []
-        for oaza in oaza_map.values():
-            if not oaza["polygons"]:
-                continue
-            if len(oaza["polygons"]) == 1:
-                geom = {"type": "Polygon", "coordinates": oaza["polygons"][0]}
-            else:
-                geom = {"type": "MultiPolygon", "coordinates": oaza["polygons"]}
-
-            features.append({
-                "type": "Feature",
-                "properties": {
+        with recorder.stage(pref_code, "build") as stage:
+            features = []
+            for oaza in oaza_map.values():
+                if not oaza["polygons"]:
+                    continue
+                if len(oaza["polygons"]) == 1:
+                    geom = {"type": "Polygon", "coordinates": oaza["polygons"][0]}
+                else:
+                    geom = {"type": "MultiPolygon", "coordinates": oaza["polygons"]}
+
+                properties = {
                     "name": oaza["name"],
                     "code": oaza["code"],
-                },
-                "geometry": geom,
-            })
+                }
+                if oaza.get("precision", DECIMALS) != DECIMALS:
+                    properties["precision"] = oaza["precision"]
+
+                features.append({
+                    "type": "Feature",
+                    "properties": properties,
+                    "geometry": geom,
+                })
+
+            if features:
+                sort_features(features, order)
+            stage["features"] = len(features)
 
         if not features:
             continue
 
-        result = {
-            "type": "FeatureCollection",
-            "features": features,
-        }
-
-        output_path = os.path.join(OUTPUT_DIR, f"{muni_code}.json")
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+        with recorder.stage(pref_code, "write") as stage:
+            if fmt == "ndjson":
+                output_path = os.path.join(OUTPUT_DIR, f"{muni_code}.ndjson")
+                write_geojsonseq(output_path, features, DECIMALS, serializer)
+            else:
+                output_path = os.path.join(OUTPUT_DIR, f"{muni_code}.json")
+                write_feature_collection(output_path, features, DECIMALS, serializer)
+            stage["features"] = len(features)
+            stage["bytesOut"] = os.path.getsize(output_path)
 
         meta[muni_code] = len(features)
 
     total_oaza = sum(meta.values())
-    print(f"{len(meta)} municipalities, {total_oaza} oaza areas")
+    cleaned = f", cleaned {cleaned_vertices} vertices / {cleaned_bytes // 1024}KB" if cleaned_vertices else ""
+    print(f"{len(meta)} municipalities, {total_oaza} oaza areas{cleaned}")
     return meta
 
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json", dest="fmt",
+                        help="json = one FeatureCollection per file, ndjson = one Feature per line for streaming")
+    parser.add_argument("--order", choices=["source", "hilbert", "area"],
+                        help="feature order within each output file (hilbert = by centroid along a Hilbert curve, "
+                             "area = largest first); defaults to area for ndjson, source otherwise")
+    parser.add_argument("--precision", choices=["fixed", "adaptive"], default="fixed",
+                        help=f"fixed = {DECIMALS} decimals everywhere, adaptive = per feature from its extent "
+                             "(recorded in properties.precision where it differs)")
+    parser.add_argument("--serializer", choices=SERIALIZERS, default="fast",
+                        help="fast = dedicated coordinate writer (orjson for properties if installed), "
+                             "json = stdlib json.dump")
+    parser.add_argument("--profile-report", metavar="PATH",
+                        help="record a per-prefecture, per-stage breakdown (time, bytes, features/sec) "
+                             "and write it to PATH as JSON")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="also record each stage's tracemalloc peak (slows the run)")
+    parser.add_argument("--profile-dir", metavar="DIR", help="write a cProfile file per stage to DIR")
+    args = parser.parse_args()
+    if args.order is None:
+        args.order = "area" if args.fmt == "ndjson" else "source"
+    if args.profile_report or args.profile_memory or args.profile_dir:
+        recorder.enable(args.profile_memory, args.profile_dir)
+
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     all_meta = {}
     total_munis = 0
     total_oaza = 0
 
-    for code in range(1, 48):
+    for code in PREF_CODES:
         try:
-            pref_meta = process_prefecture(code)
+            pref_meta = process_prefecture(code, args.order, args.fmt, args.precision, args.serializer)
             all_meta.update(pref_meta)
             total_munis += len(pref_meta)
             total_oaza += sum(pref_meta.values())
+        except QuantizationError:
+            raise
         except Exception as e:
             print(f"ERROR: {e}")
 
@@ -168,6 +226,7 @@ def main():
 
     print(f"\nTotal: {total_munis} municipalities, {total_oaza} oaza areas")
     print(f"Files: {len(os.listdir(OUTPUT_DIR))} files, {total_size // (1024 * 1024)}MB")
+    recorder.write_report(args.profile_report, vars(args))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+"""
+Paths and prefecture codes shared by the build scripts, and the download
+cache for the source boundary files.
+
+Source files are fetched once into build/sources/{layer}/{code}.json, by
+scripts/download-sources.py or on first use by the prepare scripts, so the
+prepare stages can be re-run offline and scripts/build.py can fingerprint
+their inputs.
+
+Standard library only.
+"""
+import os
+import time
+import urllib.request
+
+# GEODICT_ROOT points the data directories at another tree and
+# GEODICT_PREFECTURES (comma-separated codes) limits the prefectures, so a
+# whole build can run on the fixtures (scripts/tests/test_build.py).
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.environ.get("GEODICT_ROOT") or os.path.dirname(SCRIPTS_DIR)
+PUBLIC_DATA_DIR = os.path.join(PROJECT_ROOT, "public", "data")
+GEOJSON_DIR = os.path.join(PUBLIC_DATA_DIR, "geojson")
+OAZA_DIR = os.path.join(PUBLIC_DATA_DIR, "oaza")
+SRC_DATA_DIR = os.path.join(PROJECT_ROOT, "src", "data")
+BUILD_DIR = os.path.join(PROJECT_ROOT, "build")
+SOURCES_DIR = os.path.join(BUILD_DIR, "sources")
+
+PREF_CODES = [f"{i:02d}" for i in range(1, 48)]
+if os.environ.get("GEODICT_PREFECTURES"):
+    PREF_CODES = [code for code in PREF_CODES if code in os.environ["GEODICT_PREFECTURES"].split(",")]
+
+# Region grouping of the overview layer and the roads/rivers region shards
+REGIONS = {
+    "北海道": ["01"],
+    "東北": ["02", "03", "04", "05", "06", "07"],
+    "関東": ["08", "09", "10", "11", "12", "13", "14"],
+    "中部": ["15", "16", "17", "18", "19", "20", "21", "22", "23"],
+    "近畿": ["24", "25", "26", "27", "28", "29", "30"],
+    "中国": ["31", "32", "33", "34", "35"],
+    "四国": ["36", "37", "38", "39"],
+    "九州": ["40", "41", "42", "43", "44", "45", "46", "47"],
+}
+
+SOURCE_URLS = {
+    # smartnews-smri/japan-topography, 国土数値情報 N03 (2021)
+    "municipality": "https://raw.githubusercontent.com/smartnews-smri/japan-topography/main/data/municipality"
+                    "/geojson/s0010/N03-21_{code}_210101.json",
+    # frogcat/japan-small-area, e-Stat 小地域
+    "oaza": "https://frogcat.github.io/japan-small-area/{code}.json",
+}
+SOURCE_TIMEOUT = 60  # Seconds; doubled for the one retry
+
+
+def source_path(layer, code):
+    """Cache path of one prefecture's source file."""
+    return os.path.join(SOURCES_DIR, layer, f"{code}.json")
+
+
+def download_source(layer, code):
+    """Download one prefecture's source file into the cache; return its size."""
+    req = urllib.request.Request(SOURCE_URLS[layer].format(code=code), headers={"User-Agent": "Mozilla/5.0"})
+    try:
+        with urllib.request.urlopen(req, timeout=SOURCE_TIMEOUT) as resp:
+            data = resp.read()
+    except Exception as e:
+        print(f"RETRY after error: {e}", end=" ", flush=True)
+        time.sleep(3)
+        with urllib.request.urlopen(req, timeout=SOURCE_TIMEOUT * 2) as resp:
+            data = resp.read()
+
+    path = source_path(layer, code)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    return len(data)
+
+
+def read_source(layer, code):
+    """Return one prefecture's source file, downloading it if it isn't cached."""
+    path = source_path(layer, code)
+    if not os.path.exists(path):
+        download_source(layer, code)
+    with open(path, "rb") as f:
+        return f.read()
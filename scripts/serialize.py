@@ -0,0 +1,96 @@
+"""
+GeoJSON serializers shared by prepare-geojson.py and prepare-oaza.py.
+
+The "fast" serializer writes coordinates with a dedicated writer: each value is
+scaled to an integer at the feature's precision and formatted straight into
+decimal text (no float repr, no trailing zeros, never an exponent). The text
+is exactly what JavaScript's JSON.stringify() produces for the same numbers, so
+files round-trip byte-for-byte through JSON.parse/JSON.stringify. Properties go
+through orjson when it is installed, otherwise the stdlib json module; both
+give the same bytes for the string/int properties used here.
+
+The "json" serializer is the previous stdlib json.dump output, kept for
+comparison.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator
+    orjson = None
+
+SERIALIZERS = ("fast", "json")
+
+
+def dumps_value(obj):
+    """Compact JSON text for non-geometry values (non-ASCII kept as UTF-8)."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class CoordinateWriter:
+    """Formats coordinates rounded to `decimals` places as minimal decimal text."""
+
+    def __init__(self, decimals):
+        self.decimals = decimals
+        self.scale = 10 ** decimals
+        self._cache = {}  # Shared borders repeat the same values many times
+
+    def number(self, value):
+        """Format one pre-quantized coordinate."""
+        k = round(value * self.scale)
+        text = self._cache.get(k)
+        if text is None:
+            text = self._cache[k] = self.format_int(k)
+        return text
+
+    def format_int(self, k):
+        """Format the integer k / 10^decimals without going through float."""
+        sign = "-" if k < 0 else ""
+        whole, frac = divmod(abs(k), self.scale)
+        if not frac:
+            return f"{sign}{whole}"
+        digits = str(frac).rjust(self.decimals, "0").rstrip("0")
+        return f"{sign}{whole}.{digits}"
+
+    def coordinates(self, coords):
+        """Format a nested GeoJSON coordinate array."""
+        if isinstance(coords[0], (int, float)):
+            return "[" + ",".join(self.number(c) for c in coords) + "]"
+        return "[" + ",".join(self.coordinates(c) for c in coords) + "]"
+
+
+def dumps_feature(feature, decimals):
+    """Serialize a Feature; properties.precision overrides `decimals`."""
+    props = feature["properties"]
+    geom = feature["geometry"]
+    writer = CoordinateWriter(props.get("precision", decimals))
+    return (
+        '{"type":"Feature","properties":' + dumps_value(props)
+        + ',"geometry":{"type":' + dumps_value(geom["type"])
+        + ',"coordinates":' + writer.coordinates(geom["coordinates"]) + "}}"
+    )
+
+
+def write_feature_collection(path, features, decimals, serializer="fast"):
+    """Write features as one compact FeatureCollection."""
+    with open(path, "w", encoding="utf-8") as f:
+        if serializer == "json":
+            json.dump({"type": "FeatureCollection", "features": features}, f,
+                      ensure_ascii=False, separators=(",", ":"))
+            return
+        f.write('{"type":"FeatureCollection","features":[')
+        f.write(",".join(dumps_feature(feat, decimals) for feat in features))
+        f.write("]}")
+
+
+def write_geojsonseq(path, features, decimals, serializer="fast"):
+    """Write newline-delimited GeoJSON: one compact Feature per line."""
+    with open(path, "w", encoding="utf-8") as f:
+        for feat in features:
+            if serializer == "json":
+                f.write(json.dumps(feat, ensure_ascii=False, separators=(",", ":")))
+            else:
+                f.write(dumps_feature(feat, decimals))
+            f.write("\n")
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Simulate the client's oaza loading under different file layouts and network
+conditions.
+
+A session replays what PrefectureDetail does when 大字 mode is switched on:
+fetch /data/geojson/{pref}.json, take the municipality codes from it, then
+load every municipality's oaza areas the way usePrefectureOaza does. Layouts
+(built in memory from public/data/oaza/, nothing is written):
+  municipality       one request per municipality, all fired at once, as
+                     the client does today
+  prefecture         one FeatureCollection per prefecture; usable only once
+                     fully downloaded
+  prefecture-ndjson  one newline-delimited file per prefecture; features are
+                     parsed as they stream in
+
+Each layout runs with every encoding in --encodings (identity, gzip and,
+with the brotli package installed, brotli). The files are served by a local
+HTTP/1.1 server in a subprocess that adds one round trip of latency per
+request and shares the bandwidth of one simulated link between all responses
+of a session. The client opens at most --connections keep-alive connections
+(6, like a browser over HTTP/1.1; raise it to approximate HTTP/2), each
+paying HANDSHAKE_RTTS round trips to set up, and decompresses and parses
+every response.
+
+Reported per prefecture, layout and encoding, as the median of --repeat
+sessions:
+  first feature  session start until the first oaza feature is parsed
+  complete       session start until every oaza feature is parsed
+  requests, wire bytes  including the municipality boundary file
+
+Parsing runs in Python, so absolute times differ from a browser; compare
+layouts against each other.
+
+Usage:
+  python3 scripts/simulate-fetches.py
+  python3 scripts/simulate-fetches.py --network 3g --prefectures 31
+  python3 scripts/simulate-fetches.py --connections 100 --encodings gzip --json build/fetches.json
+
+Run scripts/prepare-geojson.py and scripts/prepare-oaza.py first.
+"""
+import argparse
+import http.client
+import http.server
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from compression import CODECS, brotli
+from project import GEOJSON_DIR, OAZA_DIR
+
+LAYOUTS = ["municipality", "prefecture", "prefecture-ndjson"]
+CONTENT_ENCODINGS = {"identity": None, "gzip": "gzip", "brotli": "br"}
+
+# name -> (round-trip latency in seconds, downlink in Mbit/s); WebPageTest presets
+NETWORKS = {
+    "unthrottled": (0.0, None),
+    "cable": (0.028, 5.0),
+    "4g": (0.17, 9.0),
+    "3g": (0.15, 1.6),
+}
+HANDSHAKE_RTTS = 2  # TCP + TLS 1.3 before the first request on a connection
+CHUNK = 16 * 1024  # Bytes written (server) and read (client) at a time
+DEFAULT_PREFECTURES = ["01", "13", "31"]  # Most municipalities, densest, fewest
+
+
+def oaza_path(layout, pref_code):
+    return f"/bundles/oaza/{pref_code}.ndjson" if layout == "prefecture-ndjson" else f"/bundles/oaza/{pref_code}.json"
+
+
+def build_bodies(pref_codes, layouts, encodings):
+    """{url path: {encoding: body}} for everything the sessions fetch."""
+    raw = {}
+    for pref_code in pref_codes:
+        path = os.path.join(GEOJSON_DIR, f"{pref_code}.json")
+        with open(path, "rb") as f:
+            raw[f"/data/geojson/{pref_code}.json"] = data = f.read()
+        features = []
+        for feat in json.loads(data)["features"]:
+            oaza_file = os.path.join(OAZA_DIR, f"{feat['properties']['code']}.json")
+            if not os.path.exists(oaza_file):
+                continue  # 404, as for the client
+            with open(oaza_file, "rb") as f:
+                data = f.read()
+            if "municipality" in layouts:
+                raw[f"/data/oaza/{feat['properties']['code']}.json"] = data
+            features.extend(json.loads(data)["features"])
+        # Python's shortest float repr reproduces the source digits
+        dumps = lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+        if "prefecture" in layouts:
+            raw[oaza_path("prefecture", pref_code)] = dumps(
+                {"type": "FeatureCollection", "features": features}).encode()
+        if "prefecture-ndjson" in layouts:
+            raw[oaza_path("prefecture-ndjson", pref_code)] = "".join(dumps(f) + "\n" for f in features).encode()
+
+    bodies = {}
+    for path, data in raw.items():
+        bodies[path] = {"identity": data}
+        for encoding in encodings:
+            if encoding != "identity":
+                bodies[path][encoding] = CODECS[encoding][1](data)
+    return bodies
+
+
+class Link:
+    """One downlink shared by all responses: chunks queue for their share of the bandwidth."""
+
+    def __init__(self, mbit_per_s):
+        self.bytes_per_s = mbit_per_s * 1e6 / 8 if mbit_per_s else None
+        self.lock = threading.Lock()
+        self.free_at = 0.0
+
+    def reserve(self, n):
+        """Seconds until n more bytes have crossed the link."""
+        if not self.bytes_per_s:
+            return 0.0
+        with self.lock:
+            now = time.perf_counter()
+            self.free_at = max(now, self.free_at) + n / self.bytes_per_s
+            return self.free_at - now
+
+
+class SimulatedHandler(http.server.BaseHTTPRequestHandler):
+    """Serve the prebuilt bodies with per-request latency over the shared link."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        if self.path == "/__reset":
+            self.server.link = Link(self.server.bandwidth)
+            self._respond(204, b"")
+            return
+        variants = self.server.bodies.get(self.path)
+        if variants is None:
+            self._respond(404, b"")
+            return
+        accepted = {e.strip() for e in self.headers.get("Accept-Encoding", "").split(",")}
+        encoding = next((e for e, token in CONTENT_ENCODINGS.items() if token in accepted and e in variants),
+                        "identity")
+        self._respond(200, variants[encoding], CONTENT_ENCODINGS[encoding])
+
+    def _respond(self, status, body, content_encoding=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        if content_encoding:
+            self.send_header("Content-Encoding", content_encoding)
+        self.end_headers()
+        for i in range(0, len(body), CHUNK):
+            chunk = body[i:i + CHUNK]
+            time.sleep(self.server.link.reserve(len(chunk)))
+            self.wfile.write(chunk)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(args):
+    """Child side: build the bodies, print the port, serve until killed."""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SimulatedHandler)
+    server.daemon_threads = True
+    server.bodies = build_bodies(args.prefectures, args.layouts, args.encodings)
+    server.latency, server.bandwidth = args.latency, args.bandwidth
+    server.link = Link(args.bandwidth)
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+def _decoder(content_encoding):
+    if content_encoding == "gzip":
+        return zlib.decompressobj(wbits=31)
+    if content_encoding == "br":
+        return brotli.Decompressor()
+    return None
+
+
+class Client:
+    """A browser-like client: a pool of keep-alive connections to one host."""
+
+    def __init__(self, port, connections, encoding, latency):
+        self.port = port
+        self.latency = latency
+        self.accept = CONTENT_ENCODINGS[encoding] or "identity"
+        self.pool = ThreadPoolExecutor(max_workers=connections)
+        self.local = threading.local()
+        self.connections = []
+        self.requests = self.wire_bytes = 0
+        self.lock = threading.Lock()
+
+    def _connection(self):
+        if getattr(self.local, "conn", None) is None:
+            time.sleep(HANDSHAKE_RTTS * self.latency)
+            self.local.conn = http.client.HTTPConnection("127.0.0.1", self.port)
+            with self.lock:
+                self.connections.append(self.local.conn)
+        return self.local.conn
+
+    def fetch(self, path, on_feature=None):
+        """GET path and parse it; return its features (None on 404).
+
+        With on_feature, the body is parsed as NDJSON while it streams in and
+        on_feature() is called once per feature.
+        """
+        conn = self._connection()
+        conn.request("GET", path, headers={"Accept-Encoding": self.accept})
+        resp = conn.getresponse()
+        decoder = _decoder(resp.getheader("Content-Encoding"))
+        wire = 0
+        features, buffer, chunks = [], b"", []
+        while True:
+            chunk = resp.read1(CHUNK)
+            if not chunk:
+                break
+            wire += len(chunk)
+            if decoder:
+                chunk = decoder.decompress(chunk)
+            if on_feature is None:
+                chunks.append(chunk)
+                continue
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            for line in lines:
+                if line:
+                    features.append(json.loads(line))
+                    on_feature()
+        resp.read()  # Marks the response finished so the connection can be reused
+        with self.lock:
+            self.requests += 1
+            self.wire_bytes += wire
+        if resp.status != 200:
+            return None
+        if on_feature is None:
+            return json.loads(b"".join(chunks))["features"]
+        return features
+
+    def close(self):
+        self.pool.shutdown()
+        for conn in self.connections:
+            conn.close()
+
+
+def run_session(port, pref_code, layout, encoding, connections, latency):
+    """Replay one session; return its metrics."""
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    conn.request("GET", "/__reset")
+    conn.getresponse().read()
+    conn.close()
+
+    client = Client(port, connections, encoding, latency)
+    first = []
+    lock = threading.Lock()
+
+    def feature_seen():
+        if not first:
+            with lock:
+                if not first:
+                    first.append(time.perf_counter())
+
+    start = time.perf_counter()
+    try:
+        codes = [f["properties"]["code"]
+                 for f in client.pool.submit(client.fetch, f"/data/geojson/{pref_code}.json").result()]
+        if layout == "municipality":
+            def load(code):
+                features = client.fetch(f"/data/oaza/{code}.json")
+                if features:
+                    feature_seen()
+                return features or []
+            results = list(client.pool.map(load, codes))
+        elif layout == "prefecture":
+            results = [client.pool.submit(client.fetch, oaza_path(layout, pref_code)).result() or []]
+            if results[0]:
+                feature_seen()
+        else:
+            results = [client.pool.submit(client.fetch, oaza_path(layout, pref_code), feature_seen).result() or []]
+        features = [f for result in results for f in result]  # Merged as usePrefectureOaza does
+        end = time.perf_counter()
+    finally:
+        client.close()
+    return {
+        "firstFeature": first[0] - start if first else None,
+        "complete": end - start,
+        "requests": client.requests,
+        "wireBytes": client.wire_bytes,
+        "features": len(features),
+    }
+
+
+def median_session(runs):
+    merged = dict(runs[0])
+    for key in ("firstFeature", "complete"):
+        values = [run[key] for run in runs if run[key] is not None]
+        merged[key] = statistics.median(values) if values else None
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prefectures", nargs="+", default=DEFAULT_PREFECTURES, metavar="CODE",
+                        help=f"prefectures to open (default: {' '.join(DEFAULT_PREFECTURES)})")
+    parser.add_argument("--layouts", nargs="+", choices=LAYOUTS, default=LAYOUTS)
+    parser.add_argument("--encodings", nargs="+", choices=["identity", *CODECS], default=["identity", *CODECS])
+    parser.add_argument("--network", choices=NETWORKS, default="4g",
+                        help="latency/bandwidth preset (default: %(default)s)")
+    parser.add_argument("--latency", type=float, help="round-trip time in seconds (overrides --network)")
+    parser.add_argument("--bandwidth", type=float, help="downlink in Mbit/s, 0 = unlimited (overrides --network)")
+    parser.add_argument("--connections", type=int, default=6,
+                        help="parallel connections, as a browser per host (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="sessions per case; the median is kept (default: 3)")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to PATH")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.prefectures = [code.zfill(2) for code in args.prefectures]
+    latency, bandwidth = NETWORKS[args.network]
+    args.latency = latency if args.latency is None else args.latency
+    args.bandwidth = bandwidth if args.bandwidth is None else args.bandwidth or None
+
+    if args.serve:
+        serve(args)
+        return
+
+    missing = [code for code in args.prefectures if not os.path.exists(os.path.join(GEOJSON_DIR, f"{code}.json"))]
+    if missing:
+        parser.error(f"no public/data/geojson/ file for {', '.join(missing)}")
+
+    cmd = [sys.executable, os.path.abspath(__file__), "--serve", "--latency", str(args.latency),
+           "--bandwidth", str(args.bandwidth or 0), "--prefectures", *args.prefectures,
+           "--layouts", *args.layouts, "--encodings", *args.encodings]
+    print("Building layouts...", end=" ", flush=True)
+    server = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    results = []
+    try:
+        port = int(server.stdout.readline())
+        print(f"serving on port {port}")
+        link = f"{args.bandwidth:g}Mbit/s" if args.bandwidth else "unlimited bandwidth"
+        print(f"Network: {args.latency * 1000:.0f}ms RTT, {link}, {args.connections} connections, "
+              f"median of {args.repeat} sessions")
+
+        for pref_code in args.prefectures:
+            print(f"\n  {pref_code}:  {'layout':<18} {'encoding':<9} {'requests':>8} {'wire KB':>9} "
+                  f"{'first feature':>14} {'complete':>9}")
+            for layout in args.layouts:
+                for encoding in args.encodings:
+                    runs = [run_session(port, pref_code, layout, encoding, args.connections, args.latency)
+                            for _ in range(args.repeat)]
+                    m = median_session(runs)
+                    results.append({"prefecture": pref_code, "layout": layout, "encoding": encoding, **m})
+                    first = f"{m['firstFeature']:.2f}s" if m["firstFeature"] is not None else "-"
+                    print(f"       {layout:<18} {encoding:<9} {m['requests']:>8} {m['wireBytes'] // 1024:>9,} "
+                          f"{first:>14} {m['complete']:>8.2f}s  ({m['features']:,} features)", flush=True)
+    finally:
+        server.kill()
+        server.wait()
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"latency": args.latency, "bandwidth": args.bandwidth, "connections": args.connections,
+                       "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\nResults: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
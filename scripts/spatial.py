@@ -0,0 +1,212 @@
+"""
+Spatial lookups against the municipality boundary outputs, shared by the OSM
+ingestion scripts.
+
+PolygonIndex buckets features into a regular lng/lat grid by bbox, so a point
+query only runs the even-odd ring test against the few features whose bbox
+covers its cell. crossed() and clip_lengths() join a whole polyline against
+the index: each candidate polygon is tested against all of the line's nearby
+segments at once, as NumPy arrays of segments x polygon edges.
+
+locate() is standard library only; the polyline joins require numpy.
+"""
+import json
+import os
+
+from geoutil import KM_PER_DEGREE
+from project import GEOJSON_DIR, PREF_CODES
+
+try:
+    import numpy as np
+except ImportError:  # Only needed by the polyline joins
+    np = None
+
+
+CELL_SIZE = 0.1  # Grid cell in degrees (~10km)
+MAX_PAIRS = 1 << 20  # Segment x edge pairs tested per array operation
+
+
+def point_in_rings(x, y, rings):
+    """Even-odd test of (x, y) against all rings of one polygon."""
+    inside = False
+    for ring in rings:
+        for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+            if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+                inside = not inside
+    return inside
+
+
+def _inside_pieces(first_inside, t):
+    """Cut segments at their crossings t; return (piece lengths as fractions, inside mask)."""
+    t = np.sort(np.nan_to_num(t, nan=1.0), axis=1)
+    cuts = np.hstack([np.zeros((len(t), 1)), t, np.ones((len(t), 1))])
+    pieces = np.diff(cuts, axis=1)
+    parity = np.arange(pieces.shape[1]) % 2 == 0
+    return pieces, np.where(first_inside[:, None], parity, ~parity)
+
+
+def load_municipalities(pref_codes=None):
+    """Yield municipality features from public/data/geojson/ (all prefectures by default)."""
+    for code in pref_codes or PREF_CODES:
+        with open(os.path.join(GEOJSON_DIR, f"{code}.json"), encoding="utf-8") as f:
+            yield from json.load(f)["features"]
+
+
+class PolygonIndex:
+    """Grid bbox index over Polygon/MultiPolygon features, keyed by properties.code."""
+
+    def __init__(self, features, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.entries = []  # (code, polygon rings, bbox)
+        self.grid = {}
+        self._edge_cache = {}
+        for feat in features:
+            geom = feat["geometry"]
+            polygons = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+            for poly in polygons:
+                xs = [p[0] for p in poly[0]]
+                ys = [p[1] for p in poly[0]]
+                box = (min(xs), min(ys), max(xs), max(ys))
+                i = len(self.entries)
+                self.entries.append((feat["properties"]["code"], poly, box))
+                for cx in range(self._cell(box[0]), self._cell(box[2]) + 1):
+                    for cy in range(self._cell(box[1]), self._cell(box[3]) + 1):
+                        self.grid.setdefault((cx, cy), []).append(i)
+
+    def _cell(self, v):
+        return int(v // self.cell_size)
+
+    def candidates(self, xmin, ymin, xmax, ymax):
+        """Indexes of entries whose bbox intersects the given box."""
+        found = set()
+        for cx in range(self._cell(xmin), self._cell(xmax) + 1):
+            for cy in range(self._cell(ymin), self._cell(ymax) + 1):
+                for i in self.grid.get((cx, cy), ()):
+                    x0, y0, x1, y1 = self.entries[i][2]
+                    if x0 <= xmax and xmin <= x1 and y0 <= ymax and ymin <= y1:
+                        found.add(i)
+        return found
+
+    def locate(self, x, y):
+        """Code of the feature containing (x, y), or None."""
+        for i in self.grid.get((self._cell(x), self._cell(y)), ()):
+            code, poly, (x0, y0, x1, y1) = self.entries[i]
+            if x0 <= x <= x1 and y0 <= y <= y1 and point_in_rings(x, y, poly):
+                return code
+        return None
+
+    def _edges(self, i):
+        """Edge arrays (x0, y0, x1, y1) of all rings of entry i, built on first use."""
+        edges = self._edge_cache.get(i)
+        if edges is None:
+            parts = []
+            for ring in self.entries[i][1]:
+                pts = np.asarray(ring, dtype=np.float64)[:, :2]
+                parts.append(np.hstack([pts[:-1], pts[1:]]))
+            edges = self._edge_cache[i] = np.vstack(parts).T.copy()
+        return edges
+
+    def _segment_tests(self, i, px, py, qx, qy):
+        """Test segments (column vectors p -> q) against all edges of entry i.
+
+        Returns (first_inside, t): whether each segment's first piece (up to
+        its first crossing) lies inside the polygon, and an (segments x edges)
+        array of the positions along each segment where it crosses an edge
+        (NaN where it doesn't).
+
+        An edge is crossed when its ends lie on different sides of the
+        segment's line, a vertex on the line counting as the left side. A
+        segment through a vertex so crosses one of the vertex's two edges, or
+        both or neither where it only touches the polygon there, and the
+        even-odd parity of the pieces holds. The first piece is tested at its
+        middle, which lies on an edge only where the segment runs along one.
+        """
+        ex0, ey0, ex1, ey1 = (e[None, :] for e in self._edges(i))
+        rx, ry = qx - px, qy - py
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Segment/edge intersection parameters
+            sx, sy = ex1 - ex0, ey1 - ey0
+            left0 = rx * (ey0 - py) - ry * (ex0 - px) >= 0
+            left1 = rx * (ey1 - py) - ry * (ex1 - px) >= 0
+            t = ((ex0 - px) * sy - (ey0 - py) * sx) / (rx * sy - ry * sx)
+            t[~((left0 != left1) & (t > 0) & (t < 1))] = np.nan
+
+            # Even-odd count of edges crossing the ray to the right of the first piece's middle
+            half = np.where(np.isnan(t), 1.0, t).min(axis=1, keepdims=True) / 2
+            mx, my = px + half * rx, py + half * ry
+            straddle = (ey0 > my) != (ey1 > my)
+            xcross = ex0 + (my - ey0) * sx / sy
+            first_inside = (np.count_nonzero(straddle & (mx < xcross), axis=1) % 2) == 1
+        return first_inside, t
+
+    def _chunks(self, i, near):
+        """Split segment indexes so each test array stays under MAX_PAIRS."""
+        step = max(1, MAX_PAIRS // self._edges(i).shape[1])
+        return [near[k:k + step] for k in range(0, len(near), step)]
+
+    def _near(self, i, boxes):
+        """Indexes of the segments whose bbox intersects entry i's bbox."""
+        sx0, sy0, sx1, sy1 = boxes
+        x0, y0, x1, y1 = self.entries[i][2]
+        return np.flatnonzero((sx0 <= x1) & (x0 <= sx1) & (sy0 <= y1) & (y0 <= sy1))
+
+    def crossed(self, points):
+        """Codes of the features a polyline passes through, in order along the line.
+
+        A segment counts for a polygon when part of it lies inside (so not
+        where it only touches a vertex); the last vertex is tested as well.
+        """
+        pts = np.asarray(points, dtype=np.float64)
+        ax, ay, bx, by = pts[:-1, 0], pts[:-1, 1], pts[1:, 0], pts[1:, 1]
+        boxes = (np.minimum(ax, bx), np.minimum(ay, by), np.maximum(ax, bx), np.maximum(ay, by))
+
+        first = {}  # code -> first segment index
+        for i in self.candidates(boxes[0].min(), boxes[1].min(), boxes[2].max(), boxes[3].max()):
+            near = self._near(i, boxes)
+            if not len(near):
+                continue
+            seg = None
+            for chunk in self._chunks(i, near):
+                first_inside, t = self._segment_tests(
+                    i, ax[chunk, None], ay[chunk, None], bx[chunk, None], by[chunk, None])
+                pieces, inside = _inside_pieces(first_inside, t)
+                hit = np.flatnonzero(((pieces > 0) & inside).any(axis=1))
+                if len(hit):
+                    seg = int(chunk[hit[0]])
+                    break
+            if seg is None:
+                if near[-1] != len(ax) - 1 or not point_in_rings(pts[-1, 0], pts[-1, 1], self.entries[i][1]):
+                    continue
+                seg = len(ax)
+            code = self.entries[i][0]
+            if seg < first.get(code, len(pts)):
+                first[code] = seg
+        return sorted(first, key=lambda code: first[code])
+
+    def clip_lengths(self, points):
+        """Length in km of a polyline inside each feature, as {code: km}.
+
+        Each segment is cut at its edge crossings; the pieces alternate
+        between inside and outside starting from the first, so the inside
+        length is the sum of every other piece. Lengths use a local
+        equirectangular scale per segment, which is accurate to well under
+        1% for segments of a few km.
+        """
+        pts = np.asarray(points, dtype=np.float64)
+        ax, ay, bx, by = pts[:-1, 0], pts[:-1, 1], pts[1:, 0], pts[1:, 1]
+        boxes = (np.minimum(ax, bx), np.minimum(ay, by), np.maximum(ax, bx), np.maximum(ay, by))
+        seg_km = np.hypot((bx - ax) * KM_PER_DEGREE * np.cos(np.radians((ay + by) / 2)),
+                          (by - ay) * KM_PER_DEGREE)
+
+        lengths = {}
+        for i in self.candidates(boxes[0].min(), boxes[1].min(), boxes[2].max(), boxes[3].max()):
+            km = 0.0
+            for chunk in self._chunks(i, self._near(i, boxes)):
+                first_inside, t = self._segment_tests(
+                    i, ax[chunk, None], ay[chunk, None], bx[chunk, None], by[chunk, None])
+                pieces, inside = _inside_pieces(first_inside, t)
+                km += float(((pieces * inside).sum(axis=1) * seg_km[chunk]).sum())
+            if km > 0:
+                code = self.entries[i][0]
+                lengths[code] = lengths.get(code, 0.0) + km
+        return lengths
@@ -0,0 +1,63 @@
+"""
+Run the default build graph of scripts/build.py on the fixture prefecture.
+
+The build runs in a temporary tree (GEODICT_ROOT) limited to the fixture
+prefecture (GEODICT_PREFECTURES), with its sources taken from
+scripts/fixtures/sources/. The generators that draw the whole country
+(japan-map, overview) read the committed GeoJSON of the other prefectures.
+"""
+import glob
+import gzip
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from project import GEOJSON_DIR, SCRIPTS_DIR, SRC_DATA_DIR
+
+FIXTURES_DIR = os.path.join(SCRIPTS_DIR, "fixtures", "sources")
+PREFECTURES = ["31"]  # Fixtures exist for both source layers
+
+
+def run_build(root):
+    env = {**os.environ, "GEODICT_ROOT": str(root), "GEODICT_PREFECTURES": ",".join(PREFECTURES)}
+    return subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, "build.py"), "--jobs", "1"],
+                          env=env, capture_output=True, text=True)
+
+
+def test_default_build(tmp_path):
+    spec = importlib.util.spec_from_file_location("build", os.path.join(SCRIPTS_DIR, "build.py"))
+    build = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(build)
+
+    shutil.copytree(SRC_DATA_DIR, tmp_path / "src" / "data")
+    shutil.copytree(GEOJSON_DIR, tmp_path / "public" / "data" / "geojson")
+    for layer in ("municipality", "oaza"):
+        os.makedirs(tmp_path / "build" / "sources" / layer)
+        for code in PREFECTURES:
+            with gzip.open(os.path.join(FIXTURES_DIR, layer, f"{code}.json.gz"), "rb") as f:
+                (tmp_path / "build" / "sources" / layer / f"{code}.json").write_bytes(f.read())
+
+    result = run_build(tmp_path)
+    assert result.returncode == 0, result.stdout + result.stderr
+    for log in glob.glob(str(tmp_path / "build" / "logs" / "*.log")):
+        with open(log, encoding="utf-8") as f:
+            assert "ERROR" not in f.read(), log
+
+    for name, stage in build.STAGES.items():
+        if stage.default:
+            for pattern in stage.outputs:
+                assert glob.glob(str(tmp_path / pattern)), f"{name}: no {pattern}"
+
+    # The fixture is the committed output with perturbed coordinates
+    with open(os.path.join(GEOJSON_DIR, "31.json"), encoding="utf-8") as f:
+        committed = [feat["properties"]["code"] for feat in json.load(f)["features"]]
+    with open(tmp_path / "public" / "data" / "geojson" / "31.json", encoding="utf-8") as f:
+        rebuilt = [feat["properties"]["code"] for feat in json.load(f)["features"]]
+    assert sorted(rebuilt) == sorted(committed)
+
+    result = run_build(tmp_path)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Total: 0 run" in result.stdout, result.stdout
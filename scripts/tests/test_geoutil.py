@@ -0,0 +1,72 @@
+"""
+Check the size and shape claims of --precision adaptive (geoutil.quantize_adaptive).
+
+Shape: on the fixture sources, every vertex stays within one display pixel
+of the source, and rings that are valid in the source stay valid.
+Size: on the committed 北海道 boundaries, adaptive output is smaller than
+the fixed 4-decimal grid.
+"""
+import gzip
+import json
+import os
+
+from geoutil import (DISPLAY_PIXELS, MAX_DECIMALS, MIN_DECIMALS, SOURCE_DECIMALS, _scaled_ring,
+                     adaptive_decimals, bbox, quantize_adaptive, ring_is_valid)
+from project import GEOJSON_DIR, SCRIPTS_DIR
+
+FIXTURES_DIR = os.path.join(SCRIPTS_DIR, "fixtures", "sources")
+FIXED_DECIMALS = 4  # DECIMALS in the prepare scripts
+
+
+def load_polygons(features):
+    for feat in features:
+        geom = feat["geometry"]
+        yield [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+
+
+def dumps(polygons):
+    return json.dumps(polygons, separators=(",", ":"))
+
+
+def square(size):
+    return [[[[135.0, 35.0], [135.0 + size, 35.0], [135.0 + size, 35.0 + size], [135.0, 35.0 + size],
+              [135.0, 35.0]]]]
+
+
+def test_decimals_follow_extent():
+    assert adaptive_decimals(square(10.0)) == MIN_DECIMALS
+    assert adaptive_decimals(square(2.0)) == 3
+    assert adaptive_decimals(square(0.2)) == 4
+    assert adaptive_decimals(square(0.02)) == 5
+    assert adaptive_decimals(square(0.002)) == 6
+    assert adaptive_decimals(square(0.00001)) == MAX_DECIMALS
+
+
+def test_shape_within_a_pixel():
+    finer = 0
+    for layer in ("municipality", "oaza"):
+        with gzip.open(os.path.join(FIXTURES_DIR, layer, "31.json.gz"), "rb") as f:
+            features = json.load(f)["features"]
+        for polygons in load_polygons(features):
+            west, south, east, north = bbox(polygons)
+            pixel = max(east - west, north - south) / DISPLAY_PIXELS
+            rounded, decimals = quantize_adaptive(polygons)
+            finer += decimals > FIXED_DECIMALS
+            for poly, out in zip(polygons, rounded):
+                for ring, r in zip(poly, out):
+                    error = max(max(abs(p[0] - q[0]), abs(p[1] - q[1])) for p, q in zip(ring, r))
+                    assert error <= pixel * (1 + 1e-9)
+                    if ring_is_valid(_scaled_ring(ring, SOURCE_DECIMALS)):
+                        assert ring_is_valid(_scaled_ring(r, MAX_DECIMALS))
+    # The fixed grid is coarser than a pixel for these
+    assert finer > 0
+
+
+def test_smaller_than_fixed_for_large_features():
+    with open(os.path.join(GEOJSON_DIR, "01.json"), encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    fixed = adaptive = 0
+    for polygons in load_polygons(features):
+        fixed += len(dumps(polygons))
+        adaptive += len(dumps(quantize_adaptive(polygons)[0]))
+    assert adaptive < fixed
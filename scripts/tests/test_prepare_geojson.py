@@ -0,0 +1,55 @@
+"""prepare-geojson.py on N03-style sources rebuilt from the committed output."""
+import importlib.util
+import json
+import os
+
+import pytest
+
+from municipalities import load_prefectures, match_features
+from project import GEOJSON_DIR, SCRIPTS_DIR
+
+spec = importlib.util.spec_from_file_location("prepare_geojson", os.path.join(SCRIPTS_DIR, "prepare-geojson.py"))
+prepare_geojson = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(prepare_geojson)
+
+
+def n03_source(pref_code):
+    """The committed features with N03 properties, one source feature per polygon."""
+    with open(os.path.join(GEOJSON_DIR, f"{pref_code}.json"), encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    source = []
+    for feat in features:
+        props = feat["properties"]
+        geom = feat["geometry"]
+        polygons = [geom["coordinates"]] if geom["type"] == "Polygon" else geom["coordinates"]
+        for polygon in polygons:
+            source.append({
+                "type": "Feature",
+                "properties": {
+                    "N03_001": "", "N03_002": None,
+                    # Towns and villages sit in a district (郡), which is not a parent
+                    "N03_003": props.get("parent") or ("某郡" if props["name"][-1] in "町村" else None),
+                    "N03_004": props["name"],
+                    "N03_007": props["code"],
+                },
+                "geometry": {"type": "Polygon", "coordinates": polygon},
+            })
+    return {"type": "FeatureCollection", "features": source}, features
+
+
+@pytest.mark.parametrize("pref_code", ["01", "27"])
+def test_wards_keep_their_code_and_parent(tmp_path, monkeypatch, pref_code):
+    source, committed = n03_source(pref_code)
+    monkeypatch.setattr(prepare_geojson, "read_source", lambda layer, code: json.dumps(source).encode())
+    monkeypatch.setattr(prepare_geojson, "OUTPUT_DIR", str(tmp_path))
+    prepare_geojson.process_prefecture(pref_code, lod="full")
+
+    with open(tmp_path / f"{pref_code}.json", encoding="utf-8") as f:
+        rebuilt = json.load(f)["features"]
+    props = {feat["properties"]["code"]: feat["properties"] for feat in rebuilt}
+    assert len(rebuilt) == len(committed)
+    for feat in committed:
+        assert props[feat["properties"]["code"]].get("parent") == feat["properties"].get("parent")
+
+    pref = next(p for p in load_prefectures() if p["code"] == pref_code)
+    assert len(match_features(pref, rebuilt)) == len(match_features(pref, committed))
@@ -0,0 +1,41 @@
+"""
+Polyline joins of spatial.PolygonIndex where a route meets the boundary at a vertex.
+"""
+import math
+
+import pytest
+
+from geoutil import KM_PER_DEGREE
+from spatial import PolygonIndex
+
+X, Y, R = 135.0, 35.0, 0.01  # Centre and radius of a diamond with vertices on the axes
+LEFT, RIGHT, TOP = (X - R, Y), (X + R, Y), (X, Y + R)
+DIAMOND = {
+    "type": "Feature",
+    "properties": {"code": "99999"},
+    "geometry": {"type": "Polygon", "coordinates": [[LEFT, (X, Y - R), RIGHT, TOP, LEFT]]},
+}
+
+
+def km(degrees, lat=Y):
+    return degrees * KM_PER_DEGREE * math.cos(math.radians(lat))
+
+
+@pytest.mark.parametrize("route", [
+    [(X - 2 * R, Y), (X + 2 * R, Y)],  # Through both vertices
+    [(X - 2 * R, Y), LEFT, (X + 2 * R, Y)],  # Route vertex on a polygon vertex
+    [(X + 2 * R, Y), RIGHT, (X - 2 * R, Y)],
+    [(X - 2 * R, Y), (X, Y), (X + 2 * R, Y)],  # Route vertex inside
+    [(X + 2 * R, Y), (X - 2 * R, Y)],  # Reversed
+])
+def test_crossing_at_a_vertex(route):
+    index = PolygonIndex([DIAMOND])
+    assert index.clip_lengths(route)["99999"] == pytest.approx(km(2 * R))
+    assert index.crossed(route) == ["99999"]
+
+
+def test_touching_a_vertex():
+    index = PolygonIndex([DIAMOND])
+    for route in ([(X - R, Y + R), (X + R, Y + R)], [(X + R, Y + R), (X - R, Y + R)]):
+        assert index.clip_lengths(route) == {}
+        assert index.crossed(route) == []
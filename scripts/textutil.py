@@ -0,0 +1,41 @@
+"""
+Japanese text normalization shared by the search index builds.
+
+normalize() folds the variants a user may type into one form: NFKC (full-width
+ASCII and half-width katakana to their standard forms), katakana to hiragana,
+lower case, and whitespace removed. A client querying the indexes must apply the
+same steps, so keys built here match queries typed in the browser.
+
+Standard library only.
+"""
+import unicodedata
+
+_KATAKANA_TO_HIRAGANA = {cp: cp - 0x60 for cp in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+def normalize(text):
+    """Normalize text for indexing and querying."""
+    text = unicodedata.normalize("NFKC", text).translate(_KATAKANA_TO_HIRAGANA).lower()
+    return "".join(text.split())
+
+
+def ngrams(text, n):
+    """Overlapping character n-grams of text (the text itself if shorter)."""
+    if len(text) <= n:
+        return [text] if text else []
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+def normalize_with_offsets(text):
+    """Normalize text character by character; return (normalized, offsets).
+
+    offsets[i] is the index in `text` of the character normalized[i] came
+    from, so matches found in the normalized text can be cut from the
+    original for snippets.
+    """
+    chars, offsets = [], []
+    for i, ch in enumerate(text):
+        for out in normalize(ch):
+            chars.append(out)
+            offsets.append(i)
+    return "".join(chars), offsets
@@ -3,10 +3,14 @@
 import { useState, useMemo } from 'react'
 import Link from 'next/link'
 import JapanMap from '@/components/JapanMap'
-import riverData from '@/data/rivers.json'
-import roadData from '@/data/roads.json'
+import riverData from '@/data/rivers.columnar.json'
+import roadData from '@/data/roads.columnar.json'
+import { ColumnarRecords, type ColumnarTable } from '@/lib/columnar'
 import type { River } from '@/lib/types'
 
+const rivers = new ColumnarRecords<River>(riverData.rivers as ColumnarTable).toArray()
+const prefectureNames = roadData.prefectureNames as Record<string, string>
+
 type SortKey = 'length' | 'basinArea' | 'name'
 
 export default function RiversPage() {
@@ -14,9 +18,6 @@ export default function RiversPage() {
   const [sortBy, setSortBy] = useState<SortKey>('length')
   const [searchQuery, setSearchQuery] = useState('')
 
-  const rivers = riverData.rivers as River[]
-  const prefectureNames = roadData.prefectureNames as Record<string, string>
-
   const sortedRivers = useMemo(() => {
     let result = [...rivers]
     if (searchQuery) {
@@ -31,7 +32,7 @@ export default function RiversPage() {
       result.sort((a, b) => b.basinArea - a.basinArea)
     }
     return result
-  }, [rivers, sortBy, searchQuery])
+  }, [sortBy, searchQuery])
 
   const highlightColors = useMemo(() => {
     if (!selectedRiver) return {}
@@ -2,11 +2,15 @@
 
 import { Suspense, useState, useEffect } from 'react'
 import RiverQuiz from '@/components/RiverQuiz'
-import riverData from '@/data/rivers.json'
-import roadData from '@/data/roads.json'
+import riverData from '@/data/rivers.columnar.json'
+import roadData from '@/data/roads.columnar.json'
+import { ColumnarRecords, type ColumnarTable } from '@/lib/columnar'
 import { getQuizClears } from '@/lib/storage'
 import type { River } from '@/lib/types'
 
+const rivers = new ColumnarRecords<River>(riverData.rivers as ColumnarTable).toArray()
+const prefectureNames = roadData.prefectureNames as Record<string, string>
+
 type QuizMode = 'multiple_choice' | 'map_click' | 'identify'
 
 function RiverQuizPageInner() {
@@ -23,8 +27,6 @@ function RiverQuizPageInner() {
     if (!started) setClears(getQuizClears())
   }, [started])
 
-  const rivers = riverData.rivers as River[]
-  const prefectureNames = roadData.prefectureNames as Record<string, string>
   const totalRivers = rivers.length
   const countOptions = [10, 20].filter((n) => n <= totalRivers)
 
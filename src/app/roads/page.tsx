@@ -3,9 +3,13 @@
 import { useState, useMemo } from 'react'
 import Link from 'next/link'
 import JapanMap from '@/components/JapanMap'
-import roadData from '@/data/roads.json'
+import roadData from '@/data/roads.columnar.json'
+import { ColumnarRecords, type ColumnarTable } from '@/lib/columnar'
 import type { Road } from '@/lib/types'
 
+const roads = new ColumnarRecords<Road>(roadData.roads as ColumnarTable).toArray()
+const prefectureNames = roadData.prefectureNames as Record<string, string>
+
 const categories = ['全て', '主要幹線', '一般国道', '補助国道']
 
 function shortName(s: string) {
@@ -17,9 +21,6 @@ export default function RoadsPage() {
   const [filterCategory, setFilterCategory] = useState('全て')
   const [searchQuery, setSearchQuery] = useState('')
 
-  const roads = roadData.roads as Road[]
-  const prefectureNames = roadData.prefectureNames as Record<string, string>
-
   const filteredRoads = useMemo(() => {
     let result = roads
     if (filterCategory !== '全て') {
@@ -36,7 +37,7 @@ export default function RoadsPage() {
       )
     }
     return result
-  }, [roads, filterCategory, searchQuery])
+  }, [filterCategory, searchQuery])
 
   const highlightColors = useMemo(() => {
     if (!selectedRoad) return {}
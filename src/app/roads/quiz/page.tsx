@@ -2,12 +2,16 @@
 
 import { Suspense, useState, useEffect } from 'react'
 import RoadQuiz from '@/components/RoadQuiz'
-import roadData from '@/data/roads.json'
+import roadData from '@/data/roads.columnar.json'
+import { ColumnarRecords, type ColumnarTable } from '@/lib/columnar'
 import { getQuizClears } from '@/lib/storage'
 import type { Road } from '@/lib/types'
 
 type QuizMode = 'multiple_choice' | 'map_click' | 'identify'
 
+const roads = new ColumnarRecords<Road>(roadData.roads as ColumnarTable).toArray()
+const prefectureNames = roadData.prefectureNames as Record<string, string>
+
 const categories = ['全て', '主要幹線', '一般国道', '補助国道']
 
 function RoadQuizPageInner() {
@@ -25,9 +29,6 @@ function RoadQuizPageInner() {
     if (!started) setClears(getQuizClears())
   }, [started])
 
-  const roads = roadData.roads as Road[]
-  const prefectureNames = roadData.prefectureNames as Record<string, string>
-
   const filteredCount = filterCategory === '全て'
     ? roads.length
     : roads.filter((r) => r.category === filterCategory).length
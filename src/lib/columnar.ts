@@ -0,0 +1,61 @@
+// Loader for the columnar datasets written by scripts/datasets.py
+// (src/data/roads.columnar.json, src/data/rivers.columnar.json).
+// The roads and rivers pages read their records through ColumnarRecords,
+// which rebuilds each record on first access and caches it.
+
+type Column =
+  | { values: unknown[] }
+  | { dict: string[]; index: (number | null)[] }
+  | { prefs: number[][] }
+
+export interface ColumnarTable {
+  count: number
+  fields: string[]
+  columns: Record<string, Column>
+}
+
+function columnGetter(column: Column): (i: number) => unknown {
+  if ('prefs' in column) {
+    return (i) => column.prefs[i].map((c) => String(c).padStart(2, '0'))
+  }
+  if ('dict' in column) {
+    return (i) => {
+      const j = column.index[i]
+      return j === null ? null : column.dict[j]
+    }
+  }
+  return (i) => column.values[i]
+}
+
+export class ColumnarRecords<T> {
+  readonly length: number
+  private getters: [string[], (i: number) => unknown][]
+  private cache: (T | undefined)[]
+
+  constructor(table: ColumnarTable) {
+    this.length = table.count
+    this.getters = table.fields.map((f) => [f.split('.'), columnGetter(table.columns[f])])
+    this.cache = new Array(table.count)
+  }
+
+  get(i: number): T {
+    const cached = this.cache[i]
+    if (cached) return cached
+    const record: Record<string, unknown> = {}
+    for (const [path, get] of this.getters) {
+      const value = get(i)
+      if (value === null || value === undefined) continue
+      let target = record
+      for (const key of path.slice(0, -1)) {
+        target = (target[key] ??= {}) as Record<string, unknown>
+      }
+      target[path[path.length - 1]] = value
+    }
+    this.cache[i] = record as T
+    return record as T
+  }
+
+  toArray(): T[] {
+    return Array.from({ length: this.length }, (_, i) => this.get(i))
+  }
+}